@@ -0,0 +1,346 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.daemon
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : A resident flag daemon. It keeps the parsed YamlObj in memory and answers
+# ;           get/list/set/unset requests over a local Unix domain socket.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Protocol:
+#
+#   One request per line, using the command line syntax of unimogDev.py:
+#
+#       get UNIMOG_NUKE_DEV
+#       list --mode=bash
+#       set UNIMOG_HOUDINI_DEV UNIMOG_MAYA_DEV
+#       unset --mode=all
+#
+#   Global "-v" options are accepted and ignored. The "--stack" option names
+#   the config layers of the client, the "|" separated site, localsite, show
+#   and user folders of its environment (empty for a layer it has not set):
+#
+#       --stack=/site||/shows/abc| get UNIMOG_NUKE_DEV
+#
+#   A daemon answers the clients of its own stack only, any other stack (or
+#   none, but for "ping") is refused and the client falls back to the tool.
+#   Every reply is a status line followed by the payload:
+#
+#       OK <payload length>\n<payload>
+#       ERR <message>\n
+#
+#   A connection may carry any number of requests, the shell side sends a
+#   single one and closes its end. The socket lives in $XDG_RUNTIME_DIR (or
+#   /tmp) and the clients only talk to one owned by their own user: whatever
+#   a daemon replies ends up in the environment of the shell.
+
+# Declare external imports
+import sys
+import os
+import errno
+import struct
+import socket
+import threading
+import SocketServer
+import logging
+
+# Declare internal imports
+import layers
+import utilities as utils
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[5]"
+
+# Setup the Daemon Functions {{{
+
+# DAEMON: Define a "Socket Path" function {{{
+# ;---------------------------------------------------------------------------
+# ; Socket Path:
+# ;     The socket location, "$UNIMOG_DEV_SOCKET" or a per user default in
+# ;     "$XDG_RUNTIME_DIR" (/tmp without one). Keep the default in sync with
+# ;     "unimogDev.sh" and "unimogDev.env".
+# ;
+# ; Peer Uid:
+# ;     The user id of the process at the other end of a connected Unix
+# ;     socket, None where the platform does not tell (no SO_PEERCRED).
+# ;---------------------------------------------------------------------------
+peerCredentials = getattr(socket, 'SO_PEERCRED', 17 if sys.platform.startswith('linux') else None)
+
+def socketPath():
+    return os.environ.get('UNIMOG_DEV_SOCKET', os.path.join(os.environ.get('XDG_RUNTIME_DIR') or '/tmp', 'unimogDev.%d.sock' % (os.getuid())))
+
+def peerUid(connection):
+    if peerCredentials is None:
+        return None
+    credentials = connection.getsockopt(socket.SOL_SOCKET, peerCredentials, struct.calcsize('3i'))
+    return struct.unpack('3i', credentials)[1]
+# }}}
+
+# DAEMON: Define a "Stack Key" function {{{
+# ;---------------------------------------------------------------------------
+# ; Stack Key:
+# ;     The "--stack" value of an environment (this process by default), see
+# ;     "layers.stackKey". Normalise Stack puts the value of a client in the
+# ;     same form.
+# ;---------------------------------------------------------------------------
+stackSeparator = layers.stackSeparator
+stackKey = layers.stackKey
+
+def normaliseStack(stack):
+    return stackSeparator.join(os.path.normpath(folder) if folder else '' for folder in stack.split(stackSeparator))
+# }}}
+
+# DAEMON: Define a request parser {{{
+# ;---------------------------------------------------------------------------
+# ; Parse Request:
+# ;     Splits a request line into (function, mode, targets, matches, stack),
+# ;     raises ValueError for anything the daemon does not answer. The stack
+# ;     is None without a "--stack" option.
+# ;---------------------------------------------------------------------------
+def parseRequest(line):
+    words = line.split()
+    stack = None
+
+    # Drop the global verbosity options, keep the stack of the client
+    while words and words[0].startswith('-'):
+        if words[0] in ('-v', '--verbosity'):
+            words = words[2:]
+        elif words[0].startswith('-v') or words[0].startswith('--verbosity='):
+            words = words[1:]
+        elif words[0].startswith('--stack='):
+            stack = normaliseStack(words[0][len('--stack='):])
+            words = words[1:]
+        else:
+            raise ValueError("Unsupported option: %s" % (words[0]))
+
+    if not words:
+        raise ValueError("Empty request")
+
+    function = words[0]
+    mode = "default"
+    targets = []
+    matches = []
+
+    index = 1
+    while index < len(words):
+        if words[index] == '--mode' and index + 1 < len(words):
+            mode = words[index + 1]
+            index = index + 2
+        elif words[index].startswith('--mode='):
+            mode = words[index][len('--mode='):]
+            index = index + 1
+        elif words[index] == '--match' and index + 1 < len(words):
+            matches.append(words[index + 1])
+            index = index + 2
+        elif words[index].startswith('--match='):
+            matches.append(words[index][len('--match='):])
+            index = index + 1
+        elif words[index].startswith('-'):
+            raise ValueError("Unsupported option: %s" % (words[index]))
+        else:
+            targets.append(words[index])
+            index = index + 1
+
+    if function not in ('get', 'list', 'set', 'unset', 'ping'):
+        raise ValueError("Unsupported function: %s" % (function))
+
+    return function, mode, targets, matches, stack
+# }}}
+
+# DAEMON: Define a client query function {{{
+# ;---------------------------------------------------------------------------
+# ; Query:
+# ;     Sends a single request with the stack of "environment" (this process
+# ;     by default) and returns the payload. Raises socket.error (OSError
+# ;     without a socket) if the daemon is not reachable, and RuntimeError on
+# ;     an ERR reply or a socket (or daemon) of another user.
+# ;---------------------------------------------------------------------------
+def query(request, path=None, timeout=2.0, environment=None):
+    path = path or socketPath()
+    if os.stat(path).st_uid != os.getuid():
+        raise RuntimeError("The daemon socket is owned by another user: %s" % (path))
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(timeout)
+    try:
+        connection.connect(path)
+        if peerUid(connection) not in (None, os.getuid()):
+            raise RuntimeError("The daemon runs as another user: %s" % (path))
+        connection.sendall('--stack=%s %s\n' % (stackKey(environment), request.rstrip('\n')))
+        connection.shutdown(socket.SHUT_WR)
+
+        chunks = []
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        connection.close()
+
+    status, separator, payload = ''.join(chunks).partition('\n')
+    if not status.startswith('OK'):
+        raise RuntimeError(status[4:] or "No reply from the daemon")
+    return payload
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# Setup Object Classes {{{
+
+# Setup the flag state object {{{
+# ;---------------------------------------------------------------------------
+# ; Flag State:
+# ;     The in-memory YamlObj of the merged config layers, reloaded whenever
+# ;     the stat signature of a layer changes. All access goes through one lock.
+# ;     Only the requests of the layer stack the daemon started with are
+# ;     answered.
+# ;---------------------------------------------------------------------------
+class FlagState:
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.stack = normaliseStack(stackKey())
+        self.signature = None
+        self.yamlObject = None
+        self.lock = threading.Lock()
+
+    def currentSignature(self):
+        return layers.stackSignature(layers.layerStack(self.fileName))
+
+    def refresh(self):
+        signature = self.currentSignature()
+        if signature != self.signature:
+            logger = logging.getLogger('unimog.unimogdev.daemon')
+            logger.info("%s: %s", "Loading the configuration", self.fileName)
+            inData, origins = utils.importMergedData(self.fileName)
+            if 'error' in inData:
+                raise RuntimeError("Broken configuration: %s" % (self.fileName))
+            self.yamlObject = utils.YamlObj(**inData)
+            self.signature = signature
+
+    def answer(self, line):
+        function, mode, targets, matches, stack = parseRequest(line)
+
+        # A client of other layers would read (and write) the config of this daemon
+        if function == 'ping' and stack is None:
+            return 'pong'
+        if stack != self.stack:
+            raise ValueError("The daemon serves another layer stack (%s), not %s" % (self.stack, stack))
+
+        self.lock.acquire()
+        try:
+            self.refresh()
+
+            if function == 'ping':
+                return 'pong'
+
+            if function == 'get' and (len(targets) != 1 or matches or utils.isPattern(targets[0])):
+                flags = self.yamlObject.flags
+                return '\n'.join('{}={}'.format(name, utils.schema.textValue(flags.get(name))) for name in utils.selectNames(self.yamlObject, targets, matches) if name in flags)
+
+            if function == 'get':
+                if targets[0] not in self.yamlObject.flags:
+                    raise ValueError("\"%s\" is NOT a valid dev variable!" % (targets[0]))
+                return utils.schema.textValue(self.yamlObject.flags.get(targets[0]))
+
+            if function == 'list':
+                listString = utils.formatList(self.yamlObject, mode, utils.selectPositions(self.yamlObject, targets, matches))
+                if listString is None:
+                    raise ValueError("Unknown --mode: %s" % (mode))
+                return listString
+
+            # The "set" and "unset" functions, committed under the config lock
+            if mode == "all" and targets:
+                raise ValueError("No arguments allowed after --all.")
+            if function == 'unset' and [target for target in targets if '=' in target]:
+                raise ValueError("<unset> takes no values (NAME=VALUE).")
+
+            # An invalid typed value (or a broken config) ends the commit with an exit code
+            try:
+                utils.commitSet(self.fileName, targets, 0, function == 'set', mode, matches)
+            except SystemExit, exitError:
+                raise ValueError("The change was refused (exit code %s), see the daemon log." % (exitError.code))
+            self.signature = None
+            return ''
+        finally:
+            self.lock.release()
+# }}}
+
+# Setup the request handler {{{
+# ;---------------------------------------------------------------------------
+# ; Request Handler:
+# ;     Answers every request line of a connection until the client closes.
+# ;---------------------------------------------------------------------------
+class FlagRequestHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                payload = self.server.state.answer(line)
+                self.wfile.write("OK %d\n%s" % (len(payload), payload))
+            except Exception, error:
+                self.wfile.write("ERR %s\n" % (str(error).replace('\n', ' ')))
+            self.wfile.flush()
+# }}}
+
+# Setup the server {{{
+# ;---------------------------------------------------------------------------
+# ; Flag Server:
+# ;     A threading Unix stream server bound to "path". A stale socket file
+# ;     (nobody listening) is removed, a live one is an error.
+# ;---------------------------------------------------------------------------
+class FlagServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+    # Hundreds of shells may connect at once, the default backlog of 5 would
+    # refuse them with EAGAIN
+    request_queue_size = 256
+
+    def __init__(self, fileName, path):
+        self.state = FlagState(fileName)
+        self.path = path
+
+        if os.path.exists(path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+            except socket.error, error:
+                if error.errno not in (errno.ECONNREFUSED, errno.ENOENT):
+                    raise
+                os.remove(path)
+            else:
+                raise RuntimeError("A daemon is already listening on %s" % (path))
+            finally:
+                probe.close()
+
+        # Prime the state so a broken configuration fails at start
+        self.state.refresh()
+
+        oldMask = os.umask(0077)
+        try:
+            SocketServer.UnixStreamServer.__init__(self, path, FlagRequestHandler)
+        finally:
+            os.umask(oldMask)
+
+    def server_close(self):
+        SocketServer.UnixStreamServer.server_close(self)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+# }}}
+
+# Any additional class goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,288 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.derived
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : Derived flags, boolean expressions over other flags. The definitions are compiled
+# ;           once into a dependency graph, a change only re-evaluates the flags downstream of it.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Derived outline:
+#
+#   A layer defines derived flags under the reserved "__derived__" key, the
+#   definitions of every layer are merged per name (later layers override):
+#
+#       __derived__:
+#           UNIMOG_LD_LIBRARY_DEV: UNIMOG_HOUDINI_DEV or UNIMOG_MAYA_DEV
+#           UNIMOG_PIPELINE_DEV: not (UNIMOG_SITE_DEV and UNIMOG_LOCAL_DEV)
+#
+#   expression  := term ('or' term)*
+#   term        := factor ('and' factor)*
+#   factor      := 'not' factor | '(' expression ')' | NAME | 'true' | 'false'
+#
+#   A name that is not a flag reads as false. The values are only part of the
+#   merged view, the layers hold the definitions but never a derived value
+#   (a derived flag can not be set by hand). Every expression is compiled into
+#   a function once (a single "compile" for the whole graph), the graph is
+#   ranked in topological order and a cycle is reported with its names.
+#   "propagate" walks the changed names downstream in rank order, a flag
+#   whose value does not change stops the walk below it.
+
+# Declare external imports
+import re
+import heapq
+
+# Declare internal imports
+import layers
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[1]"
+
+# Setup the derived related variables
+derivedKey = layers.derivedKey
+tokenPattern = re.compile(r'\s*(?:([()])|([A-Za-z_][A-Za-z0-9_]*))')
+constants = {'true' : 'True', 'false' : 'False', 'True' : 'True', 'False' : 'False'}
+operators = ('and', 'or', 'not')
+
+# Setup the Derived Functions {{{
+
+# DERIVED: Define a "Tokenize" function {{{
+# ;---------------------------------------------------------------------------
+# ; Tokenize:
+# ;     The tokens of an expression. A YAML boolean ("true" unquoted) is a
+# ;     constant expression.
+# ;---------------------------------------------------------------------------
+def tokenize(expression):
+    if expression is True or expression is False:
+        return [str(expression)]
+    if not isinstance(expression, basestring):
+        raise ValueError("not an expression: %r" % (expression))
+
+    tokens = []
+    position = 0
+    end = len(expression.rstrip())
+    while position < end:
+        found = tokenPattern.match(expression, position)
+        if found is None:
+            raise ValueError("unexpected %r at %d" % (expression[position:position + 10], position))
+        tokens.append(found.group(1) or found.group(2))
+        position = found.end()
+    return tokens
+# }}}
+
+# DERIVED: Define a "Parse" function {{{
+# ;---------------------------------------------------------------------------
+# ; Parse:
+# ;     (python source, input names) of an expression. The source reads the
+# ;     n-th input as "get(nN)", expressions of the same shape over other
+# ;     flags share it. Raises ValueError for a malformed expression.
+# ;---------------------------------------------------------------------------
+def parse(expression):
+    tokens = tokenize(expression)
+    inputs = []
+    position = [0]
+
+    def peek():
+        return tokens[position[0]] if position[0] < len(tokens) else None
+
+    def take():
+        token = peek()
+        if token is None:
+            raise ValueError("incomplete expression")
+        position[0] += 1
+        return token
+
+    def parseExpression():
+        terms = [parseTerm()]
+        while peek() == 'or':
+            take()
+            terms.append(parseTerm())
+        return terms[0] if len(terms) == 1 else '(%s)' % (' or '.join(terms))
+
+    def parseTerm():
+        factors = [parseFactor()]
+        while peek() == 'and':
+            take()
+            factors.append(parseFactor())
+        return factors[0] if len(factors) == 1 else '(%s)' % (' and '.join(factors))
+
+    def parseFactor():
+        token = take()
+        if token == 'not':
+            return '(not %s)' % (parseFactor())
+        if token == '(':
+            source = parseExpression()
+            if take() != ')':
+                raise ValueError("missing ')'")
+            return source
+        if token in constants:
+            return constants[token]
+        if token == ')' or token in operators:
+            raise ValueError("unexpected %r" % (token))
+        if token not in inputs:
+            inputs.append(token)
+        return 'get(n%d)' % (inputs.index(token))
+
+    source = parseExpression()
+    if peek() is not None:
+        raise ValueError("unexpected %r" % (peek()))
+    return source, inputs
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# Setup Object Classes {{{
+
+# Setup the derived graph {{{
+# ;---------------------------------------------------------------------------
+# ; Derived Graph:
+# ;     The compiled definitions ({name: expression}). Raises ValueError for
+# ;     a malformed expression or a cycle.
+# ;
+# ;     evaluate(get, assign)            : every derived flag, in rank order
+# ;     propagate(changed, get, assign)  : the flags downstream of "changed",
+# ;                                        returns [(name, value)] of those
+# ;                                        whose value changed
+# ;
+# ;     "get" reads a flag (missing ones falsy), "assign" stores a value.
+# ;---------------------------------------------------------------------------
+class DerivedGraph:
+    def __init__(self, definitions):
+        names = sorted(definitions)
+        sources = []
+        self.inputs = {}
+        for name in names:
+            try:
+                source, inputs = parse(definitions[name])
+            except ValueError, error:
+                raise ValueError("%s: %s" % (name, error))
+            sources.append(source)
+            self.inputs[name] = inputs
+
+        # One compile for the whole graph, a function maker per expression shape
+        shapes = dict((source, len(self.inputs[name])) for name, source in zip(names, sources))
+        makers = {}
+        if shapes:
+            code = compile('(%s,)' % (',\n'.join('lambda %s: lambda get: bool(%s)' % (', '.join(['n%d' % (index) for index in range(count)]), source) for source, count in shapes.iteritems())), '<derived flags>', 'eval')
+            makers = dict(zip(shapes, eval(code, {'__builtins__' : {'bool' : bool, 'True' : True, 'False' : False}})))
+        self.functions = dict((name, makers[source](*self.inputs[name])) for name, source in zip(names, sources))
+
+        self.dependents = {}
+        for name in names:
+            for source in set(self.inputs[name]):
+                self.dependents.setdefault(source, []).append(name)
+
+        self.order = self.rankOrder(names)
+        self.rank = dict((name, index) for index, name in enumerate(self.order))
+
+    def rankOrder(self, names):
+        # Kahn's algorithm over the edges between derived flags
+        pending = dict((name, len(set(source for source in self.inputs[name] if source in self.functions))) for name in names)
+        ready = [name for name in names if not pending[name]]
+        order = []
+        while ready:
+            name = ready.pop()
+            order.append(name)
+            for dependent in self.dependents.get(name, ()):
+                pending[dependent] -= 1
+                if not pending[dependent]:
+                    ready.append(dependent)
+
+        if len(order) < len(names):
+            raise ValueError("cycle: %s" % (' -> '.join(self.findCycle([name for name in names if pending[name]]))))
+        return order
+
+    def findCycle(self, remaining):
+        # Every name left over reads another one left over, walk until one repeats
+        remaining = set(remaining)
+        name = min(remaining)
+        path = []
+        seen = {}
+        while name not in seen:
+            seen[name] = len(path)
+            path.append(name)
+            name = min(source for source in self.inputs[name] if source in remaining)
+        return path[seen[name]:] + [name]
+
+    def __contains__(self, name):
+        return name in self.functions
+
+    def __len__(self):
+        return len(self.functions)
+
+    def evaluate(self, get, assign):
+        functions = self.functions
+        for name in self.order:
+            assign(name, functions[name](get))
+
+    def propagate(self, changed, get, assign):
+        functions = self.functions
+        dependents = self.dependents
+        rank = self.rank
+        order = self.order
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+
+        # The heap holds ranks, an int compares faster than a (rank, name) tuple
+        queued = set()
+        for name in changed:
+            queued.update(rank[dependent] for dependent in dependents.get(name, ()))
+        heap = list(queued)
+        heapq.heapify(heap)
+
+        updated = []
+        while heap:
+            name = order[heappop(heap)]
+            value = functions[name](get)
+            if value == get(name):
+                continue
+
+            assign(name, value)
+            updated.append((name, value))
+            for dependent in dependents.get(name, ()):
+                if rank[dependent] not in queued:
+                    queued.add(rank[dependent])
+                    heappush(heap, rank[dependent])
+        return updated
+# }}}
+
+# Any additional class goes here.
+
+#}}}
+
+# Setup the Evaluate Functions {{{
+
+# DERIVED: Define an "Evaluate Data" function {{{
+# ;---------------------------------------------------------------------------
+# ; Evaluate Data:
+# ;     Adds the derived flags of a merged dictionary to it (in place), with
+# ;     "derived" as their origin. Returns the graph, None without
+# ;     definitions. Raises ValueError as "DerivedGraph".
+# ;---------------------------------------------------------------------------
+def evaluateData(data, origins=None):
+    definitions = data.get(derivedKey)
+    if not definitions:
+        return None
+    if not isinstance(definitions, dict):
+        raise ValueError("%s is not a mapping" % (derivedKey))
+
+    graph = DerivedGraph(definitions)
+    graph.evaluate(data.get, data.__setitem__)
+    if origins is not None:
+        origins.update(dict.fromkeys(graph.order, 'derived'))
+    return graph
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,248 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.emitters
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : The output formats of "list". Every emitter yields the output in chunks of a few
+# ;           thousand flags, the whole listing is never held as one string.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Emitters outline:
+#
+#   emitter(names, get, origins=None) -> text chunks
+#
+#       names   : the flag names to list, in order (a FlagSet name list, a dict)
+#       get     : name -> value (FlagSet.get, dict.__getitem__)
+#       origins : name -> layer, reported by "default", "python" and "jsonl"
+#
+#   mode        output
+#   default     the table, sorted by name:   UNIMOG_MAYA_DEV : [True ]
+#   bash        KEY=0/1 words on one line (what "unimogDev.env" evaluates)
+#   export      export KEY=0/1 lines (bash, zsh, sh), "zsh" is the same
+#   tcsh        setenv KEY 0/1 lines
+#   fish        set -gx KEY 0/1 lines
+#   env0        KEY=0/1 NUL terminated, as "env -0"
+#   dotenv      KEY=0/1 lines
+#   jsonl       {"name": "KEY", "value": true} lines (JSON Lines)
+#   python      a dict literal, {'KEY': True, ...}
+#
+#   The shell formats leave out names that are not valid variable names. A
+#   typed value (see modules/schema.py) is written as its text, quoted for
+#   the shell ("bash" and "dotenv" use the sh quoting, "env0" none). A chunk
+#   is formatted for 0/1 values first, a chunk holding any other value is
+#   formatted again through the encoder of the shell.
+
+# Note: This module is on the fast start path, keep the imports light (no logging, no yaml).
+#       The shell emitters import the render module when they run, the schema module
+#       when they meet a typed value.
+
+# Declare external imports
+from itertools import islice, imap
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[2]"
+
+# Setup the emitter related variables
+chunkSize = 4096
+
+# Setup the Emitter Functions {{{
+
+# EMITTERS: Define a "Chunks" function {{{
+# ;---------------------------------------------------------------------------
+# ; Chunks:
+# ;     The names in lists of "size".
+# ;---------------------------------------------------------------------------
+def chunks(names, size=chunkSize):
+    iterator = iter(names)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+# }}}
+
+# EMITTERS: Define the table emitter {{{
+# ;---------------------------------------------------------------------------
+# ; Emit Table:
+# ;     The "default" table between two empty lines, sorted by name. The
+# ;     sort and the column width only walk the name strings.
+# ;---------------------------------------------------------------------------
+def emitTable(names, get, origins=None):
+    names = sorted(names)
+    yield '\n'
+    if not names:
+        yield '\n'
+        return
+
+    width = max(imap(len, names))
+    for chunk in chunks(names):
+        if origins is None:
+            yield ''.join(['%-*s : [%-5s]\n' % (width, name, get(name)) for name in chunk])
+        else:
+            yield ''.join(['%-*s : [%-5s] (%s)\n' % (width, name, get(name), origins.get(name)) for name in chunk])
+    yield '\n'
+# }}}
+
+# EMITTERS: Define the typed value helper {{{
+# ;---------------------------------------------------------------------------
+# ; Typed Template:
+# ;     The "%s" form of a "%d" line template and the encoder of a shell
+# ;     (see modules/schema.py), for a chunk with typed values.
+# ;---------------------------------------------------------------------------
+def typedTemplate(template, shell):
+    import schema
+
+    return template.replace('%d', '%s'), schema.shellEncoder(shell)
+# }}}
+
+# EMITTERS: Define the shell emitters {{{
+# ;---------------------------------------------------------------------------
+# ; Emit Words:
+# ;     The "bash" mode, space separated KEY=0/1 words on a single line.
+# ;
+# ; Shell Emitter:
+# ;     An emitter writing the export lines of a shell (see the templates of
+# ;     modules/render.py).
+# ;---------------------------------------------------------------------------
+def emitWords(names, get, origins=None):
+    separator = ''
+    for chunk in chunks(names):
+        try:
+            words = ['%s=%d' % (name, get(name)) for name in chunk]
+        except TypeError:
+            template, encode = typedTemplate('%s=%d', 'bash')
+            words = [template % (name, encode(get(name))) for name in chunk]
+        yield separator + ' '.join(words)
+        separator = ' '
+    yield '\n'
+
+def shellEmitter(shell):
+    def emitShell(names, get, origins=None):
+        import render
+
+        template = render.shellTemplates[shell] + '\n'
+        match = render.variablePattern.match
+        for chunk in chunks(names):
+            try:
+                lines = [template % (name, get(name)) for name in chunk if match(name)]
+            except TypeError:
+                textTemplate, encode = typedTemplate(template, shell)
+                lines = [textTemplate % (name, encode(get(name))) for name in chunk if match(name)]
+            yield ''.join(lines)
+    return emitShell
+# }}}
+
+# EMITTERS: Define the line emitters {{{
+# ;---------------------------------------------------------------------------
+# ; Emit Env0 / Emit Dotenv:
+# ;     KEY=0/1 records, NUL or newline terminated.
+# ;
+# ; Emit Json Lines:
+# ;     One JSON object per flag, with its "origin" when given.
+# ;---------------------------------------------------------------------------
+def emitEnv0(names, get, origins=None):
+    for chunk in chunks(names):
+        try:
+            records = ['%s=%d\0' % (name, get(name)) for name in chunk]
+        except TypeError:
+            template, encode = typedTemplate('%s=%d\0', 'env0')
+            records = [template % (name, encode(get(name))) for name in chunk]
+        yield ''.join(records)
+
+def emitDotenv(names, get, origins=None):
+    for chunk in chunks(names):
+        try:
+            records = ['%s=%d\n' % (name, get(name)) for name in chunk]
+        except TypeError:
+            template, encode = typedTemplate('%s=%d\n', 'bash')
+            records = [template % (name, encode(get(name))) for name in chunk]
+        yield ''.join(records)
+
+def jsonValue(value):
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    import json
+    return json.dumps(value, default=str)
+
+def emitJsonLines(names, get, origins=None):
+    from json.encoder import encode_basestring_ascii
+
+    for chunk in chunks(names):
+        if origins is None:
+            yield ''.join(['{"name": %s, "value": %s}\n' % (encode_basestring_ascii(name), jsonValue(get(name))) for name in chunk])
+        else:
+            yield ''.join(['{"name": %s, "value": %s, "origin": %s}\n' % (encode_basestring_ascii(name), jsonValue(get(name)), jsonValue(origins.get(name))) for name in chunk])
+# }}}
+
+# EMITTERS: Define the python emitter {{{
+# ;---------------------------------------------------------------------------
+# ; Emit Python:
+# ;     A dict literal of the flags ((value, origin) tuples with "origins").
+# ;---------------------------------------------------------------------------
+def emitPython(names, get, origins=None):
+    yield '{'
+    separator = ''
+    for chunk in chunks(names):
+        if origins is None:
+            yield separator + ', '.join(['%r: %r' % (name, get(name)) for name in chunk])
+        else:
+            yield separator + ', '.join(['%r: %r' % (name, (get(name), origins.get(name))) for name in chunk])
+        separator = ', '
+    yield '}\n'
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# The emitter of every "list --mode"
+modeEmitters = {'default' : emitTable, 'bash' : emitWords, 'export' : shellEmitter('bash'), 'zsh' : shellEmitter('zsh'),
+                'tcsh' : shellEmitter('tcsh'), 'fish' : shellEmitter('fish'), 'env0' : emitEnv0, 'dotenv' : emitDotenv,
+                'jsonl' : emitJsonLines, 'python' : emitPython}
+
+# Setup the Writer Functions {{{
+
+# EMITTERS: Define an "Emit" function {{{
+# ;---------------------------------------------------------------------------
+# ; Emit:
+# ;     The text chunks of a mode, None for an unknown mode. A chunk turned
+# ;     into unicode by a typed value is encoded as UTF-8.
+# ;
+# ; Write List:
+# ;     Writes the chunks of a mode to "stream" as they are produced.
+# ;     Returns False for an unknown mode (nothing is written).
+# ;---------------------------------------------------------------------------
+def emit(mode, names, get, origins=None):
+    emitter = modeEmitters.get(mode)
+    if emitter is None:
+        return None
+    return encodeChunks(emitter(names, get, origins))
+
+def encodeChunks(emitted):
+    for text in emitted:
+        yield text.encode('utf-8') if isinstance(text, unicode) else text
+
+def writeList(stream, mode, names, get, origins=None):
+    emitted = emit(mode, names, get, origins)
+    if emitted is None:
+        return False
+
+    write = stream.write
+    for text in emitted:
+        write(text)
+    return True
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
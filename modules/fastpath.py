@@ -0,0 +1,220 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.fastpath
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : The fast start path of the unimogDev.py tool. Read-only commands are hand
+# ;           dispatched through the node-local replica, the flag table, the streaming scanner
+# ;           or the fresh merged cache, without argparse, logging or yaml.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Note: Everything imported here is paid on every shell start, keep it that way.
+
+# Declare external imports
+import sys
+import os
+
+# Declare internal imports
+import layers
+import replica
+import scanner
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[5]"
+
+# Setup the Fast Path Functions {{{
+
+# FASTPATH: Define an argument parser {{{
+# ;---------------------------------------------------------------------------
+# ; Parse Arguments:
+# ;     A hand written subset of the argparse setup of unimogDev.py.
+# ;     Returns (verbosity, function, targets, mode) for the supported
+# ;     read-only commands, None for anything else.
+# ;---------------------------------------------------------------------------
+def parseArguments(argv):
+    # Argparse quirk kept on purpose: without "-v" the verbosity resolves to 1
+    verbosity = 1
+    index = 0
+
+    # Global options
+    while index < len(argv) and argv[index].startswith('-'):
+        argument = argv[index]
+        if argument in ('-v', '--verbosity'):
+            if index + 1 >= len(argv):
+                return None
+            value = argv[index + 1]
+            index = index + 2
+        elif argument.startswith('--verbosity='):
+            value = argument[len('--verbosity='):]
+            index = index + 1
+        elif argument.startswith('-v'):
+            value = argument[2:]
+            if value.startswith('='):
+                value = value[1:]
+            index = index + 1
+        else:
+            return None
+
+        try:
+            verbosity = max(min(int(value), 3), 0)
+        except ValueError:
+            return None
+
+    if index >= len(argv):
+        return None
+
+    function = argv[index]
+    rest = argv[index + 1:]
+
+    if function == 'get':
+        # Plain variable names only, globs and "--match" need the name index
+        if not rest or [target for target in rest if target.startswith('-') or '*' in target or '?' in target or '[' in target]:
+            return None
+        return verbosity, function, rest, 'default'
+
+    if function == 'list':
+        if len(rest) == 1 and rest[0].startswith('--mode='):
+            mode = rest[0][len('--mode='):]
+        elif len(rest) == 2 and rest[0] == '--mode':
+            mode = rest[1]
+        else:
+            return None
+        # The default table goes to the full path, the emitter modes are checked when listing
+        if mode in ('', 'default'):
+            return None
+        return verbosity, function, rest, mode
+
+    if function == 'replicate' and not rest:
+        return verbosity, function, rest, 'default'
+
+    return None
+# }}}
+
+# FASTPATH: Define the runner {{{
+# ;---------------------------------------------------------------------------
+# ; Run:
+# ;     Returns True if the command was fully handled, False if the caller
+# ;     has to fall through to the full path (unsupported arguments, a
+# ;     verbose run, a missing or stale merged cache, an unknown variable).
+# ;     With a node-local replica the commands are answered from it. "get"
+# ;     reads a published flag table of the current layers otherwise, or
+# ;     scans the YAML layers and stops at the last requested flag,
+# ;     the merged cache is only read when the scanner gives up. Nothing is
+# ;     written to stdout unless the command is handled.
+# ;---------------------------------------------------------------------------
+def run(argv):
+    parsed = parseArguments(argv)
+    if parsed is None:
+        return False
+
+    verbosity, function, targets, mode = parsed
+
+    # Verbose runs (2, 3) want the debug output of the full path, 0 and 1 print
+    # nothing but the result on success
+    if verbosity > 1:
+        return False
+
+    try:
+        fileName = os.environ['UNIMOG_LOCAL_SITE_CONFIG'] + '/unimogDev.yaml'
+    except KeyError:
+        return False
+
+    # A replica that needs the merged view built goes to the full path
+    if function == 'replicate':
+        return replica.refresh(fileName, force=True) is not None
+
+    # The node-local replica, the shared config is not touched while it is fresh.
+    # Without one the full path builds it (the merged cache needs the yaml loader)
+    data = None
+    if replica.replicaFolder() is not None:
+        if function == 'get':
+            data = replica.lookup(fileName, targets)
+            if data is not None and len(data) != len(set(targets)):
+                data = None
+        if data is None:
+            replicated = replica.loadMerged(fileName)
+            if replicated is None:
+                return False
+            data = replicated[1]
+
+    # A published flag table of the current layers answers a "get" in place
+    if data is None and function == 'get':
+        import flagtable
+
+        stack = layers.layerStack(fileName)
+        data = flagtable.lookup(fileName, targets, stack)
+        if data is not None and len(data) != len(set(targets)):
+            data = None
+
+    # A "get" stops reading as soon as every requested flag is found (when the
+    # merged cache vouches for a stack without derived flags)
+    if data is None and function == 'get':
+        try:
+            derivedFree = layers.mergedDerived(fileName, layers.stackSignature(stack)) is False
+            data = scanner.scanLayers(stack, targets, derivedFree)
+        except (IOError, OSError):
+            return False
+        if data is not None and len(data) != len(set(targets)):
+            return False
+
+    # The merged view of every layer, only when none of them changed since
+    if data is None:
+        merged = layers.readMerged(fileName, layers.stackSignature(layers.layerStack(fileName)))
+        if merged is None or not isinstance(merged[0], dict) or 'error' in merged[0]:
+            return False
+        data = merged[0]
+
+    # The reserved keys (the derived definitions) are no flags
+    for key in layers.reservedKeys:
+        data.pop(key, None)
+
+    # A list is streamed by its emitter, a value it can not format (and an unknown
+    # mode) leave it to the full path before anything is written
+    if function == 'list':
+        import emitters
+
+        if mode not in emitters.modeEmitters:
+            return False
+        try:
+            emitted = emitters.emit(mode, data, data.__getitem__)
+            first = next(emitted, '')
+        except (TypeError, ValueError):
+            return False
+        sys.stdout.write(first)
+        for text in emitted:
+            sys.stdout.write(text)
+        return True
+
+    try:
+        values = [data[target] for target in targets]
+    except KeyError:
+        return False
+
+    # A typed value is printed as its text (see modules/schema.py)
+    if [value for value in values if value is not True and value is not False]:
+        import schema
+
+        texts = [schema.textValue(value) for value in values]
+    else:
+        texts = ["1" if value else "0" for value in values]
+
+    if len(targets) == 1:
+        output = texts[0]
+    else:
+        output = '\n'.join('{}={}'.format(target, text) for target, text in zip(targets, texts))
+
+    sys.stdout.write(output + '\n')
+    return True
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,517 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.flagtable
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : The flag table, a fixed layout binary copy of the merged flags published beside
+# ;           the config. Every process of a workstation maps the same pages and looks the flags
+# ;           up in place, nothing is parsed or copied per process.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Flag table outline:
+#
+#   <config>.table, little endian:
+#
+#   0   header (64 bytes)   magic "UFT1", version, generation (u64), state
+#                           (1 once superseded), signature (crc32 of the stack
+#                           signature), count, slots, the offsets of the
+#                           entries, names, values and extras
+#   64  index               "slots" u32, open addressing on crc32(name), the
+#                           entry number + 1 (0 for a free slot)
+#       entries             "count" (name offset, name length) u32 pairs, in
+#                           name order
+#       names               the names, back to back
+#       values              one byte per entry: 0 false, 1 true, 2 in extras
+#       extras              the marshalled {entry: value} of the other values
+#
+#   "unimogDev.py publish" writes the first table, from then on every commit
+#   keeps it current: the changed values are written in place, anything else
+#   (a new name, a value that is no bool) publishes a new table, written
+#   aside and renamed over the old one, which is marked superseded. The
+#   generation is a sequence lock, odd while a writer is changing the values
+#   and one step further once it is done. A reader takes the value between two
+#   reads of an even, equal generation and maps the table again once it is
+#   superseded. The signature is the stat signature of the layers the values
+#   belong to, a layer edited by hand (not through the tool) makes it stale.
+#   A reader waits for an odd generation a bounded time, and not at all once
+#   the lock of the writers is free (a writer killed halfway), the table is
+#   then busy and "lookup" falls back like without a table. The next commit
+#   makes the generation even again.
+#
+#   In a session:
+#
+#       import modules.flagtable as flagtable
+#       table = flagtable.FlagTable(configFile)
+#       table.get('UNIMOG_MAYA_DEV')
+#       table.refresh()         # True when the flags changed since the last call
+
+# Note: This module is on the fast start path, keep the imports light (no logging, no yaml).
+#       The writers import fcntl when they run.
+
+# Declare external imports
+import os
+import time
+import errno
+import mmap
+import zlib
+import struct
+import marshal
+
+# Declare internal imports
+import layers
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[3]"
+
+# Setup the flag table related variables
+tableSuffix = '.table'
+tableMagic = 'UFT1'
+tableVersion = 1
+headerStruct = struct.Struct('<4sIQIIIIIIIII')
+headerSize = 64
+stampStruct = struct.Struct('<QI')
+generationStruct = struct.Struct('<Q')
+slotStruct = struct.Struct('<I')
+entryStruct = struct.Struct('<II')
+signatureOffset = 20
+stateOffset = 16
+generationOffset = 8
+
+# The reads of an odd generation before the writer lock is checked, and in all
+spinRetries = 1000
+stampRetries = 3000
+
+# Setup the Flag Table Functions {{{
+
+# FLAGTABLE: Define the path functions {{{
+# ;---------------------------------------------------------------------------
+# ; Table Path / Lock Path:
+# ;     The flag table of a config file and the lock file of its writers.
+# ;
+# ; Signature Digest:
+# ;     The crc32 a stack signature is stored as.
+# ;---------------------------------------------------------------------------
+def tablePath(fileName):
+    return fileName + tableSuffix
+
+def lockPath(fileName):
+    return tablePath(fileName) + '.lock'
+
+def exists(fileName):
+    return os.path.isfile(tablePath(fileName))
+
+def signatureDigest(signature):
+    return zlib.crc32(marshal.dumps(signature)) & 0xffffffff
+# }}}
+
+# FLAGTABLE: Define a "Build Table" function {{{
+# ;---------------------------------------------------------------------------
+# ; Build Table:
+# ;     The content of a table holding the flags of "data" (the reserved
+# ;     keys left out).
+# ;---------------------------------------------------------------------------
+def buildTable(data, digest, generation):
+    from array import array
+
+    names = sorted(name for name in data if name not in layers.reservedKeys)
+    count = len(names)
+    slots = 8
+    while slots < count * 2:
+        slots = slots << 1
+    mask = slots - 1
+
+    index = array('I', [0]) * slots
+    entries = array('I')
+    values = bytearray(count)
+    extras = {}
+    offset = 0
+    for entry, name in enumerate(names):
+        slot = zlib.crc32(name) & mask
+        while index[slot]:
+            slot = (slot + 1) & mask
+        index[slot] = entry + 1
+        entries.append(offset)
+        entries.append(len(name))
+        offset = offset + len(name)
+
+        value = data[name]
+        if value is True:
+            values[entry] = 1
+        elif value is not False:
+            values[entry] = 2
+            extras[entry] = value
+
+    if struct.pack('=I', 1) != struct.pack('<I', 1):
+        index.byteswap()
+        entries.byteswap()
+
+    extrasContent = marshal.dumps(extras) if extras else ''
+    entriesOffset = headerSize + slots * 4
+    namesOffset = entriesOffset + count * entryStruct.size
+    valuesOffset = namesOffset + offset
+    extrasOffset = valuesOffset + count
+    header = headerStruct.pack(tableMagic, tableVersion, generation, 0, digest, count, slots, entriesOffset, namesOffset, valuesOffset, extrasOffset, len(extrasContent))
+    return ''.join([header.ljust(headerSize, '\0'), index.tostring(), entries.tostring(), ''.join(names), str(values), extrasContent])
+# }}}
+
+# FLAGTABLE: Define the writer functions {{{
+# ;---------------------------------------------------------------------------
+# ; Table Lock:
+# ;     The lock file of the table writers, held (flock) by the returned
+# ;     stream until it is closed.
+# ;
+# ; Publish:
+# ;     Writes the flags of "data" as a new table, "signature" is the stack
+# ;     signature they were merged from. Nothing is published when the stack
+# ;     changed meanwhile (a commit already took the table further). Returns
+# ;     True once published.
+# ;
+# ; Update:
+# ;     Writes the [(name, value)] changes of a commit into the table in
+# ;     place and moves it from the stack signature "previous" to
+# ;     "signature". Returns False when the table can not take them (a table
+# ;     of another signature, a name it does not hold, a value that is no
+# ;     bool) and has to be published again, True otherwise (also without a
+# ;     table).
+# ;
+# ; Remove:
+# ;     Removes the table, its readers see it superseded.
+# ;---------------------------------------------------------------------------
+def tableLock(fileName):
+    import fcntl
+
+    lockStream = open(lockPath(fileName), 'a')
+    fcntl.flock(lockStream.fileno(), fcntl.LOCK_EX)
+    return lockStream
+
+def readHeader(content):
+    header = headerStruct.unpack_from(content, 0)
+    if header[0] != tableMagic or header[1] != tableVersion:
+        raise ValueError("Not a flag table")
+    return header
+
+def writerActive(fileName):
+    # True while a writer holds the lock, the readers only probe it
+    import fcntl
+
+    try:
+        lockStream = open(lockPath(fileName), 'r')
+    except (IOError, OSError):
+        return False
+    try:
+        fcntl.flock(lockStream.fileno(), fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except (IOError, OSError), error:
+        if error.errno in (errno.EWOULDBLOCK, errno.EAGAIN, errno.EACCES):
+            return True
+        raise
+    finally:
+        lockStream.close()
+    return False
+
+def supersede(path):
+    # Marks the table at "path" superseded, None if there is none
+    try:
+        outStream = open(path, 'r+b')
+    except (IOError, OSError):
+        return None
+    try:
+        header = readHeader(outStream.read(headerSize))
+        outStream.seek(stateOffset)
+        outStream.write(slotStruct.pack(1))
+        return header[2]
+    except (ValueError, struct.error):
+        return None
+    finally:
+        outStream.close()
+
+def publish(fileName, data, signature):
+    import socket
+
+    targetName = tablePath(fileName)
+    lockStream = tableLock(fileName)
+    try:
+        if layers.stackSignature(layers.layerStack(fileName)) != signature:
+            return False
+
+        try:
+            previous = readHeader(open(targetName, 'rb').read(headerSize))[2]
+        except (IOError, OSError, ValueError, struct.error):
+            previous = 0
+        content = buildTable(data, signatureDigest(signature), (previous | 1) + 1)
+
+        tempName = "%s.%s.%d.tmp" % (targetName, socket.gethostname(), os.getpid())
+        try:
+            outStream = open(tempName, 'wb')
+            try:
+                outStream.write(content)
+            finally:
+                outStream.close()
+
+            # The old table is marked once the new one is in place, a reader
+            # that maps it again finds the new one
+            oldStream = None
+            try:
+                oldStream = open(targetName, 'r+b')
+            except (IOError, OSError):
+                pass
+            try:
+                os.rename(tempName, targetName)
+                if oldStream is not None:
+                    oldStream.seek(stateOffset)
+                    oldStream.write(slotStruct.pack(1))
+            finally:
+                if oldStream is not None:
+                    oldStream.close()
+        except (IOError, OSError):
+            try:
+                os.remove(tempName)
+            except OSError:
+                pass
+            raise
+        return True
+    finally:
+        lockStream.close()
+
+def update(fileName, items, previous, signature):
+    targetName = tablePath(fileName)
+    if not os.path.isfile(targetName):
+        return True
+
+    lockStream = tableLock(fileName)
+    try:
+        try:
+            outStream = open(targetName, 'r+b')
+        except (IOError, OSError):
+            return True
+        try:
+            mapped = mmap.mmap(outStream.fileno(), 0)
+        except (EnvironmentError, ValueError):
+            outStream.close()
+            return False
+
+        try:
+            try:
+                table = TableView(mapped)
+            except (ValueError, struct.error):
+                return False
+
+            if slotStruct.unpack_from(mapped, signatureOffset)[0] != signatureDigest(previous):
+                return False
+
+            changes = []
+            for name, value in items:
+                entry = table.find(name)
+                if entry < 0 or (value is not True and value is not False):
+                    return False
+                changes.append((table.valuesOffset + entry, '\1' if value else '\0'))
+
+            # The sequence lock: odd while the values change
+            generation = generationStruct.unpack_from(mapped, generationOffset)[0]
+            generationStruct.pack_into(mapped, generationOffset, generation | 1)
+            for offset, value in changes:
+                mapped[offset] = value
+            slotStruct.pack_into(mapped, signatureOffset, signatureDigest(signature))
+            generationStruct.pack_into(mapped, generationOffset, (generation | 1) + 1)
+            return True
+        finally:
+            mapped.close()
+            outStream.close()
+    finally:
+        lockStream.close()
+
+def remove(fileName):
+    lockStream = tableLock(fileName)
+    try:
+        if supersede(tablePath(fileName)) is None:
+            return False
+        os.remove(tablePath(fileName))
+        return True
+    finally:
+        lockStream.close()
+# }}}
+
+# FLAGTABLE: Define a "Lookup" function {{{
+# ;---------------------------------------------------------------------------
+# ; Lookup:
+# ;     {name: value} of the given names found in the table (for "get"),
+# ;     None when there is no table (or it was removed meanwhile), it is busy
+# ;     or it does not belong to the layers of "stack".
+# ;---------------------------------------------------------------------------
+def lookup(fileName, names, stack):
+    try:
+        table = FlagTable(fileName)
+    except (EnvironmentError, ValueError, struct.error):
+        return None
+
+    try:
+        if table.signature() != signatureDigest(layers.stackSignature(stack)):
+            return None
+        found = {}
+        for name in names:
+            value = table.get(name, found)
+            if value is not found:
+                found[name] = value
+        return found
+    except (EnvironmentError, ValueError, struct.error):
+        return None
+    finally:
+        table.close()
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# Setup Object Classes {{{
+
+# Setup the table view {{{
+# ;---------------------------------------------------------------------------
+# ; Table View:
+# ;     The layout of a mapped table. "find" returns the entry of a name
+# ;     (-1 if the table does not hold it), it reads the index and the name
+# ;     bytes in place.
+# ;---------------------------------------------------------------------------
+class TableView:
+    def __init__(self, mapped):
+        header = readHeader(mapped)
+        self.map = mapped
+        self.count, self.slots, self.entriesOffset, self.namesOffset, self.valuesOffset, self.extrasOffset, self.extrasLength = header[5:]
+        self.mask = self.slots - 1
+
+    def find(self, name):
+        mapped = self.map
+        unpackSlot = slotStruct.unpack_from
+        indexOffset = headerSize
+        slot = zlib.crc32(name) & self.mask
+        while True:
+            entry = unpackSlot(mapped, indexOffset + slot * 4)[0]
+            if not entry:
+                return -1
+            offset, length = entryStruct.unpack_from(mapped, self.entriesOffset + (entry - 1) * entryStruct.size)
+            if length == len(name):
+                start = self.namesOffset + offset
+                if mapped[start:start + length] == name:
+                    return entry - 1
+            slot = (slot + 1) & self.mask
+# }}}
+
+# Setup the flag table reader {{{
+# ;---------------------------------------------------------------------------
+# ; Flag Table:
+# ;     The read-only mapping of the table of a config file. Raises IOError
+# ;     (OSError) without a table (also once it is removed), ValueError for
+# ;     a file that is none or a busy table (left odd by a dead writer).
+# ;
+# ;     get(name, default)  : the value, under the sequence lock
+# ;     refresh()           : True when the generation moved since the last
+# ;                           call (a commit, a new table)
+# ;     stale()             : True when the layers changed without the table
+# ;                           (an edit by hand), it costs a stat per layer
+# ;---------------------------------------------------------------------------
+class FlagTable:
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.path = tablePath(fileName)
+        self.view = None
+        self.map = None
+        self.extras = None
+        self.seen = None
+        self.open()
+
+    def open(self):
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            mapped = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        try:
+            view = TableView(mapped)
+        except (ValueError, struct.error):
+            mapped.close()
+            raise ValueError("Not a flag table: %s" % (self.path))
+
+        self.close()
+        self.view = view
+        self.map = mapped
+        self.extras = None
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def stamp(self):
+        # An even generation of the current table, a writer only keeps it odd for a few writes
+        for attempt in xrange(stampRetries):
+            generation, state = stampStruct.unpack_from(self.map, generationOffset)
+            if state:
+                self.open()
+            elif not generation & 1:
+                return generation
+            elif attempt >= spinRetries:
+                if not writerActive(self.fileName):
+                    break
+                time.sleep(0.0001)
+        raise ValueError("The flag table is busy: %s" % (self.path))
+
+    def get(self, name, default=None):
+        while True:
+            generation = self.stamp()
+            view = self.view
+            entry = view.find(name)
+            value = self.map[view.valuesOffset + entry] if entry >= 0 else None
+            if stampStruct.unpack_from(self.map, generationOffset) == (generation, 0):
+                break
+
+        if value is None:
+            return default
+        if value == '\2':
+            if self.extras is None:
+                self.extras = marshal.loads(self.map[view.extrasOffset:view.extrasOffset + view.extrasLength])
+            return self.extras.get(entry, default)
+        return value == '\1'
+
+    def __getitem__(self, name):
+        value = self.get(name, self)
+        if value is self:
+            raise KeyError(name)
+        return value
+
+    def __contains__(self, name):
+        return self.get(name, self) is not self
+
+    def __len__(self):
+        self.stamp()
+        return self.view.count
+
+    def generation(self):
+        return self.stamp()
+
+    def signature(self):
+        while True:
+            generation = self.stamp()
+            digest = slotStruct.unpack_from(self.map, signatureOffset)[0]
+            if stampStruct.unpack_from(self.map, generationOffset) == (generation, 0):
+                return digest
+
+    def refresh(self):
+        generation = self.stamp()
+        changed = self.seen is not None and generation != self.seen
+        self.seen = generation
+        return changed
+
+    def stale(self):
+        return self.signature() != signatureDigest(layers.stackSignature(layers.layerStack(self.fileName)))
+# }}}
+
+# Any additional class goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
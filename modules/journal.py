@@ -0,0 +1,240 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.journal
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : The append-only mutation journal of a config layer. Commits append one record per
+# ;           changed flag instead of rewriting the YAML, compaction folds them back into it.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Journal outline:
+#
+#   <config>.journal    : the records not folded into the YAML yet
+#   <config>.history    : the records of every compaction, appended in order
+#
+#   One record per line, "<time> <name> <old> <new>\n", the values are "1",
+#   "0", "-" (no such flag) or "=" followed by the repr of any other value
+#   (written without spaces, "\x20" in a string):
+#
+#       1792303712.418230 UNIMOG_NUKE_DEV 1 0
+#
+#   The state of a layer is its YAML with the journal replayed on top (the
+#   records hold absolute values, replaying one twice changes nothing). A
+#   reader reads the journal before the YAML: a compaction in between gives
+#   the new YAML, which already holds the journal. A torn last line (a commit
+#   still writing) is ignored. Point in time reads walk the history and the
+#   journal backwards, restoring the old values. Only changes committed
+#   through the journal have a history, edits of the YAML itself do not.
+
+# Note: This module is on the fast start path, keep the imports light (no logging, no yaml).
+
+# Declare external imports
+import os
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[2]"
+
+# Setup the journal related variables
+journalSuffix = '.journal'
+historySuffix = '.history'
+
+# A journal beyond this size is compacted by the commit that grew it
+compactBytes = 1 << 16
+
+# Setup the Journal Functions {{{
+
+# JOURNAL: Define the path functions {{{
+# ;---------------------------------------------------------------------------
+# ; Journal / History Path:
+# ;     The journal and history files of a config layer.
+# ;---------------------------------------------------------------------------
+def journalPath(fileName):
+    return fileName + journalSuffix
+
+def historyPath(fileName):
+    return fileName + historySuffix
+# }}}
+
+# JOURNAL: Define the record functions {{{
+# ;---------------------------------------------------------------------------
+# ; Encode / Decode Value, Format / Parse Records:
+# ;     Records are (time, name, old, new) tuples, None stands for a flag
+# ;     that does not exist. "parseRecords" drops a torn last line.
+# ;
+# ; Literal Text:
+# ;     The repr of a value without a space, the fields of a record are
+# ;     split on them.
+# ;---------------------------------------------------------------------------
+def encodeValue(value):
+    if value is None:
+        return '-'
+    if value is True:
+        return '1'
+    if value is False:
+        return '0'
+    return '=' + literalText(value)
+
+def literalText(value):
+    if isinstance(value, (list, tuple)):
+        items = ','.join(literalText(item) for item in value)
+        if isinstance(value, list):
+            return '[%s]' % (items)
+        return '(%s,)' % (items) if items else '()'
+    if isinstance(value, dict):
+        return '{%s}' % (','.join('%s:%s' % (literalText(key), literalText(item)) for key, item in value.iteritems()))
+    return repr(value).replace(' ', '\\x20')
+
+def decodeValue(text):
+    if text == '1':
+        return True
+    if text == '0':
+        return False
+    if text == '-':
+        return None
+    import ast
+    return ast.literal_eval(text[1:])
+
+def formatRecords(records):
+    return ''.join('%.6f %s %s %s\n' % (timestamp, name, encodeValue(old), encodeValue(new)) for timestamp, name, old, new in records)
+
+def parseRecords(content):
+    records = []
+    end = content.rfind('\n') + 1
+    for line in content[:end].splitlines():
+        fields = line.split(' ')
+        if len(fields) != 4:
+            continue
+        records.append((float(fields[0]), fields[1], decodeValue(fields[2]), decodeValue(fields[3])))
+    return records
+# }}}
+
+# JOURNAL: Define the read functions {{{
+# ;---------------------------------------------------------------------------
+# ; Read Journal / Read History:
+# ;     The raw journal content ("" without a journal), the parsed records
+# ;     of the history followed by the journal.
+# ;---------------------------------------------------------------------------
+def readFile(path):
+    try:
+        inStream = open(path, 'rb')
+    except (IOError, OSError):
+        return ''
+    try:
+        return inStream.read()
+    finally:
+        inStream.close()
+
+def readJournal(fileName):
+    return readFile(journalPath(fileName))
+
+def readHistory(fileName):
+    return parseRecords(readFile(historyPath(fileName))) + parseRecords(readJournal(fileName))
+# }}}
+
+# JOURNAL: Define a "Replay" function {{{
+# ;---------------------------------------------------------------------------
+# ; Replay:
+# ;     Applies the records of a journal content to a layer dictionary (in
+# ;     place). Returns the number of records.
+# ;---------------------------------------------------------------------------
+def replay(data, content):
+    records = parseRecords(content)
+    for timestamp, name, old, new in records:
+        if new is None:
+            data.pop(name, None)
+        else:
+            data[name] = new
+    return len(records)
+# }}}
+
+# JOURNAL: Define a "Lookup" function {{{
+# ;---------------------------------------------------------------------------
+# ; Lookup:
+# ;     {name: value} of the last journal record of each requested name, for
+# ;     the streaming scanner. A name whose last record removed the flag maps
+# ;     to None.
+# ;---------------------------------------------------------------------------
+def lookup(fileName, names):
+    content = readJournal(fileName)
+    found = {}
+    if not content:
+        return found
+
+    wanted = set(names)
+    for timestamp, name, old, new in parseRecords(content):
+        if name in wanted:
+            found[name] = new
+    return found
+# }}}
+
+# JOURNAL: Define a "Rewind" function {{{
+# ;---------------------------------------------------------------------------
+# ; Rewind:
+# ;     Turns the current state of a layer (in place) into its state at
+# ;     "timestamp" by restoring the old values of the later records.
+# ;---------------------------------------------------------------------------
+def rewind(data, fileName, timestamp):
+    for recordTime, name, old, new in reversed(readHistory(fileName)):
+        if recordTime <= timestamp:
+            break
+        if old is None:
+            data.pop(name, None)
+        else:
+            data[name] = old
+    return data
+# }}}
+
+# JOURNAL: Define an "Append" function {{{
+# ;---------------------------------------------------------------------------
+# ; Append:
+# ;     Appends the records with a single write and syncs them. Returns the
+# ;     size of the journal afterwards.
+# ;---------------------------------------------------------------------------
+def append(fileName, records):
+    outStream = open(journalPath(fileName), 'ab')
+    try:
+        outStream.write(formatRecords(records))
+        outStream.flush()
+        os.fsync(outStream.fileno())
+        return os.fstat(outStream.fileno()).st_size
+    finally:
+        outStream.close()
+# }}}
+
+# JOURNAL: Define an "Archive" function {{{
+# ;---------------------------------------------------------------------------
+# ; Archive:
+# ;     The second half of a compaction, called once the YAML holds the
+# ;     replayed state: moves the journal records to the history. A crash in
+# ;     between leaves them in both, replaying or rewinding one twice gives
+# ;     the same state.
+# ;---------------------------------------------------------------------------
+def archive(fileName):
+    content = readJournal(fileName)
+    if content:
+        content = content[:content.rfind('\n') + 1]
+        outStream = open(historyPath(fileName), 'ab')
+        try:
+            outStream.write(content)
+            outStream.flush()
+            os.fsync(outStream.fileno())
+        finally:
+            outStream.close()
+
+    try:
+        os.remove(journalPath(fileName))
+    except OSError:
+        pass
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,252 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.layers
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : The layered configuration stack (site, localsite, show, user) and the cached
+# ;           merged view of it, keyed on the stat signatures of every layer.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Layer outline:
+#
+#   site        : $UNIMOG_SITE_CONFIG/unimogDev.yaml          (global site, optional)
+#   localsite   : $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml    (the writable layer)
+#   show        : $UNIMOG_SHOW_CONFIG/unimogDev.yaml          (per show, optional)
+#   user        : $UNIMOG_USER_CONFIG/unimogDev.yaml          (per user, optional)
+#
+#   Later layers override earlier ones. "set" / "unset" only ever write the
+#   localsite layer, a flag of another layer is copied into it as an override.
+#   The merged view is cached in "<localsite config>.merged". The journal of
+#   a layer ("<config>.journal", see modules/journal.py) is part of its state.
+#   The reserved keys ("__derived__", "__schema__") are no flags, they are
+#   merged on their own and left out of every flag output. A sharded layer (see
+#   modules/shards.py) is one layer, its manifest and shards are part of its
+#   signature.
+
+# Note: This module is on the fast start path, keep the imports light (no logging, no yaml).
+
+# Declare external imports
+import os
+import sys
+import marshal
+
+# Declare internal imports
+import journal
+import shards
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[7]"
+
+# Setup the layer related variables
+layerVariables = (('site', 'UNIMOG_SITE_CONFIG'), ('localsite', 'UNIMOG_LOCAL_SITE_CONFIG'), ('show', 'UNIMOG_SHOW_CONFIG'), ('user', 'UNIMOG_USER_CONFIG'))
+mergedTag = 'UNIMOG_MERGED'
+mergedVersion = 3
+mergedSuffix = '.merged'
+stackSeparator = '|'
+
+# The keys of a layer that are no flags (see modules/derived.py, modules/schema.py)
+derivedKey = '__derived__'
+schemaKey = '__schema__'
+reservedKeys = (derivedKey, schemaKey)
+
+# Setup the Layer Functions {{{
+
+# LAYERS: Define a "Layer Stack" function {{{
+# ;---------------------------------------------------------------------------
+# ; Layer Stack:
+# ;     Returns the [(label, path), ...] stack for the given localsite config
+# ;     file, lowest priority first. Layers without an environment variable
+# ;     are left out, a folder shared by two layers is used once (at the
+# ;     position of the later one).
+# ;---------------------------------------------------------------------------
+def layerStack(fileName):
+    stack = []
+    for label, variable in layerVariables:
+        if label == 'localsite':
+            path = fileName
+        elif os.environ.get(variable):
+            path = os.path.join(os.environ[variable], 'unimogDev.yaml')
+        else:
+            continue
+
+        realPath = os.path.realpath(path)
+        stack = [layer for layer in stack if os.path.realpath(layer[1]) != realPath]
+        stack.append((label, path))
+    return stack
+# }}}
+
+# LAYERS: Define a "Stack Key" function {{{
+# ;---------------------------------------------------------------------------
+# ; Stack Key:
+# ;     The folders of the layer variables of an environment (this process
+# ;     by default) joined by "|", as "unimogDev.sh" and "unimogDev.env"
+# ;     spell the stack of a shell. Caches shared by several stacks (the
+# ;     daemon, the replica) are only used by the stack they were made for.
+# ;---------------------------------------------------------------------------
+def stackKey(environment=None):
+    if environment is None:
+        environment = os.environ
+    return stackSeparator.join(environment.get(variable, '') for label, variable in layerVariables)
+# }}}
+
+# LAYERS: Define the "Stack Signature" / "Layer Files" functions {{{
+# ;---------------------------------------------------------------------------
+# ; Stack Signature:
+# ;     The (label, inode, size, mtime, ctime) of every layer, None for the
+# ;     stat part of a layer file that does not exist, followed by the
+# ;     (size, mtime) of its journal, None without one, and the (inode,
+# ;     size, mtime) of the manifest and shards of a sharded layer.
+# ;
+# ; Layer Files:
+# ;     The files holding the state of a layer: its YAML, its journal, the
+# ;     manifest and the shards of a sharded one.
+# ;---------------------------------------------------------------------------
+def stackSignature(stack):
+    signature = []
+    for label, path in stack:
+        try:
+            stat = os.stat(path)
+            layerSignature = (label, path, stat.st_ino, stat.st_size, stat.st_mtime, stat.st_ctime)
+        except OSError:
+            layerSignature = (label, path, None)
+
+        try:
+            stat = os.stat(journal.journalPath(path))
+            layerSignature = layerSignature + (stat.st_size, stat.st_mtime)
+        except OSError:
+            layerSignature = layerSignature + (None,)
+
+        for shardFile in shards.layerFiles(path):
+            try:
+                stat = os.stat(shardFile)
+                layerSignature = layerSignature + ((stat.st_ino, stat.st_size, stat.st_mtime),)
+            except OSError:
+                layerSignature = layerSignature + (None,)
+        signature.append(layerSignature)
+    return tuple(signature)
+
+def layerFiles(path):
+    return [path, journal.journalPath(path)] + shards.layerFiles(path)
+# }}}
+
+# LAYERS: Define a "Merge" function {{{
+# ;---------------------------------------------------------------------------
+# ; Merge Layers:
+# ;     Merges [(label, dictionary), ...] (lowest priority first) into a
+# ;     single dictionary. Returns (data, origins), "origins" maps every
+# ;     name to the label of the layer its value came from. The derived
+# ;     definitions and the schema declarations of the layers are merged per
+# ;     name, they are evaluated by the caller (see modules/derived.py).
+# ;---------------------------------------------------------------------------
+def mergeLayers(layerData):
+    data = {}
+    origins = {}
+    definitions = dict((key, {}) for key in reservedKeys)
+    for label, dictionary in layerData:
+        data.update(dictionary)
+        origins.update(dict.fromkeys(dictionary, label))
+        for key in reservedKeys:
+            if isinstance(dictionary.get(key), dict):
+                definitions[key].update(dictionary[key])
+
+    # The reserved definitions merge per name
+    for key in reservedKeys:
+        if definitions[key]:
+            data[key] = definitions[key]
+        origins.pop(key, None)
+    return data, origins
+# }}}
+
+# LAYERS: Define the merged cache functions {{{
+# ;---------------------------------------------------------------------------
+# ; Merged Cache:
+# ;     The marshalled (data, origins) of a stack, stored beside the
+# ;     localsite config. "readMerged" returns None unless the cache was
+# ;     written for the very same stack signature, "writeMerged" stores it
+# ;     atomically (transaction.writeAtomic) and returns False on failure, the
+# ;     cache is never required.
+# ;
+# ;     The cache starts with a small header of its own, "mergedDerived" only
+# ;     reads that one: whether the stack defines derived flags, None unless
+# ;     the cache was written for the given signature.
+# ;---------------------------------------------------------------------------
+def mergedPath(fileName):
+    return fileName + mergedSuffix
+
+def readMergedHeader(inStream, signature):
+    try:
+        header = marshal.load(inStream)
+        tag, version, pythonVersion, storedSignature, hasDerived = header
+    except (EOFError, ValueError, TypeError):
+        return None
+
+    if tag != mergedTag or version != mergedVersion:
+        return None
+    if pythonVersion != tuple(sys.version_info[:2]) or storedSignature != signature:
+        return None
+
+    return hasDerived
+
+def mergedDerived(fileName, signature):
+    try:
+        inStream = open(mergedPath(fileName), 'rb')
+    except (IOError, OSError):
+        return None
+
+    try:
+        return readMergedHeader(inStream, signature)
+    finally:
+        inStream.close()
+
+def readMerged(fileName, signature):
+    try:
+        inStream = open(mergedPath(fileName), 'rb')
+    except (IOError, OSError):
+        return None
+
+    try:
+        if readMergedHeader(inStream, signature) is None:
+            return None
+        try:
+            record = marshal.load(inStream)
+        except (EOFError, ValueError, TypeError):
+            return None
+    finally:
+        inStream.close()
+
+    try:
+        data, origins = record
+    except (TypeError, ValueError):
+        return None
+
+    return data, origins
+
+def writeMerged(fileName, signature, data, origins):
+    try:
+        header = (mergedTag, mergedVersion, tuple(sys.version_info[:2]), signature, derivedKey in data)
+        payload = marshal.dumps(header) + marshal.dumps((data, origins))
+    except ValueError:
+        return False
+
+    # Only a writer pays for the transaction imports
+    import transaction
+
+    try:
+        transaction.writeAtomic(mergedPath(fileName), payload, durable=False)
+    except (IOError, OSError):
+        return False
+
+    return True
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,180 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.logqueue
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : A queue backed log writer. The logger only hands the records to a queue, a
+# ;           background thread writes them to the console and the optional rotating log file.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Log queue outline:
+#
+#   logger -> QueueHandler (verbosity filter) -> Queue -> QueueListener thread
+#                                                           -> console (stderr)
+#                                                           -> log file (rotating, optional)
+#
+#   The message is formatted when the record is queued (its arguments may be
+#   objects changed right after the call), the formatter, the stream writes and
+#   the file rotation happen on the writer thread. The writer is drained and
+#   stopped at exit, so "sys.exit" paths lose no record.
+#
+#   A fork while the writer thread holds the queue or a handler lock leaves
+#   that lock held forever in the child, the writers are paused around it.
+
+# Note: Python 2 has no logging.handlers.QueueHandler / QueueListener, these are
+#       the minimal versions of both.
+
+# Declare external imports
+import Queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[3]"
+
+# Setup the log queue related variables
+logFileBytes = 1 << 20
+logFileBackups = 3
+
+# The started writers, paused around a fork
+writers = []
+
+# Setup the Log Queue Functions {{{
+
+# LOGQUEUE: Define a "Start Writer" function {{{
+# ;---------------------------------------------------------------------------
+# ; Start Writer:
+# ;     Attaches a queue handler (with the given filters) to the logger and
+# ;     starts a writer thread feeding the given handlers. The writer is
+# ;     stopped at exit. Returns the listener.
+# ;---------------------------------------------------------------------------
+def startWriter(logger, handlers, filters=()):
+    recordQueue = Queue.Queue()
+
+    queueHandler = QueueHandler(recordQueue)
+    for recordFilter in filters:
+        queueHandler.addFilter(recordFilter)
+
+    listener = QueueListener(recordQueue, handlers)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger.addHandler(queueHandler)
+    writers.append(listener)
+    return listener
+# }}}
+
+# LOGQUEUE: Define the "Pause Writers" / "Resume Writers" functions {{{
+# ;---------------------------------------------------------------------------
+# ; Pause Writers / Resume Writers:
+# ;     Stop the writer threads (the queued records are written first) before
+# ;     a fork and start them again after it. The records logged meanwhile
+# ;     wait in the queue.
+# ;---------------------------------------------------------------------------
+def pauseWriters():
+    for listener in writers:
+        listener.stop()
+
+def resumeWriters():
+    for listener in writers:
+        listener.start()
+# }}}
+
+# LOGQUEUE: Define a "Log File Handler" function {{{
+# ;---------------------------------------------------------------------------
+# ; Log File Handler:
+# ;     A size rotated file handler ("<file>.1" ... "<file>.N" keep the older
+# ;     records).
+# ;---------------------------------------------------------------------------
+def logFileHandler(fileName, maxBytes=logFileBytes, backupCount=logFileBackups):
+    return logging.handlers.RotatingFileHandler(fileName, maxBytes=maxBytes, backupCount=backupCount)
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# Setup Object Classes {{{
+
+# Setup the queue handler {{{
+# ;---------------------------------------------------------------------------
+# ; Queue Handler:
+# ;     Formats the message of a record and puts the record on the queue.
+# ;---------------------------------------------------------------------------
+class QueueHandler(logging.Handler):
+    exceptionFormatter = logging.Formatter()
+
+    def __init__(self, recordQueue):
+        logging.Handler.__init__(self)
+        self.queue = recordQueue
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self.exceptionFormatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+# }}}
+
+# Setup the queue listener {{{
+# ;---------------------------------------------------------------------------
+# ; Queue Listener:
+# ;     The writer thread, hands every queued record to the handlers until
+# ;     "stop" queues the end marker.
+# ;---------------------------------------------------------------------------
+class QueueListener:
+    endMarker = None
+
+    def __init__(self, recordQueue, handlers):
+        self.queue = recordQueue
+        self.handlers = list(handlers)
+        self.thread = None
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run, name='unimogDev log writer')
+        # A daemon thread, the interpreter never waits for it (stop drains it)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        while True:
+            record = self.queue.get()
+            if record is self.endMarker:
+                break
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+        for handler in self.handlers:
+            handler.flush()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.queue.put(self.endMarker)
+        self.thread.join()
+        self.thread = None
+# }}}
+
+# Any additional class goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,300 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.profiling
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : Phase level timing spans ("--profile") with an optional cProfile dump of the hot
+# ;           section. Disabled, every call goes to a null profiler that records nothing.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Profile outline:
+#
+#   unimogDev.py takes wall clock checkpoints while it starts (they cost one
+#   time.time() each) and hands them over once "--profile" is parsed. From
+#   there on spans are timed on the monotonic clock, nested spans carry their
+#   depth. The record is emitted at exit, so "sys.exit" paths are covered too:
+#
+#       {"host": ..., "pid": ..., "command": "set", "total_ms": ...,
+#        "spans": [{"name": "interpreter", "start_ms": ..., "duration_ms": ..., "depth": 0}, ...]}
+#
+#   The "interpreter" span (process start to the first line of the script) is
+#   read from /proc and only has the resolution of the kernel clock tick.
+
+# Note: Imported by the utility module, keep the imports light. The monotonic clock
+#       (ctypes) and cProfile are only imported once profiling is enabled.
+
+# Declare external imports
+import os
+import sys
+import time
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[1]"
+
+# Setup the Profiling Functions {{{
+
+# PROFILING: Define a "Monotonic Clock" function {{{
+# ;---------------------------------------------------------------------------
+# ; Monotonic Clock:
+# ;     Returns a function giving seconds on CLOCK_MONOTONIC (Python 2 has
+# ;     no time.monotonic), time.time if the C library does not provide it.
+# ;---------------------------------------------------------------------------
+def monotonicClock():
+    try:
+        import ctypes
+
+        class TimeSpec(ctypes.Structure):
+            _fields_ = [('seconds', ctypes.c_long), ('nanoseconds', ctypes.c_long)]
+
+        clockGetTime = ctypes.CDLL(None, use_errno=True).clock_gettime
+        clockGetTime.argtypes = [ctypes.c_int, ctypes.POINTER(TimeSpec)]
+        clockId = 6 if sys.platform == 'darwin' else 1
+        value = TimeSpec()
+
+        def clock():
+            if clockGetTime(clockId, ctypes.byref(value)) != 0:
+                return time.time()
+            return value.seconds + value.nanoseconds * 1e-9
+
+        clock()
+        return clock
+    except (ImportError, AttributeError, OSError):
+        return time.time
+# }}}
+
+# PROFILING: Define a "Process Start" function {{{
+# ;---------------------------------------------------------------------------
+# ; Process Start:
+# ;     The wall clock start time of the current process from /proc (Linux),
+# ;     None where it is not available.
+# ;---------------------------------------------------------------------------
+def processStart():
+    try:
+        with open('/proc/self/stat') as inStream:
+            # The command name may hold spaces, the fields follow the last ")"
+            fields = inStream.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as inStream:
+            upTime = float(inStream.read().split()[0])
+        # Both are seconds since boot, the boot time itself ("btime") only has a
+        # one second resolution
+        return time.time() - (upTime - float(fields[19]) / os.sysconf('SC_CLK_TCK'))
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+# }}}
+
+# PROFILING: Define the module level interface {{{
+# ;---------------------------------------------------------------------------
+# ; Enable / Span / Start / Stop / Timed:
+# ;     "enable" replaces the null profiler with a recording one and emits
+# ;     its record at exit. The other functions go to the active profiler,
+# ;     "timed" is a decorator timing every call of a function as a span.
+# ;---------------------------------------------------------------------------
+def enable(outputFormat='text', outputFile=None, cProfileFile=None, command=None):
+    global activeProfiler
+
+    import atexit
+    activeProfiler = Profiler(outputFormat, outputFile, cProfileFile, command)
+    atexit.register(activeProfiler.emit)
+    return activeProfiler
+
+def span(name):
+    return activeProfiler.span(name)
+
+def start(name, hot=False):
+    activeProfiler.start(name, hot)
+
+def stop():
+    activeProfiler.stop()
+
+def timed(name):
+    def decorate(function):
+        def wrapper(*args, **kwargs):
+            if not activeProfiler.enabled:
+                return function(*args, **kwargs)
+            activeProfiler.start(name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                activeProfiler.stop()
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        return wrapper
+    return decorate
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# Setup Object Classes {{{
+
+# Setup the null profiler {{{
+# ;---------------------------------------------------------------------------
+# ; Null Profiler:
+# ;     The disabled profiler, every method is a no-op and "span" hands back
+# ;     one shared do-nothing context manager.
+# ;---------------------------------------------------------------------------
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        return False
+
+class NullProfiler:
+    enabled = False
+    nullSpan = NullSpan()
+
+    def span(self, name):
+        return self.nullSpan
+
+    def start(self, name, hot=False):
+        pass
+
+    def stop(self):
+        pass
+
+    def checkpoint(self, name, startTime, endTime):
+        pass
+
+    def emit(self):
+        pass
+# }}}
+
+# Setup the profiler {{{
+# ;---------------------------------------------------------------------------
+# ; Profiler:
+# ;     Records (name, start, duration, depth) spans against the monotonic
+# ;     clock. A span started with "hot=True" also runs under cProfile when
+# ;     a cProfile file is given. "checkpoint" adds a span measured on the
+# ;     wall clock before the profiler existed.
+# ;---------------------------------------------------------------------------
+class Profiler:
+    enabled = True
+
+    def __init__(self, outputFormat='text', outputFile=None, cProfileFile=None, command=None):
+        self.outputFormat = outputFormat
+        self.outputFile = outputFile
+        self.cProfileFile = cProfileFile
+        self.command = command
+        self.clock = monotonicClock()
+
+        # Wall clock times map onto the monotonic clock through this offset
+        self.offset = self.clock() - time.time()
+        self.origin = self.clock()
+        self.spans = []
+        self.open = []
+        self.cProfile = None
+        self.emitted = False
+
+    def checkpoint(self, name, startTime, endTime):
+        if startTime is None or endTime is None:
+            return
+        self.origin = min(self.origin, startTime + self.offset)
+        self.spans.append([name, startTime + self.offset, endTime - startTime, 0])
+
+    def start(self, name, hot=False):
+        record = [name, self.clock(), None, len(self.open)]
+        self.spans.append(record)
+        self.open.append((record, hot and self.cProfileFile is not None))
+
+        if hot and self.cProfileFile is not None and self.cProfile is None:
+            import cProfile
+            self.cProfile = cProfile.Profile()
+            self.cProfile.enable()
+
+    def stop(self):
+        if not self.open:
+            return
+        record, hot = self.open.pop()
+        record[2] = self.clock() - record[1]
+
+        if hot and self.cProfile is not None:
+            self.cProfile.disable()
+            self.cProfile.dump_stats(self.cProfileFile)
+
+    def span(self, name):
+        return ProfileSpan(self, name)
+
+    def record(self):
+        # Spans still open at exit end now
+        while self.open:
+            self.stop()
+
+        end = self.clock()
+        spans = sorted(self.spans, key=lambda span: span[1])
+        return {
+            'host' : os.uname()[1],
+            'pid' : os.getpid(),
+            'command' : self.command,
+            'argv' : sys.argv[1:],
+            'time' : time.time(),
+            'total_ms' : (end - self.origin) * 1000,
+            'spans' : [{'name' : name, 'start_ms' : (start - self.origin) * 1000, 'duration_ms' : duration * 1000, 'depth' : depth} for name, start, duration, depth in spans],
+            'cprofile' : self.cProfileFile,
+        }
+
+    def format(self, record):
+        if self.outputFormat == 'json':
+            import json
+            return json.dumps(record, sort_keys=True)
+
+        lines = ["[profile] host=%s pid=%d command=%s total=%.3fms" % (record['host'], record['pid'], record['command'], record['total_ms'])]
+        for span in record['spans']:
+            lines.append("[profile] %10.3f %10.3f  %s%s" % (span['start_ms'], span['duration_ms'], '  ' * span['depth'], span['name']))
+        if record['cprofile']:
+            lines.append("[profile] cProfile stats: %s" % (record['cprofile']))
+        return '\n'.join(lines)
+
+    def emit(self):
+        if self.emitted:
+            return
+        self.emitted = True
+
+        output = self.format(self.record()) + '\n'
+        if self.outputFile is None:
+            sys.stderr.write(output)
+            sys.stderr.flush()
+            return
+
+        # One record per run, appended so a farm can share a file per host
+        try:
+            with open(self.outputFile, 'a') as outStream:
+                outStream.write(output)
+        except (IOError, OSError), error:
+            sys.stderr.write("[profile] Unable to write %s: %s\n" % (self.outputFile, error))
+# }}}
+
+# Setup the span context manager {{{
+# ;---------------------------------------------------------------------------
+# ; Profile Span:
+# ;     "with profiling.span(name):" times its block as a span.
+# ;---------------------------------------------------------------------------
+class ProfileSpan:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.start(self.name)
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.profiler.stop()
+        return False
+# }}}
+
+# Any additional class goes here.
+
+#}}}
+
+# The active profiler, replaced by "enable"
+activeProfiler = NullProfiler()
+
+# vim: ts=4 ft=python nowrap fdm=marker
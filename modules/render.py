@@ -0,0 +1,225 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.render
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : Pre-rendered export scripts of the dev flags (bash, zsh, tcsh), written beside the
+# ;           YAML file on every commit so "unimogDev.env" can source them without Python.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Note: "unimogDev.env" sources "<config>.bash" only when it is newer ("-nt") than the YAML
+#       and was rendered for the layers of the shell. The second line of a script names its
+#       stack (see layers.stackKey), the localsite is shared by every show and user on top
+#       of it. The scripts are written after the YAML, so a commit that dies half way leaves
+#       an older script behind and the shell falls back to the Python tool. A journal commit
+#       appends the changed flags to the scripts, a later "export" wins when sourced. The
+#       third line of a script holds the size of its rendered body, once the appended lines
+#       pass a quarter of it (at least "appendBytes") the script is rendered again.
+#       The last rendered line exports the names of the flags ("exportedVariable"), the
+#       flags a later "diff --env" may unset. It is cut at "exportedBytes", a longer
+#       environment string fails every exec of the shell.
+
+# Declare external imports
+import os
+import re
+
+# Declare internal imports
+import layers
+import schema
+import transaction
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[7]"
+
+# Setup the render related variables
+scriptShells = ('bash', 'zsh', 'tcsh')
+shellTemplates = {'bash' : 'export %s=%d', 'zsh' : 'export %s=%d', 'tcsh' : 'setenv %s %d', 'fish' : 'set -gx %s %d'}
+unsetTemplates = {'bash' : 'unset %s', 'zsh' : 'unset %s', 'tcsh' : 'unsetenv %s', 'fish' : 'set -e %s'}
+variablePattern = re.compile(r'[A-Za-z_][A-Za-z0-9_]*\Z')
+sizePattern = re.compile(r'# Rendered: (\d+) bytes\n\Z')
+appendBytes = 1 << 16
+exportedVariable = 'UNIMOG_DEV_EXPORTED'
+exportedSeparator = ':'
+exportedBytes = 1 << 16
+
+# Setup the Render Functions {{{
+
+# RENDER: Define a "Path" function {{{
+# ;---------------------------------------------------------------------------
+# ; Script Path:
+# ;     Returns the export script path of a shell for a given YAML file.
+# ;---------------------------------------------------------------------------
+def scriptPath(fileName, shell):
+    return fileName + '.' + shell
+# }}}
+
+# RENDER: Define a "Render Script" function {{{
+# ;---------------------------------------------------------------------------
+# ; Render Script:
+# ;     Returns the export script of a shell for the given (name, value)
+# ;     pairs, values are written as 0/1 like "list --mode=bash" (a typed
+# ;     value as its quoted text). Names that are not valid environment
+# ;     variable names are left out. The header is followed by the stack of
+# ;     this process and the size of the rendered lines. "renderScripts"
+# ;     returns {shell: script} for every shell.
+# ;---------------------------------------------------------------------------
+def renderScript(items, shell, source=''):
+    lines = renderLines(items, shell) + [exportedLine([name for name, value in items], shell)]
+    body = ''.join(line + '\n' for line in lines)
+    return '# Generated by unimogDev.py from %s, do not edit.\n# Stack: %s\n# Rendered: %d bytes\n%s' % (source, layers.stackKey(), len(body), body)
+
+def renderLines(items, shell):
+    template = shellTemplates[shell]
+    try:
+        return [template % (name, value) for name, value in items if variablePattern.match(name) and name not in layers.reservedKeys]
+    except TypeError:
+        # Typed values, every value goes through the encoder of the shell
+        template = template.replace('%d', '%s')
+        encode = schema.shellEncoder(shell)
+        return [template % (name, encode(value)) for name, value in items if variablePattern.match(name) and name not in layers.reservedKeys]
+
+def renderScripts(items, source=''):
+    # Shells sharing a syntax (bash, zsh) share the rendered text
+    rendered = {}
+    for shell in scriptShells:
+        if shellTemplates[shell] not in rendered:
+            rendered[shellTemplates[shell]] = renderScript(items, shell, source)
+    return dict((shell, rendered[shellTemplates[shell]]) for shell in scriptShells)
+# }}}
+
+# RENDER: Define a "Render Patch" function {{{
+# ;---------------------------------------------------------------------------
+# ; Exported Names / Exported Line:
+# ;     The value (the names that are variable names, joined by ":" up to
+# ;     "exportedBytes") and the export line of "exportedVariable" for the
+# ;     given flag names.
+# ;
+# ; Render Patch:
+# ;     Returns the lines of a shell applying (name, old, new) changes: the
+# ;     exports of the new values and an unset for every flag that is gone.
+# ;---------------------------------------------------------------------------
+def exportedNames(names):
+    exported = []
+    size = 0
+    for name in names:
+        if variablePattern.match(name) and name not in layers.reservedKeys:
+            size = size + len(name) + 1
+            if size > exportedBytes:
+                break
+            exported.append(name)
+    return exportedSeparator.join(exported)
+
+def exportedLine(names, shell):
+    return shellTemplates[shell].replace('%d', '%s') % (exportedVariable, exportedNames(names))
+
+def renderPatch(changes, shell):
+    lines = renderLines([(name, new) for name, old, new in changes if new is not None], shell)
+    lines.extend(unsetTemplates[shell] % (name) for name, old, new in changes if new is None and variablePattern.match(name))
+    return lines
+# }}}
+
+# RENDER: Define a "Write Scripts" function {{{
+# ;---------------------------------------------------------------------------
+# ; Write Scripts:
+# ;     Atomically writes the export scripts of every shell beside the YAML
+# ;     file. "source" (the layer files) goes to the header, the YAML file
+# ;     by default. Returns the written paths.
+# ;---------------------------------------------------------------------------
+def writeScripts(fileName, dictionary, source=None):
+    scripts = renderScripts(sorted(dictionary.items()), source or fileName)
+    paths = []
+    for shell in scriptShells:
+        transaction.writeAtomic(scriptPath(fileName, shell), scripts[shell])
+        paths.append(scriptPath(fileName, shell))
+    return paths
+# }}}
+
+# RENDER: Define an "Append Scripts" function {{{
+# ;---------------------------------------------------------------------------
+# ; Append Scripts:
+# ;     Appends the lines of the given (name, value) pairs to the export
+# ;     script of every shell, one write each. Only valid on scripts that
+# ;     were up to date before the change. The file timestamps only move on
+# ;     with the kernel clock tick: a script not newer than "newerThan" (the
+# ;     journal written just before) afterwards gets a later modified time.
+# ;     Returns False without a write when the appended lines of a script
+# ;     would pass its limit, the caller renders the scripts again.
+# ;
+# ; Appended Bytes:
+# ;     The size of the lines appended to a rendered script, None for a
+# ;     script without its rendered size.
+# ;---------------------------------------------------------------------------
+def appendedBytes(path):
+    with open(path, 'rb') as inStream:
+        header = inStream.readline() + inStream.readline() + inStream.readline()
+        size = os.fstat(inStream.fileno()).st_size
+    match = sizePattern.search(header)
+    if match is None:
+        return None
+    return size - len(header) - int(match.group(1)), int(match.group(1))
+
+def appendScripts(fileName, items, newerThan=None):
+    rendered = dict((shell, renderLines(items, shell)) for shell in scriptShells)
+    for shell in scriptShells:
+        sizes = appendedBytes(scriptPath(fileName, shell))
+        if sizes is None:
+            return False
+        tail = sizes[0] + sum(len(line) + 1 for line in rendered[shell])
+        if tail > max(appendBytes, sizes[1] // 4):
+            return False
+
+    for shell in scriptShells:
+        lines = rendered[shell]
+        if not lines:
+            continue
+        path = scriptPath(fileName, shell)
+        outStream = open(path, 'ab')
+        try:
+            outStream.write('\n'.join(lines) + '\n')
+        finally:
+            outStream.close()
+
+        if newerThan is not None and os.stat(path).st_mtime <= newerThan:
+            os.utime(path, (newerThan + 0.001, newerThan + 0.001))
+    return True
+# }}}
+
+# RENDER: Define a "Scripts Fresh" function {{{
+# ;---------------------------------------------------------------------------
+# ; Scripts Fresh:
+# ;     True if the export script of every shell was rendered from "source"
+# ;     for the stack of this process (its header) and is newer than all of
+# ;     the given files (the ones that exist).
+# ;---------------------------------------------------------------------------
+def scriptsFresh(fileName, paths, source=None):
+    newest = 0
+    for path in paths:
+        try:
+            newest = max(newest, os.stat(path).st_mtime)
+        except OSError:
+            pass
+
+    header = ''.join(renderScript([], 'bash', source or fileName).splitlines(True)[:2])
+    for shell in scriptShells:
+        try:
+            if os.stat(scriptPath(fileName, shell)).st_mtime <= newest:
+                return False
+            with open(scriptPath(fileName, shell), 'rb') as inStream:
+                if inStream.readline() + inStream.readline() != header:
+                    return False
+        except (IOError, OSError):
+            return False
+    return True
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,373 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.replica
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : A node-local replica of the merged flags and the export scripts (tmpfs), so the
+# ;           jobs starting on a farm node read the shared config mount once per check interval
+# ;           instead of once per process.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Replica outline:
+#
+#   $UNIMOG_DEV_REPLICA (e.g. /dev/shm/unimogDev.$USER) enables the replica:
+#
+#   <replica>/manifest  : "key value" lines, readable from bash
+#                           source     the localsite config the replica was made from
+#                           stack      the layer folders of the stack (see layers.stackKey)
+#                           next       the time of the next check against the shared config
+#                           signature  hash of the stack signature (stat of every layer/journal)
+#                           merged     hash and crc32 of the marshalled (data, origins)
+#                           bash, zsh, tcsh  hash and crc32 of the export script of the shell
+#   <replica>/<sha1>    : the content, named after its hash
+#
+#   A reader takes the replica of its own source and stack as long as "next"
+#   has not passed (another stack over the same localsite makes its own), without
+#   touching the shared mount at all. Once it passed, one process of the node
+#   (the lock holder, the others keep reading the current copy) stats the
+#   layers: an unchanged stack only moves "next" on, a changed one copies the
+#   merged cache from the shared mount and renders the scripts locally. Content
+#   that did not change keeps its blob. "next" is "interval" (30 s) ahead with
+#   +/-50% jitter, the nodes of a farm spread their checks instead of hitting
+#   the mount together. A blob is only used once its content matches its
+#   checksum (the crc32, a tenth of the sha1 cost, bash checks the sha1), and
+#   anything else falls back to the shared config. A commit on the node itself
+#   makes the replica due at once, other nodes see it within 1.5 x interval.
+
+# Note: This module is on the fast start path, keep the imports light (no logging, no yaml).
+#       The refresh imports hashlib, fcntl and the render module when it runs.
+
+# Declare external imports
+import os
+import time
+import zlib
+import marshal
+
+# Declare internal imports
+import layers
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[2]"
+
+# Setup the replica related variables
+replicaVariable = 'UNIMOG_DEV_REPLICA'
+intervalVariable = 'UNIMOG_DEV_REPLICA_INTERVAL'
+refreshInterval = 30.0
+refreshJitter = 0.5
+manifestName = 'manifest'
+contentKeys = ('merged', 'bash', 'zsh', 'tcsh')
+manifestKeys = ('source', 'stack', 'next', 'signature') + contentKeys
+
+# Setup the Replica Functions {{{
+
+# REPLICA: Define a "Replica Folder" function {{{
+# ;---------------------------------------------------------------------------
+# ; Replica Folder:
+# ;     The replica folder, None when replication is off.
+# ;---------------------------------------------------------------------------
+def replicaFolder():
+    return os.environ.get(replicaVariable) or None
+# }}}
+
+# REPLICA: Define the blob functions {{{
+# ;---------------------------------------------------------------------------
+# ; Content Hash / Content Check / Store Blob / Read Blob:
+# ;     Blobs are named after the sha1 of their content. "storeBlob" writes
+# ;     one atomically (unless a sound one exists) and returns its (name,
+# ;     crc32), "readBlob" returns the content only if it still matches the
+# ;     crc32.
+# ;---------------------------------------------------------------------------
+def contentHash(content):
+    import hashlib
+    return hashlib.sha1(content).hexdigest()
+
+def contentCheck(content):
+    return zlib.crc32(content) & 0xffffffff
+
+def storeBlob(folder, content):
+    digest = contentHash(content)
+    check = contentCheck(content)
+    targetName = os.path.join(folder, digest)
+    if readBlob(folder, digest, check) is not None:
+        return digest, check
+
+    tempName = "%s.%d.tmp" % (targetName, os.getpid())
+    try:
+        outStream = open(tempName, 'wb')
+        try:
+            outStream.write(content)
+        finally:
+            outStream.close()
+        os.rename(tempName, targetName)
+    except (IOError, OSError):
+        try:
+            os.remove(tempName)
+        except OSError:
+            pass
+        raise
+    return digest, check
+
+def readBlob(folder, digest, check):
+    try:
+        inStream = open(os.path.join(folder, digest), 'rb')
+    except (IOError, OSError):
+        return None
+    try:
+        content = inStream.read()
+    finally:
+        inStream.close()
+
+    if contentCheck(content) != check:
+        return None
+    return content
+# }}}
+
+# REPLICA: Define the manifest functions {{{
+# ;---------------------------------------------------------------------------
+# ; Read / Write Manifest:
+# ;     The manifest as a dictionary ("next" as a float, the content keys as
+# ;     (sha1, crc32)), None if there is none or it is incomplete. The writer
+# ;     replaces it atomically.
+# ;---------------------------------------------------------------------------
+def readManifest(folder):
+    try:
+        inStream = open(os.path.join(folder, manifestName), 'rb')
+    except (IOError, OSError):
+        return None
+    try:
+        content = inStream.read()
+    finally:
+        inStream.close()
+
+    manifest = dict(line.split(' ', 1) for line in content.splitlines() if ' ' in line)
+    if [key for key in manifestKeys if key not in manifest]:
+        return None
+    try:
+        manifest['next'] = float(manifest['next'])
+        for key in contentKeys:
+            digest, check = manifest[key].split(' ')
+            manifest[key] = (digest, int(check))
+    except ValueError:
+        return None
+    return manifest
+
+def writeManifest(folder, manifest):
+    values = dict(manifest, next='%.6f' % (manifest['next']))
+    values.update((key, '%s %d' % manifest[key]) for key in contentKeys)
+    content = ''.join('%s %s\n' % (key, values[key]) for key in manifestKeys)
+    targetName = os.path.join(folder, manifestName)
+    tempName = "%s.%d.tmp" % (targetName, os.getpid())
+    outStream = open(tempName, 'wb')
+    try:
+        outStream.write(content)
+    finally:
+        outStream.close()
+    os.rename(tempName, targetName)
+# }}}
+
+# REPLICA: Define a "Made For" function {{{
+# ;---------------------------------------------------------------------------
+# ; Made For:
+# ;     True if the replica of the manifest was made from "fileName" with the
+# ;     layer stack of this process, anything else is a different replica.
+# ;---------------------------------------------------------------------------
+def madeFor(manifest, fileName):
+    return manifest is not None and manifest['source'] == fileName and manifest['stack'] == layers.stackKey()
+# }}}
+
+# REPLICA: Define a "Next Check" function {{{
+# ;---------------------------------------------------------------------------
+# ; Next Check:
+# ;     The time of the next check, "interval" (or $UNIMOG_DEV_REPLICA_INTERVAL)
+# ;     seconds from now with the jitter applied.
+# ;---------------------------------------------------------------------------
+def nextCheck(now):
+    import random
+
+    try:
+        interval = float(os.environ.get(intervalVariable, refreshInterval))
+    except ValueError:
+        interval = refreshInterval
+    return now + interval * random.uniform(1.0 - refreshJitter, 1.0 + refreshJitter)
+# }}}
+
+# REPLICA: Define a "Refresh" function {{{
+# ;---------------------------------------------------------------------------
+# ; Refresh:
+# ;     Returns the manifest of an up to date replica of "fileName", checking
+# ;     it against the shared config once it is due (or "force" is given).
+# ;     A due replica being refreshed by another process is returned as it
+# ;     is. "loader" builds the merged (data, origins) when the merged cache
+# ;     on the shared mount is stale, without one (the fast path) None is
+# ;     returned instead. None as well without a replica folder or when it
+# ;     can not be written.
+# ;---------------------------------------------------------------------------
+def refresh(fileName, loader=None, force=False):
+    folder = replicaFolder()
+    if folder is None:
+        return None
+
+    manifest = readManifest(folder)
+    if not madeFor(manifest, fileName):
+        manifest = None
+    if manifest is not None and not force and time.time() < manifest['next']:
+        return manifest
+
+    import fcntl
+
+    try:
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        lockStream = open(os.path.join(folder, 'lock'), 'a')
+    except (IOError, OSError):
+        return manifest
+
+    try:
+        # Without a usable replica there is nothing to read meanwhile, wait for it
+        try:
+            fcntl.flock(lockStream.fileno(), fcntl.LOCK_EX | (fcntl.LOCK_NB if manifest is not None else 0))
+        except IOError:
+            return manifest
+
+        # Refreshed by another process while this one waited for the lock
+        current = readManifest(folder)
+        if not madeFor(current, fileName):
+            current = None
+        if current is not None and current != manifest and time.time() < current['next']:
+            return current
+
+        try:
+            return updateReplica(folder, fileName, current, loader)
+        except (IOError, OSError):
+            return None
+    finally:
+        lockStream.close()
+
+def updateReplica(folder, fileName, current, loader):
+    import render
+
+    stack = layers.layerStack(fileName)
+    stackSignature = layers.stackSignature(stack)
+    signature = contentHash(repr(stackSignature))
+
+    # The conditional check: nothing changed on the shared mount (and the local
+    # copy is sound)
+    if current is not None and current['signature'] == signature and None not in [readBlob(folder, *current[key]) for key in contentKeys]:
+        current['next'] = nextCheck(time.time())
+        writeManifest(folder, current)
+        return current
+
+    merged = layers.readMerged(fileName, stackSignature)
+    if merged is None and loader is not None:
+        merged = loader(fileName)
+    if merged is None or not isinstance(merged[0], dict) or 'error' in merged[0]:
+        return None
+
+    data, origins = merged
+    manifest = {'source' : fileName, 'stack' : layers.stackKey(), 'signature' : signature}
+    manifest['merged'] = storeBlob(folder, marshal.dumps((data, origins)))
+    scripts = render.renderScripts(sorted(data.items()), ', '.join(path for label, path in stack))
+    for shell in render.scriptShells:
+        manifest[shell] = storeBlob(folder, scripts[shell])
+    manifest['next'] = nextCheck(time.time())
+    writeManifest(folder, manifest)
+
+    # The blobs of the previous manifest stay for the readers still holding it
+    keep = set(manifest[key][0] for key in contentKeys)
+    if current is not None:
+        keep.update(current[key][0] for key in contentKeys)
+    for name in os.listdir(folder):
+        if len(name) == 40 and name not in keep:
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
+    return manifest
+# }}}
+
+# REPLICA: Define a "Load Merged" function {{{
+# ;---------------------------------------------------------------------------
+# ; Load Merged:
+# ;     (digest, data, origins) of the merged flags from the replica, the
+# ;     digest changes with the content. None if the replica is off, stale
+# ;     (see "refresh") or does not verify.
+# ;---------------------------------------------------------------------------
+def loadMerged(fileName, loader=None):
+    manifest = refresh(fileName, loader)
+    if manifest is None:
+        return None
+
+    # A damaged copy is replaced by the next reader
+    content = readBlob(replicaFolder(), *manifest['merged'])
+    if content is None:
+        invalidate(fileName)
+        return None
+    try:
+        data, origins = marshal.loads(content)
+    except (EOFError, ValueError, TypeError):
+        return None
+    return manifest['merged'][0], data, origins
+# }}}
+
+# REPLICA: Define a "Lookup" function {{{
+# ;---------------------------------------------------------------------------
+# ; Lookup:
+# ;     {name: value} of the given names, found in the bash export script of
+# ;     the replica without unmarshalling the merged view (for "get"). Names
+# ;     it does not hold (or that are no variable names) are left out. None
+# ;     as "loadMerged".
+# ;---------------------------------------------------------------------------
+def lookup(fileName, names):
+    manifest = refresh(fileName)
+    if manifest is None:
+        return None
+
+    content = readBlob(replicaFolder(), *manifest['bash'])
+    if content is None:
+        invalidate(fileName)
+        return None
+
+    found = {}
+    for name in names:
+        position = content.find('\nexport %s=' % (name))
+        if position >= 0:
+            start = position + len(name) + 9
+            found[name] = content[start:content.find('\n', start)] != '0'
+    return found
+# }}}
+
+# REPLICA: Define an "Invalidate" function {{{
+# ;---------------------------------------------------------------------------
+# ; Invalidate:
+# ;     Makes a replica holding "fileName" due, the next reader checks it: the
+# ;     one made from it, or one whose stack (of any other shell) has it as a
+# ;     layer.
+# ;---------------------------------------------------------------------------
+def invalidate(fileName):
+    folder = replicaFolder()
+    if folder is None:
+        return
+
+    manifest = readManifest(folder)
+    if manifest is None:
+        return
+    stackFiles = [os.path.join(path, 'unimogDev.yaml') for path in manifest['stack'].split(layers.stackSeparator) if path]
+    if os.path.realpath(fileName) in [os.path.realpath(path) for path in stackFiles + [manifest['source']]]:
+        manifest['next'] = 0.0
+        try:
+            writeManifest(folder, manifest)
+        except (IOError, OSError):
+            pass
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,203 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.scanner
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : An early-exit streaming lookup of flags in the YAML files, used by "get". The
+# ;           files are read in chunks and the scan stops once every requested flag is found.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Scanner outline:
+#
+#   The scanner only understands the flat "NAME: true" documents the exporter
+#   writes. Every chunk of complete lines is first checked for anything beyond
+#   that (indentation, anchors, aliases, merge keys, tags, quoting, flow and
+#   block scalars, directives). If such a construct shows up before all of the
+#   flags are found, the scan gives up and the caller falls back to the full
+#   loader. The checks and the key search are plain string scans, no line is
+#   split or parsed unless it holds a requested flag. Whatever follows the last
+#   requested flag is only searched for the "__derived__" key, a broken line
+#   there goes unnoticed. The journal of a layer is read before its YAML, its
+#   last record of a flag wins over the YAML.
+#
+#   A derived flag is evaluated over the merged layers (see modules/derived.py),
+#   its stored value means nothing. Every layer is read to its end, the scan
+#   gives up as soon as one of them defines "__derived__". The one exception
+#   is a stack whose merged cache (see modules/layers.py) was written for its
+#   current signature and holds no derived definitions: the scan then stops
+#   at the last requested flag again, like the first layer holding them.
+
+# Note: This module is on the fast start path, keep the imports light (no logging, no yaml).
+
+# Declare external imports
+import os
+
+# Declare internal imports
+import journal
+import layers
+import shards
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[4]"
+
+# Setup the scanner related variables
+chunkSize = 1 << 16
+
+# The YAML 1.1 booleans, as resolved by the yaml loader
+booleanValues = {}
+for word in ('yes', 'true', 'on'):
+    booleanValues.update(dict.fromkeys((word, word.capitalize(), word.upper()), True))
+for word in ('no', 'false', 'off'):
+    booleanValues.update(dict.fromkeys((word, word.capitalize(), word.upper()), False))
+
+# Anything a flat "NAME: value" document never contains, the single characters
+# are all checked in one "translate" pass
+unsupportedCharacters = '&*!|<>{}[]"\'%?\t'
+unsupportedMarkers = ('\n ', ' :', '\n...')
+
+# The derived definitions of a layer, quoted or not
+derivedMarker = layers.derivedKey
+
+# Setup the Scanner Functions {{{
+
+# SCANNER: Define a "Scan Flags" function {{{
+# ;---------------------------------------------------------------------------
+# ; Scan Flags:
+# ;     Returns {name: value} for the requested names found in "fileName",
+# ;     names that are not in the file are left out. Returns None if the
+# ;     file uses a construct the scanner does not handle or defines derived
+# ;     flags (the caller has to use the full loader then). Raises IOError if
+# ;     the file is not readable. When the stack is known to be "derivedFree"
+# ;     the read stops at the last requested flag.
+# ;---------------------------------------------------------------------------
+def scanFlags(fileName, names, derivedFree=False):
+    wanted = dict(('\n' + name + ':', name) for name in names)
+    found = {}
+
+    inStream = open(fileName, 'rb')
+    try:
+        # Every block starts with the newline ending the previous one, so a
+        # line start is always "\n" and lines never span two blocks
+        carry = '\n'
+        firstBlock = True
+        while True:
+            chunk = inStream.read(chunkSize)
+            if chunk:
+                data = carry + chunk
+                cut = data.rfind('\n')
+                if cut <= 0:
+                    carry = data
+                    continue
+                block = data[:cut + 1]
+                carry = data[cut:]
+            else:
+                block = carry + '\n'
+
+            if derivedMarker in block:
+                return None
+
+            # Past the last requested flag only the derived definitions matter
+            if not wanted:
+                if not chunk or derivedFree:
+                    break
+                continue
+
+            if len(block.translate(None, unsupportedCharacters)) != len(block):
+                return None
+            for marker in unsupportedMarkers:
+                if marker in block:
+                    return None
+
+            # A single document, its "---" marker can only be the first line
+            markers = block.count('\n---')
+            if markers and not (firstBlock and markers == 1 and block.startswith('\n---')):
+                return None
+            firstBlock = False
+
+            # Every line has to be an entry, a comment, blank or the document marker
+            lines = block.count('\n') - 1
+            entries = block.count(': ')
+            if entries < lines:
+                entries = entries + block.count(':\n') + block.count(':\r\n')
+                others = block.count('\n#') + block.count('\n\n') + markers
+                if entries + others < lines:
+                    return None
+
+            for needle in [needle for needle in wanted if needle in block]:
+                start = block.index(needle) + len(needle)
+                value = block[start:block.index('\n', start)]
+
+                # "NAME:value" is a plain scalar, not a mapping entry
+                if value and value[0] not in ' \r':
+                    return None
+
+                value = value.split(' #', 1)[0].strip()
+                if value not in booleanValues:
+                    return None
+                found[wanted.pop(needle)] = booleanValues[value]
+
+            if not chunk:
+                break
+    finally:
+        inStream.close()
+
+    return found
+# }}}
+
+# SCANNER: Define a "Scan Layers" function {{{
+# ;---------------------------------------------------------------------------
+# ; Scan Layers:
+# ;     Looks the names up through a layer stack ([(label, path), ...],
+# ;     lowest priority first) starting with the last layer, so the first
+# ;     value found wins. Every layer is read for its derived definitions,
+# ;     also once every name is found, unless the stack is "derivedFree" (the
+# ;     merged cache of its signature has none, see layers.mergedDerived): the
+# ;     scan then stops as soon as every name is found. Optional layers
+# ;     without a file are skipped. The journal of a layer overrides its
+# ;     YAML. Only the shards of the names (and the layer file, holding the
+# ;     reserved keys) are scanned in a sharded layer (see modules/shards.py).
+# ;     Returns None like "scanFlags".
+# ;---------------------------------------------------------------------------
+def scanLayers(stack, names, derivedFree=False):
+    remaining = list(names)
+    found = {}
+
+    for label, path in reversed(stack):
+        if derivedFree and not remaining:
+            break
+        if label != 'localsite' and not os.path.isfile(path):
+            continue
+
+        journalFound = journal.lookup(path, remaining)
+        if [value for value in journalFound.itervalues() if value is not None and not isinstance(value, bool)]:
+            return None
+
+        layerFound = {}
+        groups = shards.groupNames(path, [name for name in remaining if name not in journalFound])
+        if not derivedFree:
+            groups.setdefault(path, [])
+        for shardFile, names in groups.iteritems():
+            shardFound = scanFlags(shardFile, names, derivedFree)
+            if shardFound is None:
+                return None
+            layerFound.update(shardFound)
+
+        # A flag the journal removed may still come from a lower layer
+        found.update(layerFound)
+        found.update((name, value) for name, value in journalFound.iteritems() if value is not None)
+        remaining = [name for name in remaining if name not in found]
+
+    return found
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,351 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.schema
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : Typed flag values. A schema declares the type of a flag, it is compiled once into
+# ;           a validator per type and checked when "set" writes a value, the readers only pick
+# ;           the shell encoder of the stored value.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Schema outline:
+#
+#   A layer declares typed flags under the reserved "__schema__" key, the
+#   declarations of every layer are merged per name (later layers override):
+#
+#       __schema__:
+#           UNIMOG_HOUDINI_DEV_BUILD: string
+#           UNIMOG_HOUDINI_DEV_LEVEL: {type: int, min: 0, max: 3}
+#           UNIMOG_NUKE_DEV_MODE: [debug, release]
+#           UNIMOG_MAYA_DEV_ROOT: {type: path, absolute: true}
+#           UNIMOG_MAYA_DEV_PLUGINS: list
+#
+#   type        value                               options
+#   bool        true / false (1/0, yes/no, on/off)
+#   int         an integer                          min, max
+#   enum        one of "values" (the list form)     values
+#   string      a line of text                      pattern (a regular expression)
+#   path        a normalised path                   absolute
+#   list        ":" separated items, a YAML list
+#
+#   A flag without a declaration is a bool. "set NAME=VALUE" parses the value
+#   with the validator of the flag, "set" / "unset" of a name only switch the
+#   bool flags. The stored values are trusted: the readers never validate,
+#   the output picks the encoder of the value type (a bool or an int as is,
+#   text quoted for the shell). Equal declarations share their validator and
+#   a schema is compiled once per process.
+
+# Note: This module is on the fast start path, keep the imports light (no logging, no yaml).
+
+# Declare external imports
+import os
+import re
+import marshal
+
+# Declare internal imports
+import layers
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[1]"
+
+# Setup the schema related variables
+schemaKey = layers.schemaKey
+listSeparator = ':'
+booleanWords = {'1' : True, 'true' : True, 'yes' : True, 'on' : True, '0' : False, 'false' : False, 'no' : False, 'off' : False}
+safePattern = re.compile(r'[A-Za-z0-9_@%+:,./-]+\Z')
+
+# The compiled validators and schemas, by their marshalled declaration
+compiledFields = {}
+compiledSchemas = {}
+
+# Setup the Validator Functions {{{
+
+# SCHEMA: Define the text functions {{{
+# ;---------------------------------------------------------------------------
+# ; Decode Text:
+# ;     The text of a command line value, unicode when it is not ASCII.
+# ;     Raises ValueError for a line break or a NUL, a value is one line.
+# ;
+# ; Text Value:
+# ;     The plain text of a stored value: 1/0 for a bool, the items of a
+# ;     list joined by ":", UTF-8 for unicode.
+# ;---------------------------------------------------------------------------
+def decodeText(text):
+    if '\n' in text or '\r' in text or '\0' in text:
+        raise ValueError("a value is a single line")
+    if isinstance(text, unicode):
+        return text
+    try:
+        text.decode('ascii')
+        return text
+    except UnicodeDecodeError:
+        pass
+    try:
+        return text.decode('utf-8')
+    except UnicodeDecodeError:
+        raise ValueError("not UTF-8 text")
+
+def textValue(value):
+    if value is True or value is False:
+        return '1' if value else '0'
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return listSeparator.join(textValue(item) for item in value)
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return str(value)
+# }}}
+
+# SCHEMA: Define the type validators {{{
+# ;---------------------------------------------------------------------------
+# ; Type Validators:
+# ;     A compiler per type, it takes the options of a declaration and
+# ;     returns the parser of a command line value (text -> value). The
+# ;     parsers raise ValueError with the reason of a refused value.
+# ;---------------------------------------------------------------------------
+def compileBool(options):
+    def parseBool(text):
+        try:
+            return booleanWords[text.lower()]
+        except KeyError:
+            raise ValueError("not a bool (1/0, true/false, yes/no, on/off)")
+    return parseBool
+
+def compileInt(options):
+    minimum = options.get('min')
+    maximum = options.get('max')
+    for bound in (minimum, maximum):
+        if bound is not None and (bound is True or bound is False or not isinstance(bound, (int, long))):
+            raise ValueError("min / max are integers")
+
+    def parseInt(text):
+        try:
+            value = int(text.strip(), 10)
+        except ValueError:
+            raise ValueError("not an integer")
+        if minimum is not None and value < minimum or maximum is not None and value > maximum:
+            raise ValueError("out of range [%s, %s]" % ('' if minimum is None else minimum, '' if maximum is None else maximum))
+        return value
+    return parseInt
+
+def compileEnum(options):
+    values = options.get('values')
+    if not isinstance(values, list) or not values:
+        raise ValueError("an enum needs a list of values")
+    allowed = dict((textValue(value), value) for value in values)
+
+    def parseEnum(text):
+        try:
+            return allowed[text]
+        except KeyError:
+            raise ValueError("not one of %s" % (', '.join(sorted(allowed))))
+    return parseEnum
+
+def compileString(options):
+    pattern = options.get('pattern')
+    if pattern is not None:
+        try:
+            pattern = re.compile('(?:%s)\Z' % (pattern))
+        except (re.error, TypeError), error:
+            raise ValueError("invalid pattern: %s" % (error))
+
+    def parseString(text):
+        value = decodeText(text)
+        if pattern is not None and pattern.match(value) is None:
+            raise ValueError("does not match %s" % (pattern.pattern[3:-3]))
+        return value
+    return parseString
+
+def compilePath(options):
+    absolute = options.get('absolute', False)
+
+    def parsePath(text):
+        value = decodeText(text)
+        if not value:
+            raise ValueError("an empty path")
+        if absolute and not os.path.isabs(value):
+            raise ValueError("not an absolute path")
+        return os.path.normpath(value)
+    return parsePath
+
+def compileList(options):
+    def parseList(text):
+        return [item for item in decodeText(text).split(listSeparator) if item]
+    return parseList
+
+typeCompilers = {'bool' : compileBool, 'int' : compileInt, 'enum' : compileEnum, 'string' : compileString, 'path' : compilePath, 'list' : compileList}
+# }}}
+
+# SCHEMA: Define a "Compile Field" function {{{
+# ;---------------------------------------------------------------------------
+# ; Compile Field:
+# ;     (type, parser) of a declaration: a type name, a list (an enum) or a
+# ;     mapping with a "type" and its options. Raises ValueError for an
+# ;     unknown type or bad options.
+# ;---------------------------------------------------------------------------
+def compileField(declaration):
+    if isinstance(declaration, list):
+        declaration = {'type' : 'enum', 'values' : declaration}
+    elif isinstance(declaration, basestring):
+        declaration = {'type' : declaration}
+    elif not isinstance(declaration, dict):
+        raise ValueError("not a type: %r" % (declaration))
+
+    kind = declaration.get('type')
+    if kind not in typeCompilers:
+        raise ValueError("unknown type %r (%s)" % (kind, ', '.join(sorted(typeCompilers))))
+    return kind, typeCompilers[kind](declaration)
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# Setup the Encoder Functions {{{
+
+# SCHEMA: Define the shell quoting functions {{{
+# ;---------------------------------------------------------------------------
+# ; Quote Functions:
+# ;     The text as one shell word. Words of safe characters stay as they
+# ;     are, anything else is single quoted: "'\''" for a quote (sh), "\!"
+# ;     against the history substitution (tcsh), backslash escapes (fish).
+# ;---------------------------------------------------------------------------
+def quoteSh(text):
+    if safePattern.match(text):
+        return text
+    return "'" + text.replace("'", "'\\''") + "'"
+
+def quoteTcsh(text):
+    if safePattern.match(text):
+        return text
+    return "'" + text.replace("'", "'\\''").replace('!', '\\!') + "'"
+
+def quoteFish(text):
+    if safePattern.match(text):
+        return text
+    return "'" + text.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+# "env0" records are taken as they are
+shellQuoters = {'bash' : quoteSh, 'zsh' : quoteSh, 'tcsh' : quoteTcsh, 'fish' : quoteFish, 'env0' : str}
+# }}}
+
+# SCHEMA: Define a "Shell Encoder" function {{{
+# ;---------------------------------------------------------------------------
+# ; Shell Encoder:
+# ;     The encoder of a shell (value -> word), built once per shell. A bool
+# ;     or an int is written as a number, any other value as quoted text.
+# ;---------------------------------------------------------------------------
+shellEncoders = {}
+
+def shellEncoder(shell):
+    encoder = shellEncoders.get(shell)
+    if encoder is None:
+        quote = shellQuoters[shell]
+
+        def encoder(value):
+            if value is True or value is False:
+                return '1' if value else '0'
+            if isinstance(value, (int, long)):
+                return str(value)
+            return quote(textValue(value))
+        shellEncoders[shell] = encoder
+    return encoder
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# Setup Object Classes {{{
+
+# Setup the schema object {{{
+# ;---------------------------------------------------------------------------
+# ; Schema:
+# ;     The compiled declarations ({name: declaration}). Raises ValueError
+# ;     for a bad declaration.
+# ;
+# ;     kind(name)                  : the type of a flag, "bool" when undeclared
+# ;     typed                       : the names of the flags that are no bool
+# ;     parseValues(assignments)    : ({name: value}, [error]) of the
+# ;                                   [(name, text)], validated in one pass
+# ;---------------------------------------------------------------------------
+class Schema:
+    def __init__(self, definitions):
+        self.fields = {}
+        for name in sorted(definitions):
+            try:
+                key = marshal.dumps(definitions[name])
+            except ValueError:
+                raise ValueError("%s: not a type: %r" % (name, definitions[name]))
+            if key not in compiledFields:
+                try:
+                    compiledFields[key] = compileField(definitions[name])
+                except ValueError, error:
+                    raise ValueError("%s: %s" % (name, error))
+            self.fields[name] = compiledFields[key]
+        self.typed = frozenset(name for name, field in self.fields.iteritems() if field[0] != 'bool')
+        self.boolField = ('bool', compileBool({}))
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    def __len__(self):
+        return len(self.fields)
+
+    def kind(self, name):
+        return self.fields.get(name, self.boolField)[0]
+
+    def parseValues(self, assignments):
+        fields = self.fields
+        boolField = self.boolField
+        values = {}
+        errors = []
+        for name, text in assignments:
+            kind, parse = fields.get(name, boolField)
+            try:
+                values[name] = parse(text)
+            except ValueError, error:
+                errors.append("%s=%s: %s (%s)" % (name, text, error, kind))
+        return values, errors
+# }}}
+
+# Any additional class goes here.
+
+#}}}
+
+# Setup the Compile Functions {{{
+
+# SCHEMA: Define a "Compile Schema" function {{{
+# ;---------------------------------------------------------------------------
+# ; Compile Schema:
+# ;     The compiled schema of the "__schema__" declarations of a merged
+# ;     dictionary (an empty one without them), cached by the marshalled
+# ;     declarations. Raises ValueError as "Schema".
+# ;---------------------------------------------------------------------------
+def compileSchema(definitions):
+    if definitions is None:
+        definitions = {}
+    if not isinstance(definitions, dict):
+        raise ValueError("%s is not a mapping" % (schemaKey))
+
+    try:
+        key = marshal.dumps(definitions)
+    except ValueError:
+        return Schema(definitions)
+    if key not in compiledSchemas:
+        compiledSchemas[key] = Schema(definitions)
+    return compiledSchemas[key]
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,158 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.shards
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : The sharded layout of a config layer, one YAML file per flag namespace and a
+# ;           manifest mapping the namespaces to their files. A lookup only reads the shards
+# ;           of the names it is after.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Shards outline:
+#
+#   <config>.shards                 : the manifest, one "NAMESPACE FILE" line per shard
+#   unimogDev.UNIMOG_MAYA.yaml      : a shard, the flags of the "UNIMOG_MAYA" namespace
+#
+#   The namespace of a flag is the "UNIMOG_<APP>" start of its name, its
+#   first two words. A sharded layer keeps the flags of the namespaces
+#   without a shard and the reserved keys in its own YAML file, its journal
+#   (and the merged cache, the scripts, the flag table) stay the ones of that
+#   file. A shard is a flat YAML file with its own snapshot, it is rewritten
+#   when the journal is compacted with records of its flags and left alone
+#   otherwise. "unimogDev.py shard" splits a config, "shard --merge" folds
+#   the shards back into it.
+#
+#       UNIMOG_HOUDINI unimogDev.UNIMOG_HOUDINI.yaml
+#       UNIMOG_MAYA unimogDev.UNIMOG_MAYA.yaml
+
+# Note: This module is on the fast start path, keep the imports light (no logging, no yaml).
+
+# Declare external imports
+import os
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[1]"
+
+# Setup the shard related variables
+manifestSuffix = '.shards'
+
+# Setup the Shard Functions {{{
+
+# SHARDS: Define the path functions {{{
+# ;---------------------------------------------------------------------------
+# ; Manifest Path:
+# ;     The manifest of a config layer.
+# ;
+# ; Shard Path:
+# ;     The shard file of a namespace, beside the config.
+# ;
+# ; Namespace:
+# ;     The namespace of a flag name, None for a name of less than three
+# ;     words.
+# ;---------------------------------------------------------------------------
+def manifestPath(fileName):
+    return fileName + manifestSuffix
+
+def shardPath(fileName, namespace):
+    root, extension = os.path.splitext(fileName)
+    return '%s.%s%s' % (root, namespace, extension)
+
+def namespace(name):
+    words = name.split('_', 2)
+    if len(words) < 3 or not words[0] or not words[1]:
+        return None
+    return words[0] + '_' + words[1]
+# }}}
+
+# SHARDS: Define the manifest functions {{{
+# ;---------------------------------------------------------------------------
+# ; Read Manifest:
+# ;     {namespace: shard path} of a sharded layer, None for a layer without
+# ;     a manifest. The shard files are relative to the config folder.
+# ;
+# ; Format Manifest:
+# ;     The manifest content of {namespace: shard path}.
+# ;---------------------------------------------------------------------------
+def readManifest(fileName):
+    try:
+        inStream = open(manifestPath(fileName), 'rb')
+    except (IOError, OSError):
+        return None
+    try:
+        content = inStream.read()
+    finally:
+        inStream.close()
+
+    folder = os.path.dirname(fileName)
+    manifest = {}
+    for line in content.splitlines():
+        fields = line.split(' ', 1)
+        if len(fields) == 2 and fields[1]:
+            manifest[fields[0]] = os.path.join(folder, fields[1])
+    return manifest
+
+def formatManifest(manifest):
+    return ''.join('%s %s\n' % (space, os.path.basename(manifest[space])) for space in sorted(manifest))
+# }}}
+
+# SHARDS: Define the grouping functions {{{
+# ;---------------------------------------------------------------------------
+# ; Layer Files:
+# ;     The manifest and the shards of a layer, [] for a layer without a
+# ;     manifest.
+# ;
+# ; Shard Of:
+# ;     The file holding a name, "fileName" itself for a name without a
+# ;     shard.
+# ;
+# ; Group Names:
+# ;     {file: [names]} of the names, every file is read once.
+# ;
+# ; Split Data:
+# ;     {file: dictionary} of a layer dictionary (the reserved keys stay in
+# ;     "fileName"). Every file of the manifest is part of it, an empty
+# ;     shard as well.
+# ;---------------------------------------------------------------------------
+def layerFiles(fileName, manifest=None):
+    if manifest is None:
+        manifest = readManifest(fileName)
+        if manifest is None:
+            return []
+    return [manifestPath(fileName)] + [manifest[space] for space in sorted(manifest)]
+
+def shardOf(fileName, name, manifest):
+    words = name.split('_', 2)
+    if len(words) < 3:
+        return fileName
+    return manifest.get(words[0] + '_' + words[1], fileName)
+
+def groupNames(fileName, names, manifest=None):
+    if manifest is None:
+        manifest = readManifest(fileName)
+    if not manifest:
+        return {fileName : list(names)}
+
+    groups = {}
+    for name in names:
+        groups.setdefault(shardOf(fileName, name, manifest), []).append(name)
+    return groups
+
+def splitData(fileName, data, manifest):
+    parts = dict((path, {}) for path in manifest.itervalues())
+    parts[fileName] = {}
+    for name, value in data.iteritems():
+        parts[shardOf(fileName, name, manifest)][name] = value
+    return parts
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,140 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.snapshot
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : A compiled (marshal) snapshot of the parsed YAML configuration, stored beside the
+# ;           YAML file and keyed on its inode, size, mtime and content hash.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Note: This module is on the fast start path, keep the imports light (no logging, no yaml).
+
+# Declare external imports
+import os
+import sys
+import marshal
+import hashlib
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[2]"
+
+# Setup the snapshot related variables
+snapshotTag = 'UNIMOG_SNAPSHOT'
+snapshotVersion = 1
+snapshotSuffix = '.snapshot'
+
+# Setup the Snapshot Functions {{{
+
+# SNAPSHOT: Define a "Path" function {{{
+# ;---------------------------------------------------------------------------
+# ; Snapshot Path:
+# ;     Returns the snapshot file path for a given YAML file.
+# ;---------------------------------------------------------------------------
+def snapshotPath(fileName):
+    return fileName + snapshotSuffix
+# }}}
+
+# SNAPSHOT: Define a "Content Hash" function {{{
+# ;---------------------------------------------------------------------------
+# ; Content Hash:
+# ;     Returns the hex digest used to key a snapshot on the file contents.
+# ;---------------------------------------------------------------------------
+def contentHash(content):
+    return hashlib.sha1(content).hexdigest()
+# }}}
+
+# SNAPSHOT: Define a "Read Source" function {{{
+# ;---------------------------------------------------------------------------
+# ; Read Source:
+# ;     Reads the raw YAML bytes and returns them with the stat signature
+# ;     (inode, size, mtime) taken from the very same file descriptor.
+# ;     Raises IOError/OSError if the file is not accessible.
+# ;---------------------------------------------------------------------------
+def readSource(fileName):
+    inStream = open(fileName, 'rb')
+    try:
+        stat = os.fstat(inStream.fileno())
+        content = inStream.read()
+    finally:
+        inStream.close()
+
+    return (stat.st_ino, stat.st_size, stat.st_mtime), content
+# }}}
+
+# SNAPSHOT: Define a "Reader" function {{{
+# ;---------------------------------------------------------------------------
+# ; Read Snapshot:
+# ;     Returns the snapshot data if the snapshot is fresh for the given
+# ;     source signature and content, None otherwise. The cheap stat keys are
+# ;     compared first, the content hash only when those match.
+# ;---------------------------------------------------------------------------
+def readSnapshot(fileName, signature, content):
+    try:
+        inStream = open(snapshotPath(fileName), 'rb')
+    except (IOError, OSError):
+        return None
+
+    try:
+        try:
+            record = marshal.load(inStream)
+        except (EOFError, ValueError, TypeError):
+            return None
+    finally:
+        inStream.close()
+
+    try:
+        tag, version, pythonVersion, storedSignature, storedHash, data = record
+    except (TypeError, ValueError):
+        return None
+
+    if tag != snapshotTag or version != snapshotVersion:
+        return None
+    if pythonVersion != tuple(sys.version_info[:2]):
+        return None
+    if tuple(storedSignature) != tuple(signature):
+        return None
+    if storedHash != contentHash(content):
+        return None
+
+    return data
+# }}}
+
+# SNAPSHOT: Define a "Writer" function {{{
+# ;---------------------------------------------------------------------------
+# ; Write Snapshot:
+# ;     Atomically (transaction.writeAtomic, without the fsyncs) stores the
+# ;     parsed data for the given source signature and content. Returns
+# ;     False if the data can not be marshalled or the directory is not
+# ;     writable, the snapshot is only a cache so neither case is an error
+# ;     for the caller.
+# ;---------------------------------------------------------------------------
+def writeSnapshot(fileName, signature, content, data):
+    record = (snapshotTag, snapshotVersion, tuple(sys.version_info[:2]), tuple(signature), contentHash(content), data)
+
+    try:
+        payload = marshal.dumps(record)
+    except ValueError:
+        return False
+
+    # Only a writer pays for the transaction imports
+    import transaction
+
+    try:
+        transaction.writeAtomic(snapshotPath(fileName), payload, durable=False)
+    except (IOError, OSError):
+        return False
+
+    return True
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,165 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.spans
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : Format preserving updates of a YAML config. The byte spans of the scalar values
+# ;           are indexed from the loaded file and only the spans of the changed values are
+# ;           replaced, the comments, the key order and the spelling of the rest stay as they are.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Spans outline:
+#
+#   UNIMOG_MAYA_DEV: true       # the span of the value is "true"
+#   UNIMOG_NUKE_DEV: 'a # b'    # a quoted value, the quotes are part of it
+#
+#   A patchable value is the one line scalar of a top level "NAME: value"
+#   key. A few names are searched for (the last one wins, as in the YAML
+#   loader), more are looked up in an index of every key built in one scan.
+#   A bool keeps its spelling family (true/false, yes/no, on/off in the same
+#   case), an int is written as it is, the writer renders anything else. A
+#   name without a patchable span (a new or removed key, a block, a flow
+#   value over more lines) leaves the writer with a full dump.
+
+# Declare external imports
+import re
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[1]"
+
+# Setup the span related variables
+searchLimit = 64
+keyPattern = re.compile(r'^([^\s#\'"\[\]{},&*!|>%@`:-][^\s:]*):[ \t]', re.M)
+structureMarkers = '|>&*!%@`#'
+boolSpellings = {}
+for trueText, falseText in (('true', 'false'), ('yes', 'no'), ('on', 'off')):
+    for spelling in ((trueText, falseText), (trueText.capitalize(), falseText.capitalize()), (trueText.upper(), falseText.upper())):
+        boolSpellings[spelling[0]] = boolSpellings[spelling[1]] = spelling
+
+# Setup the Span Functions {{{
+
+# SPANS: Define a "Value Span" function {{{
+# ;---------------------------------------------------------------------------
+# ; Value Span:
+# ;     (start, end) of the value starting at "start" (right after the ":"
+# ;     of its key), without its comment and trailing blanks. None for a
+# ;     value that is no one line scalar.
+# ;---------------------------------------------------------------------------
+def quotedEnd(text):
+    quote = text[0]
+    position = 1
+    while True:
+        position = text.find(quote, position)
+        if position < 0:
+            return -1
+        if quote == "'" and text[position + 1:position + 2] == "'":
+            position = position + 2
+        elif quote == '"' and (len(text[:position]) - len(text[:position].rstrip('\\'))) % 2:
+            position = position + 1
+        else:
+            return position + 1
+
+def valueSpan(content, start):
+    lineEnd = content.find('\n', start)
+    if lineEnd < 0:
+        lineEnd = len(content)
+    line = content[start:lineEnd]
+    text = line.lstrip(' \t')
+    start = start + len(line) - len(text)
+    if not text.strip() or text[0] in structureMarkers:
+        return None
+
+    if text[0] in '\'"':
+        end = quotedEnd(text)
+        if end < 0:
+            return None
+        rest = text[end:]
+        if rest.strip() and not (rest[0] in ' \t' and rest.lstrip(' \t').startswith('#')):
+            return None
+    elif text[0] in '[{':
+        text = text.rstrip(' \t\r')
+        if '#' in text or text[-1] != {'[' : ']', '{' : '}'}[text[0]]:
+            return None
+        end = len(text)
+    else:
+        cut = min(position for position in (text.find(' #'), text.find('\t#'), len(text)) if position >= 0)
+        end = len(text[:cut].rstrip(' \t\r'))
+
+    # A value carried on by the next (indented) line is no one line scalar
+    if content[lineEnd + 1:lineEnd + 2] in (' ', '\t'):
+        return None
+    return start, start + end
+# }}}
+
+# SPANS: Define a "Locate Spans" function {{{
+# ;---------------------------------------------------------------------------
+# ; Key Offsets:
+# ;     {name: offset after its ":"} of the top level keys among "names",
+# ;     searched for one by one up to "searchLimit" names, else indexed.
+# ;
+# ; Locate Spans:
+# ;     {name: (start, end)} of the values of "names", None for a name whose
+# ;     value can not be patched. A name missing in the content is left out.
+# ;---------------------------------------------------------------------------
+def keyOffsets(content, names):
+    if len(names) > searchLimit:
+        index = dict((match.group(1), match.end() - 1) for match in keyPattern.finditer(content))
+        return dict((name, index[name]) for name in names if name in index)
+
+    offsets = {}
+    for name in names:
+        key = name + ':'
+        position = content.rfind('\n' + key) + 1
+        if not position and not content.startswith(key):
+            continue
+        offsets[name] = position + len(key)
+    return offsets
+
+def locateSpans(content, names):
+    spans = {}
+    for name, offset in keyOffsets(content, names).iteritems():
+        if content[offset:offset + 1] not in (' ', '\t'):
+            spans[name] = None
+        else:
+            spans[name] = valueSpan(content, offset)
+    return spans
+# }}}
+
+# SPANS: Define the patch functions {{{
+# ;---------------------------------------------------------------------------
+# ; Scalar Text:
+# ;     The text of a bool (in the spelling of "oldText") or an int, None for
+# ;     any other value.
+# ;
+# ; Patch Content:
+# ;     The content with the [(start, end, text)] spans replaced.
+# ;---------------------------------------------------------------------------
+def scalarText(value, oldText):
+    if value is True or value is False:
+        return boolSpellings.get(oldText, ('true', 'false'))[0 if value else 1]
+    if isinstance(value, (int, long)):
+        return str(value)
+    return None
+
+def patchContent(content, changes):
+    pieces = []
+    position = 0
+    for start, end, text in sorted(changes):
+        pieces.append(content[position:start])
+        pieces.append(text)
+        position = end
+    pieces.append(content[position:])
+    return ''.join(pieces)
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,261 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.transaction
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : Crash-safe, lock-coordinated writes of the config file: advisory locking,
+# ;           write-temp-fsync-rename commits and group commit of queued mutations.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Group commit outline:
+#
+#   1. A writer appends its mutation record to "<config>.pending".
+#   2. It then waits for the exclusive lock on "<config>.lock".
+#   3. Holding the lock, it reads the pending queue. If its own record is
+#      gone, an earlier lock holder has already committed it and it is done.
+#      Otherwise it becomes the leader: it applies every queued record (its
+#      own and the ones queued behind the previous commit) in order, commits
+#      them with a single atomic write, and drops them from the queue.
+#      A record of another writer the batch refused (an invalid value) is
+#      left in the queue, its writer leads the next commit and reports the
+#      error itself.
+#
+#   Records are removed only after the commit, so a leader that dies half way
+#   leaves them for the next lock holder. A leader whose commit fails (an
+#   exception, a "sys.exit" of the batch) drops its own record before the
+#   error goes on, the records of the other writers stay for them, each one
+#   is still waiting for the lock and commits (or fails) its own.
+
+# Declare external imports
+import sys
+import os
+import stat
+import fcntl
+import socket
+import itertools
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[4]"
+
+# A per process record counter, the record ids have to be unique across the farm
+recordCounter = itertools.count()
+
+# Setup the Transaction Functions {{{
+
+# TRANSACTION: Define the path functions {{{
+# ;---------------------------------------------------------------------------
+# ; Lock Path / Pending Path:
+# ;     The lock file and the pending mutation queue beside the config file.
+# ;---------------------------------------------------------------------------
+def lockPath(fileName):
+    return fileName + '.lock'
+
+def pendingPath(fileName):
+    return fileName + '.pending'
+# }}}
+
+# TRANSACTION: Define an "Atomic Writer" function {{{
+# ;---------------------------------------------------------------------------
+# ; Write Atomic:
+# ;     Writes "content" to a temporary file in the same folder, fsyncs it,
+# ;     keeps the permissions of the file it replaces and renames it over
+# ;     "fileName". Readers see either the old or the new file, never a
+# ;     truncated one. The temporary name holds the host and the pid, the
+# ;     writers of a shared folder never collide. A cache (not "durable")
+# ;     skips the fsyncs. Returns the stat of the new file.
+# ;---------------------------------------------------------------------------
+def writeAtomic(fileName, content, durable=True):
+    folder = os.path.dirname(os.path.abspath(fileName))
+    tempName = "%s.%s.%d.tmp" % (fileName, socket.gethostname(), os.getpid())
+
+    outStream = open(tempName, 'wb')
+    try:
+        try:
+            outStream.write(content)
+            outStream.flush()
+            if durable:
+                os.fsync(outStream.fileno())
+            newStat = os.fstat(outStream.fileno())
+        finally:
+            outStream.close()
+
+        try:
+            os.chmod(tempName, stat.S_IMODE(os.stat(fileName).st_mode))
+        except OSError:
+            pass
+
+        os.rename(tempName, fileName)
+    except:
+        try:
+            os.remove(tempName)
+        except OSError:
+            pass
+        raise
+
+    # Make the rename itself durable
+    if not durable:
+        return newStat
+    try:
+        folderHandle = os.open(folder, os.O_RDONLY)
+        try:
+            os.fsync(folderHandle)
+        finally:
+            os.close(folderHandle)
+    except OSError:
+        pass
+
+    return newStat
+# }}}
+
+# TRANSACTION: Define the pending queue functions {{{
+# ;---------------------------------------------------------------------------
+# ; Pending Queue:
+# ;     One "<id>\t<payload>" line per mutation. The queue file is guarded by
+# ;     its own short lived lock, appends never wait for a running commit.
+# ;     "dropPending" removes the record of one id.
+# ;---------------------------------------------------------------------------
+def newRecordId():
+    return "%s.%d.%d" % (socket.gethostname(), os.getpid(), next(recordCounter))
+
+def appendPending(fileName, recordId, payload):
+    if '\n' in payload:
+        raise ValueError("Mutation payloads are single lines")
+
+    queue = open(pendingPath(fileName), 'a')
+    try:
+        fcntl.flock(queue.fileno(), fcntl.LOCK_EX)
+        queue.write("%s\t%s\n" % (recordId, payload))
+        queue.flush()
+        os.fsync(queue.fileno())
+    finally:
+        queue.close()
+
+def readPending(fileName):
+    try:
+        queue = open(pendingPath(fileName), 'r')
+    except IOError:
+        return 0, []
+
+    try:
+        fcntl.flock(queue.fileno(), fcntl.LOCK_SH)
+        content = queue.read()
+    finally:
+        queue.close()
+
+    # Only complete lines are records
+    content = content[:content.rfind('\n') + 1]
+    records = [tuple(line.split('\t', 1)) for line in content.splitlines()]
+    return len(content), [record for record in records if len(record) == 2]
+
+def consumePending(fileName, offset, keep=()):
+    queue = open(pendingPath(fileName), 'r+')
+    try:
+        fcntl.flock(queue.fileno(), fcntl.LOCK_EX)
+        content = queue.read()
+        kept = ''.join(line for line in content[:offset].splitlines(True) if line.split('\t', 1)[0] in keep)
+        queue.seek(0)
+        queue.write(kept + content[offset:])
+        queue.truncate()
+        queue.flush()
+        os.fsync(queue.fileno())
+    finally:
+        queue.close()
+
+def dropPending(fileName, recordId):
+    queue = open(pendingPath(fileName), 'r+')
+    try:
+        fcntl.flock(queue.fileno(), fcntl.LOCK_EX)
+        content = queue.read()
+        remainder = ''.join(line for line in content.splitlines(True) if line.split('\t', 1)[0] != recordId)
+        queue.seek(0)
+        queue.write(remainder)
+        queue.truncate()
+        queue.flush()
+        os.fsync(queue.fileno())
+    finally:
+        queue.close()
+# }}}
+
+# TRANSACTION: Define the "Group Commit" function {{{
+# ;---------------------------------------------------------------------------
+# ; Commit Mutation:
+# ;     Queues "payload" and makes sure it is committed, see the outline at
+# ;     the top. "applyBatch" receives [(isOwn, payload), ...] in queue order
+# ;     and has to perform the read-modify-write (ending in writeAtomic); it
+# ;     runs with the exclusive lock held. When it raises (or exits) the own
+# ;     record is dropped and the error goes on. It may return the positions
+# ;     of the records it refused, the ones of other writers stay queued.
+# ;     Returns the number of records committed by this call, 0 when another
+# ;     writer committed the record on our behalf.
+# ;---------------------------------------------------------------------------
+def commitMutation(fileName, payload, applyBatch):
+    recordId = newRecordId()
+    appendPending(fileName, recordId, payload)
+
+    lock = FileLock(fileName)
+    lock.acquire()
+    try:
+        offset, records = readPending(fileName)
+        if recordId not in [record[0] for record in records]:
+            return 0
+
+        try:
+            refused = applyBatch([(record[0] == recordId, record[1]) for record in records]) or []
+        except BaseException:
+            error = sys.exc_info()
+            dropPending(fileName, recordId)
+            raise error[0], error[1], error[2]
+        keep = set(records[index][0] for index in refused) - set([recordId])
+        consumePending(fileName, offset, keep)
+        return len(records) - len(keep)
+    finally:
+        lock.release()
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# Setup Object Classes {{{
+
+# Setup the lock object {{{
+# ;---------------------------------------------------------------------------
+# ; File Lock:
+# ;     An advisory (flock) lock on "<config>.lock". Usable as a context
+# ;     manager, exclusive by default.
+# ;---------------------------------------------------------------------------
+class FileLock:
+    def __init__(self, fileName, exclusive=True):
+        self.path = lockPath(fileName)
+        self.exclusive = exclusive
+        self.handle = None
+
+    def acquire(self):
+        self.handle = open(self.path, 'a')
+        fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH)
+
+    def release(self):
+        if self.handle is not None:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.release()
+# }}}
+
+# Any additional class goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
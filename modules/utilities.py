@@ -17,35 +17,71 @@ import sys
 import os
 import re
 import time
-import string
 import logging
-import pprint
-from itertools import imap
+import binascii
+import bisect
+import shlex
+from itertools import izip
+from collections import deque
+
+# Declare internal imports
+import derived
+import emitters
+import flagtable
+import journal
+import layers
+import logqueue
+import profiling
+import render
+import replica
+import scanner
+import schema
+import shards
+import snapshot
+import spans
+import transaction
 
 # Define a version variable:
 moduleName = __name__
-moduleVersion = moduleName + " 0.0.1.[6]"
+moduleVersion = moduleName + " 0.0.1.[22]"
 
 # Set a local empty logger to avoid the "No handlers could be found for logger FOO"
 # message in case logging is not set up properly up the chain of the parent application.
 logging.getLogger('unimog.unimogdev.utilities').addHandler(logging.NullHandler())
 
-# Initialise YAML {{{
 logger = logging.getLogger('unimog.unimogdev.utilities')
-try:
-    from yaml import load, dump
+
+# Initialise YAML {{{
+# ;---------------------------------------------------------------------------
+# ; The YAML module is imported on first use only, a warm snapshot read
+# ; never pays for it.
+# ;---------------------------------------------------------------------------
+load = dump = Loader = Dumper = None
+
+def initialiseYaml():
+    global load, dump, Loader, Dumper
+
+    if load is not None:
+        return
+
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+    profiling.start('yaml import')
     try:
-        from yaml import CLoader as Loader, CDumper as Dumper
-        logger.debug("%s" % ("C module LibYAML is available."))
-    except ImportError:
+        from yaml import load, dump
         try:
-            from yaml import Loader, Dumper
-        except:
-            logger.warning("%s" % ("C module LibYAML is NOT available."))
-except:
-    logger.critical("YAML module is not available.")
-    logger.critical("EXIT_CODE: 1")
-    sys.exit(1)
+            from yaml import CLoader as Loader, CDumper as Dumper
+            logger.debug("%s", "C module LibYAML is available.")
+        except ImportError:
+            try:
+                from yaml import Loader, Dumper
+            except:
+                logger.warning("%s", "C module LibYAML is NOT available.")
+    except:
+        logger.critical("YAML module is not available.")
+        logger.critical("EXIT_CODE: 1")
+        sys.exit(1)
+    finally:
+        profiling.stop()
 # }}}
 
 # Setup the Utility Functions {{{
@@ -63,15 +99,92 @@ def printMessage():
 # UTILITY: Define a KEY extractor function {{{
 # ;---------------------------------------------------------------------------
 # ; The "extractKey" Function:
-# ;     This function should return a list of dictionary keys.
+# ;     This function should return a list of dictionary (or FlagSet) keys.
 # ;---------------------------------------------------------------------------
 def extractKeys(dictionary):
-    keyList = []
+    return list(dictionary)
+#}}}
 
-    for key in dictionary:
-        keyList.append(key)
+# UTILITY: Define the pattern functions {{{
+# ;---------------------------------------------------------------------------
+# ; The "isPattern" Function:
+# ;     True if a target is a glob pattern ("UNIMOG_*_LIBRARY_DEV").
+# ;
+# ; The "globToRegex" Function:
+# ;     Translates a glob into an anchored regular expression.
+# ;
+# ; The "hasTopLevelAlternation" Function:
+# ;     True if a regular expression has a "|" outside of any group.
+# ;
+# ; The "selectNames" / "selectPositions" Functions:
+# ;     Expands the targets of a command into variable names. Literal names
+# ;     are kept as they are (so unknown ones can still be reported), globs
+# ;     and "--match" regular expressions are resolved in a single pass
+# ;     through the name index of the flag set.
+# ;---------------------------------------------------------------------------
+def isPattern(target):
+    return '*' in target or '?' in target or '[' in target
+
+def globToRegex(pattern):
+    parts = []
+    index = 0
+    while index < len(pattern):
+        character = pattern[index]
+        if character == '*':
+            parts.append('.*')
+        elif character == '?':
+            parts.append('.')
+        elif character == '[' and pattern.find(']', index + 2) != -1:
+            end = pattern.find(']', index + 2)
+            body = pattern[index + 1:end].replace('\\', '\\\\')
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            parts.append('[' + body + ']')
+            index = end
+        else:
+            parts.append(re.escape(character))
+        index = index + 1
+    return '^' + ''.join(parts) + r'\Z'
 
-    return keyList
+def hasTopLevelAlternation(pattern):
+    depth = 0
+    escaped = inClass = False
+    for character in pattern:
+        if escaped:
+            escaped = False
+        elif character == '\\':
+            escaped = True
+        elif inClass:
+            inClass = character != ']'
+        elif character == '[':
+            inClass = True
+        elif character == '(':
+            depth = depth + 1
+        elif character == ')':
+            depth = depth - 1
+        elif character == '|' and depth == 0:
+            return True
+    return False
+
+def selectNames(yamlObject, targets, matches=()):
+    names = [target for target in targets if not isPattern(target)]
+    globs = [target for target in targets if isPattern(target)]
+
+    if globs or matches:
+        flags = yamlObject.flags
+        seen = set(names)
+        for position in flags.select(globs, matches):
+            if flags.names[position] not in seen:
+                names.append(flags.names[position])
+
+    return names
+
+def selectPositions(yamlObject, targets, matches=()):
+    # None selects everything
+    if not targets and not matches:
+        return None
+    index = yamlObject.flags.index
+    return [index[name] for name in selectNames(yamlObject, targets, matches) if name in index]
 #}}}
 
 # Any additional function goes here.
@@ -84,56 +197,577 @@ def extractKeys(dictionary):
 # ;---------------------------------------------------------------------------
 # ; Import Yaml Data:
 # ;     Accepts the incoming YAML data through the stream object
-# ;     passed in as a function argument.
+# ;     passed in as a function argument. The journal of the file is
+# ;     replayed on top (read first, see modules/journal.py). The shards of
+# ;     a sharded config are merged in before (see modules/shards.py), only
+# ;     the ones holding "names" when given.
 # ;---------------------------------------------------------------------------
-def importYamlData(fileName):
+@profiling.timed('importYamlData')
+def importYamlData(fileName, useSnapshot=True, useJournal=True, names=None):
     # Link to logger
     logger = logging.getLogger('unimog.unimogdev.utilities')
 
-    # Create the stream object
+    journalContent = journal.readJournal(fileName) if useJournal else ''
+
+    # Read the raw file contents and the stat signature
     try:
-        inStream = open(fileName, 'r')
+        signature, content = snapshot.readSource(fileName)
     except:
-        logger.critical("%s: %s" % ("Unable to access the input file handler", fileName))
+        logger.critical("%s: %s", "Unable to access the input file handler", fileName)
         logger.critical("EXIT_CODE: 2")
         sys.exit(2)
 
+    # Try the compiled snapshot first, it is only used when it is fresh
+    incomingData = None
+    if useSnapshot:
+        incomingData = snapshot.readSnapshot(fileName, signature, content)
+        if incomingData is not None:
+            logger.debug("%s", "Configuration successfully imported through the snapshot.")
+
     # Perform the import process
-    try:
-        incomingData = load(inStream, Loader=Loader)
-        logger.debug("%s" % ("Configuration successfully imported through the file handler."))
-        inStream.close()
-        return incomingData
-    except:
-        logger.critical("Failed to import the configuration through the file handler!")
-        return {'error':'broken data handler'}
+    if incomingData is None:
+        initialiseYaml()
+        try:
+            incomingData = load(content, Loader=Loader)
+            logger.debug("%s", "Configuration successfully imported through the file handler.")
+        except:
+            logger.critical("Failed to import the configuration through the file handler!")
+            return {'error':'broken data handler'}
+
+        # Refresh the snapshot for the next reader
+        if useSnapshot and incomingData is not None:
+            if not snapshot.writeSnapshot(fileName, signature, content, incomingData):
+                logger.debug("%s: %s", "Unable to write the snapshot for", fileName)
+
+    # A sharded config may hold nothing but its shards
+    manifest = shards.readManifest(fileName)
+    if manifest is not None:
+        if incomingData is None:
+            incomingData = {}
+        if isinstance(incomingData, dict) and not importShards(fileName, incomingData, manifest, names, useSnapshot):
+            return {'error':'broken data handler'}
+
+    if journalContent and isinstance(incomingData, dict):
+        journal.replay(incomingData, journalContent)
+    return incomingData
+# }}}
+
+# YAML: Define an "Import Shards" function {{{
+# ;---------------------------------------------------------------------------
+# ; Import Shards:
+# ;     Merges the shards of a sharded config (those holding "names" when
+# ;     given) into its dictionary. Returns False for a broken shard.
+# ;---------------------------------------------------------------------------
+def importShards(fileName, data, manifest, names=None, useSnapshot=True):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    if names is None:
+        shardFiles = sorted(set(manifest.itervalues()))
+    else:
+        shardFiles = sorted(path for path in shards.groupNames(fileName, names, manifest) if path != fileName)
+
+    for path in shardFiles:
+        shardData = importYamlData(path, useSnapshot, useJournal=False)
+        if shardData is None:
+            continue
+        if not isinstance(shardData, dict) or 'error' in shardData:
+            logger.critical("%s: %s", "Broken configuration shard", path)
+            return False
+        data.update(shardData)
+    logger.debug("%s: %d", "Configuration shards imported", len(shardFiles))
+    return True
+# }}}
+
+# YAML: Define a "Layered Importer" function {{{
+# ;---------------------------------------------------------------------------
+# ; Import Merged Data:
+# ;     Loads the layer stack of the localsite config "fileName" (see
+# ;     modules/layers.py) and returns the merged (data, origins). The merged
+# ;     view is cached and only rebuilt when the stat signature of a layer
+# ;     changes, every layer is read through its own snapshot. The derived
+# ;     flags are evaluated into the merged view (with "derived" as their
+# ;     origin). A broken layer (or broken derived definitions) returns the
+# ;     error dictionary of importYamlData.
+# ;---------------------------------------------------------------------------
+@profiling.timed('importMergedData')
+def importMergedData(fileName):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    stack = layers.layerStack(fileName)
+    signature = layers.stackSignature(stack)
+
+    merged = layers.readMerged(fileName, signature)
+    if merged is not None:
+        logger.debug("%s", "Merged configuration successfully imported through the cache.")
+        return merged
+
+    layerData = []
+    for label, path in stack:
+        # Only the localsite layer is required
+        if label != 'localsite' and not os.path.isfile(path):
+            continue
+
+        incomingData = importYamlData(path)
+        if not isinstance(incomingData, dict) or 'error' in incomingData:
+            logger.critical("%s: %s (%s)", "Broken configuration layer", path, label)
+            return {'error':'broken data handler'}, {}
+        layerData.append((label, incomingData))
+        logger.debug("%s: %s (%d flags)", "Configuration layer", path, len(incomingData))
+
+    data, origins = layers.mergeLayers(layerData)
+    if not evaluateDerived(data, origins):
+        return {'error':'broken data handler'}, {}
+
+    # Refresh the cache for the next reader
+    if not layers.writeMerged(fileName, signature, data, origins):
+        logger.debug("%s: %s", "Unable to write the merged cache for", fileName)
+
+    # A published flag table follows the merged view
+    if flagtable.exists(fileName):
+        publishTable(fileName, data, signature)
+
+    return data, origins
 # }}}
 
 # YAML: Define an "Exporter" function {{{
 # ;---------------------------------------------------------------------------
 # ; Export Yaml Data:
 # ;     Dumps out an incoming dictionary using the stream object
-# ;     passed in with the function arguments.
+# ;     passed in with the function arguments. A sharded config is split
+# ;     over its shards, with "touched" (names) only the files holding one
+# ;     of them are written. Returns False if a file could not be written.
+# ;
+# ; Write Yaml File:
+# ;     Writes a dictionary (an empty one as an empty file) and its snapshot.
+# ;     The values that changed are patched into the file as it is (see
+# ;     modules/spans.py), a new or removed key (or a value without a
+# ;     patchable span) gets a full dump. "touched" are the only names that
+# ;     may differ from the file, without them the fresh snapshot of the
+# ;     file tells. Returns False on failure.
+# ;
+# ; Patch Yaml Content:
+# ;     (content, changed values) of the file with the values of the
+# ;     dictionary patched in, None when it takes a full dump.
+# ;
+# ; Scalar Yaml:
+# ;     The one line (flow) YAML of a value, None if it takes more lines.
 # ;---------------------------------------------------------------------------
-def exportYamlData(sourceDictionary, fileName):
+@profiling.timed('exportYamlData')
+def exportYamlData(sourceDictionary, fileName, touched=None):
     # Link to logger
     logger = logging.getLogger('unimog.unimogdev.utilities')
 
     # Run a file check
     if not os.path.isfile(fileName):
-        logger.critical("%s: %s" % ("Unable to access the output file handler", fileName))
+        logger.critical("%s: %s", "Unable to access the output file handler", fileName)
         logger.critical("EXIT_CODE: 3")
         sys.exit(3)
 
-    # Create the stream object
-    outStream = open(fileName, 'w')
+    # The shards go first, the config itself last
+    manifest = shards.readManifest(fileName)
+    if manifest is None:
+        parts = [(fileName, sourceDictionary, touched)]
+    else:
+        split = shards.splitData(fileName, sourceDictionary, manifest)
+        groups = None if touched is None else shards.groupNames(fileName, touched, manifest)
+        parts = [(path, split[path], groups and groups[path]) for path in sorted(split) if path != fileName and (groups is None or path in groups)]
+        if groups is None or fileName in groups:
+            parts.append((fileName, split[fileName], groups and groups[fileName]))
 
-    # Perform the import process
+    for path, dictionary, names in parts:
+        if not writeYamlFile(path, dictionary, names):
+            return False
+    logger.debug("%s: %d", "Configuration successfully exported to the file handler, files", len(parts))
+
+    # Render the export scripts of the merged view, written after the YAML so they are
+    # never newer than a stale one
+    mergedData, origins = importMergedData(fileName)
+    if 'error' not in mergedData:
+        exportScripts(mergedData, fileName)
+    return True
+
+def writeYamlFile(fileName, dictionary, touched=None):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    # Patch the changed values in place of a dump, the rest of the file stays as it is
+    patched = patchYamlContent(fileName, dictionary, touched) if dictionary else None
+    if patched is not None:
+        content, changed = patched
+        if not changed:
+            logger.debug("%s: %s", "Configuration unchanged, nothing written to", fileName)
+            return True
+        logger.debug("%s: %s (%d values)", "Configuration patched", fileName, changed)
+
+    # Perform the export process
+    else:
+        initialiseYaml()
+        try:
+            content = dump(dictionary, Dumper=Dumper, default_flow_style=False) if dictionary else ''
+        except:
+            logger.critical("Failed to export the configuration to file handler!")
+            return False
+
+    # Write a temporary file and rename it over the config, readers never see a torn file
+    try:
+        stat = transaction.writeAtomic(fileName, content)
+    except (IOError, OSError), error:
+        logger.critical("%s: %s", "Failed to export the configuration to file handler!", error)
+        return False
+
+    # Write the snapshot through, so the next reader does not parse the YAML again
+    signature = (stat.st_ino, stat.st_size, stat.st_mtime)
+    if not snapshot.writeSnapshot(fileName, signature, content, dictionary):
+        logger.debug("%s: %s", "Unable to write the snapshot for", fileName)
+    return True
+
+def patchYamlContent(fileName, dictionary, touched=None):
     try:
-        output = dump(sourceDictionary, outStream, Dumper=Dumper, default_flow_style=False)
-        logger.debug("%s" % ("Configuration successfully exported to the file handler."))
+        signature, content = snapshot.readSource(fileName)
+    except (IOError, OSError):
+        return None
+    if not content:
+        return None
+
+    # Without the touched names the stored values tell what changed, the keys have to be the same
+    if touched is None:
+        stored = snapshot.readSnapshot(fileName, signature, content)
+        if not isinstance(stored, dict) or len(stored) != len(dictionary):
+            return None
+        touched = []
+        for name, value in dictionary.iteritems():
+            if name not in stored:
+                return None
+            if stored[name] != value or type(stored[name]) is not type(value):
+                touched.append(name)
+
+    touched = set(touched)
+    located = spans.locateSpans(content, touched)
+    changes = []
+    for name in touched:
+        if name not in dictionary:
+            if name in located:
+                return None
+            continue
+        span = located.get(name)
+        if span is None:
+            return None
+
+        oldText = content[span[0]:span[1]]
+        text = spans.scalarText(dictionary[name], oldText)
+        if text is None:
+            text = scalarYaml(dictionary[name])
+            if text is None:
+                return None
+        if text != oldText:
+            changes.append((span[0], span[1], text))
+    return spans.patchContent(content, changes), len(changes)
+
+def scalarYaml(value):
+    if isinstance(value, dict):
+        return None
+    initialiseYaml()
+    try:
+        text = dump(value, Dumper=Dumper, default_flow_style=True, width=1 << 30)
     except:
-        logger.critical("Failed to export the configuration to file handler!")
+        return None
+    if text.endswith('\n...\n'):
+        text = text[:-4]
+    text = text.rstrip('\n')
+    return None if '\n' in text else text
+# }}}
+
+# YAML: Define an "Export Scripts" function {{{
+# ;---------------------------------------------------------------------------
+# ; Export Scripts:
+# ;     Writes the pre-rendered bash / zsh / tcsh export scripts beside the
+# ;     YAML file. A failure is logged, the shell then falls back to the
+# ;     Python tool. Returns True on success.
+# ;---------------------------------------------------------------------------
+@profiling.timed('exportScripts')
+def exportScripts(sourceDictionary, fileName):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    try:
+        paths = render.writeScripts(fileName, sourceDictionary, ', '.join(path for label, path in layers.layerStack(fileName)))
+    except (IOError, OSError, TypeError, ValueError), error:
+        logger.error("%s: %s", "Unable to render the export scripts", error)
+        return False
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s: %s", "Export scripts rendered", ', '.join(paths))
+    return True
+# }}}
+
+# YAML: Define a "Commit Changes" function {{{
+# ;---------------------------------------------------------------------------
+# ; Commit Changes:
+# ;     Commits the difference between two states of the localsite config
+# ;     as journal records (one per changed flag) instead of a rewrite. The
+# ;     commit growing the journal beyond journal.compactBytes compacts it.
+# ;     Up to date export scripts get the visible changes appended ("origins"
+# ;     of the merged view tells which flags a later layer overrides, and
+# ;     "derivedItems" the derived flags that changed with them), stale ones
+# ;     are rendered again. A published flag table gets the same changes
+# ;     written in place (or is published again). The merged cache is left to
+# ;     the next reader. Returns the number of records. Runs under the config
+# ;     lock.
+# ;---------------------------------------------------------------------------
+@profiling.timed('commitChanges')
+def commitChanges(fileName, oldDictionary, newDictionary, origins=None, derivedItems=()):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    timestamp = time.time()
+    records = [(timestamp, name, oldDictionary.get(name), value) for name, value in newDictionary.iteritems()
+               if name not in oldDictionary or oldDictionary[name] != value]
+    records.extend((timestamp, name, oldDictionary[name], None) for name in oldDictionary if name not in newDictionary)
+    if not records:
+        logger.debug("%s", "Nothing changed, nothing to commit.")
+        return 0
+
+    # The scripts have to be checked before the journal is touched
+    stack = layers.layerStack(fileName)
+    previous = layers.stackSignature(stack)
+    layerFiles = [layerFile for label, path in stack for layerFile in layers.layerFiles(path)]
+    canAppend = render.scriptsFresh(fileName, layerFiles, ', '.join(path for label, path in stack)) and None not in [record[3] for record in records]
+
+    try:
+        journalSize = journal.append(fileName, sorted(records))
+    except (IOError, OSError), error:
+        logger.critical("%s: %s", "Failed to append to the journal", error)
+        return 0
+    logger.debug("%s: %d", "Journal records appended", len(records))
+    replica.invalidate(fileName)
+
+    labels = [label for label, path in stack]
+    upperLabels = set(labels[labels.index('localsite') + 1:])
+    visible = [(name, new) for timestamp, name, old, new in records if (origins or {}).get(name) not in upperLabels]
+    visible = sorted(visible + list(derivedItems))
+
+    # The flag table takes the visible changes in place, anything else publishes it again
+    try:
+        tableUpdated = flagtable.update(fileName, visible, previous, layers.stackSignature(stack))
+    except (IOError, OSError), error:
+        logger.debug("%s: %s", "Unable to update the flag table", error)
+        tableUpdated = False
+
+    # The records stay in the journal when the YAML can not be written, the commit holds
+    if journalSize >= journal.compactBytes and compactJournal(fileName):
+        return len(records)
+
+    if canAppend:
+        try:
+            canAppend = render.appendScripts(fileName, visible, os.stat(journal.journalPath(fileName)).st_mtime)
+        except (IOError, OSError), error:
+            logger.debug("%s: %s", "Unable to append to the export scripts", error)
+            canAppend = False
+    if canAppend and tableUpdated:
+        return len(records)
+
+    mergedData, mergedOrigins = importMergedData(fileName)
+    if 'error' not in mergedData and not canAppend:
+        exportScripts(mergedData, fileName)
+    return len(records)
+# }}}
+
+# YAML: Define a "Compact Journal" function {{{
+# ;---------------------------------------------------------------------------
+# ; Compact Journal:
+# ;     Folds the journal into the YAML (and its snapshot) and moves its
+# ;     records to the history. "dictionary" is the replayed state when the
+# ;     caller has it. Runs under the config lock. Returns False if there
+# ;     was nothing to compact, None if the YAML could not be written (the
+# ;     journal is kept).
+# ;---------------------------------------------------------------------------
+@profiling.timed('compactJournal')
+def compactJournal(fileName, dictionary=None):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    content = journal.readJournal(fileName)
+    if not content:
+        return False
+
+    if dictionary is None:
+        dictionary = importYamlData(fileName)
+        if not isinstance(dictionary, dict) or 'error' in dictionary:
+            logger.critical("%s: %s", "Refusing to compact a broken configuration", fileName)
+            logger.critical("EXIT_CODE: 8")
+            sys.exit(8)
+
+    # Only the shards holding a journal record are written again
+    if not exportYamlData(dictionary, fileName, [record[1] for record in journal.parseRecords(content)]):
+        logger.critical("%s: %s", "Failed to compact the journal, it is kept for", fileName)
+        return None
+    journal.archive(fileName)
+    logger.debug("%s: %s", "Journal compacted into", fileName)
+
+    # The merged cache was written with the journal still in place
+    importMergedData(fileName)
+    return True
+# }}}
+
+# YAML: Define the "Shard Config" / "Merge Shards" functions {{{
+# ;---------------------------------------------------------------------------
+# ; Shard Config:
+# ;     Splits a config over one shard per flag namespace (see
+# ;     modules/shards.py), the journal is folded in. A sharded config gets
+# ;     the shards of its new namespaces. Returns the number of shards.
+# ;
+# ; Merge Shards:
+# ;     Folds the shards (and the journal) back into the config and removes
+# ;     them. Returns False for a config without shards.
+# ;
+# ;     Both run under the config lock. The files change in an order every
+# ;     reader in between merges to the same flags.
+# ;---------------------------------------------------------------------------
+@profiling.timed('shardConfig')
+def shardConfig(fileName):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    dictionary = importYamlData(fileName)
+    if not isinstance(dictionary, dict) or 'error' in dictionary:
+        logger.critical("%s: %s", "Refusing to shard a broken configuration", fileName)
+        logger.critical("EXIT_CODE: 8")
+        sys.exit(8)
+
+    manifest = shards.readManifest(fileName) or {}
+    for name in dictionary:
+        namespace = shards.namespace(name)
+        if namespace is not None and namespace not in manifest:
+            manifest[namespace] = shards.shardPath(fileName, namespace)
+
+    # The shards are written before the manifest points at them, the config last
+    parts = shards.splitData(fileName, dictionary, manifest)
+    for path in sorted(parts):
+        if path != fileName and not writeYamlFile(path, parts[path]):
+            return 0
+    try:
+        transaction.writeAtomic(shards.manifestPath(fileName), shards.formatManifest(manifest))
+    except (IOError, OSError), error:
+        logger.critical("%s: %s", "Failed to write the shard manifest", error)
+        return 0
+    if not writeYamlFile(fileName, parts[fileName]):
+        return 0
+    journal.archive(fileName)
+    logger.debug("%s: %s (%d shards)", "Configuration sharded", fileName, len(manifest))
+
+    mergedData, origins = importMergedData(fileName)
+    if 'error' not in mergedData:
+        exportScripts(mergedData, fileName)
+    return len(manifest)
+
+@profiling.timed('mergeShards')
+def mergeShards(fileName):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    manifest = shards.readManifest(fileName)
+    if manifest is None:
+        return False
+
+    dictionary = importYamlData(fileName)
+    if not isinstance(dictionary, dict) or 'error' in dictionary:
+        logger.critical("%s: %s", "Refusing to merge a broken configuration", fileName)
+        logger.critical("EXIT_CODE: 8")
+        sys.exit(8)
+
+    # The config holds every flag before the manifest is gone
+    if not writeYamlFile(fileName, dictionary):
+        return False
+    os.remove(shards.manifestPath(fileName))
+    for path in manifest.itervalues():
+        for shardFile in (path, snapshot.snapshotPath(path)):
+            try:
+                os.remove(shardFile)
+            except OSError:
+                pass
+    journal.archive(fileName)
+    logger.debug("%s: %s (%d shards)", "Configuration shards merged", fileName, len(manifest))
+
+    mergedData, origins = importMergedData(fileName)
+    if 'error' not in mergedData:
+        exportScripts(mergedData, fileName)
+    return True
+# }}}
+
+# YAML: Define a "Publish Table" function {{{
+# ;---------------------------------------------------------------------------
+# ; Publish Table:
+# ;     Publishes the flag table of the merged view (see modules/flagtable.py),
+# ;     "data" merged from the stack of "signature" when the caller has them.
+# ;     Returns True once published.
+# ;---------------------------------------------------------------------------
+@profiling.timed('publishTable')
+def publishTable(fileName, data=None, signature=None):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    if data is None:
+        signature = layers.stackSignature(layers.layerStack(fileName))
+        data, origins = importMergedData(fileName)
+        if 'error' in data:
+            return False
+
+    try:
+        published = flagtable.publish(fileName, data, signature)
+    except (IOError, OSError), error:
+        logger.error("%s: %s", "Unable to publish the flag table", error)
+        return False
+
+    if not published:
+        logger.debug("%s: %s", "The layers changed, flag table left to the next commit for", fileName)
+    return published
+# }}}
+
+# YAML: Define a "Point In Time Importer" function {{{
+# ;---------------------------------------------------------------------------
+# ; Import Merged Data At:
+# ;     The merged (data, origins) of the layer stack as it was at
+# ;     "timestamp", every layer rewound through its journal history.
+# ;---------------------------------------------------------------------------
+def importMergedDataAt(fileName, timestamp):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    layerData = []
+    for label, path in layers.layerStack(fileName):
+        if label != 'localsite' and not os.path.isfile(path):
+            continue
+
+        incomingData = importYamlData(path)
+        if not isinstance(incomingData, dict) or 'error' in incomingData:
+            logger.critical("%s: %s (%s)", "Broken configuration layer", path, label)
+            return {'error':'broken data handler'}, {}
+        layerData.append((label, journal.rewind(incomingData, path, timestamp)))
+
+    data, origins = layers.mergeLayers(layerData)
+    if not evaluateDerived(data, origins):
+        return {'error':'broken data handler'}, {}
+    return data, origins
+# }}}
+
+# YAML: Define an "Evaluate Derived" function {{{
+# ;---------------------------------------------------------------------------
+# ; Evaluate Derived:
+# ;     Adds the derived flags to a merged dictionary (see modules/derived.py).
+# ;     Returns False for broken definitions (a malformed expression, a cycle).
+# ;---------------------------------------------------------------------------
+def evaluateDerived(data, origins=None):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    try:
+        derived.evaluateData(data, origins)
+    except ValueError, error:
+        logger.critical("%s: %s", "Broken derived flags", error)
+        return False
+    return True
 # }}}
 
 # Any additional function goes here.
@@ -151,16 +785,70 @@ def exportYamlData(sourceDictionary, fileName):
 # ;     This is one of the main operational functions. The role of this
 # ;     function is to get the flags for the "targetObject".
 # ;---------------------------------------------------------------------------
-def executeGet(yamlObject, devVar):
+def executeGet(yamlObject, devVar, matches=()):
     # Link to logger
     logger = logging.getLogger('unimog.unimogdev.utilities')
-    logger.debug("%s: %s\n" % ("<get> call for", yamlObject))
+    logger.debug("%s: %s\n", "<get> call for", yamlObject)
+
+    # Several variables or patterns print "NAME=0/1" lines (the text of a typed value)
+    if len(devVar) != 1 or matches or isPattern(devVar[0]):
+        flags = yamlObject.flags
+        names = selectNames(yamlObject, devVar, matches)
+        for name in names:
+            if name in flags:
+                print '{}={}'.format(name, schema.textValue(flags.get(name)))
+            else:
+                logger.critical("\"%s\" %s", name, "is NOT a valid dev variable!")
+        if not names:
+            logger.error("%s", "No dev variable matches the given patterns.")
+        return
 
     try:
-        print ("1" if getattr(yamlObject, devVar[0]) else "0")
-        logger.debug("\"%s\" %s" % (devVar[0], "is a valid dev variable."))
+        print schema.textValue(yamlObject.flags.get(devVar[0]))
+        logger.debug("\"%s\" %s", devVar[0], "is a valid dev variable.")
     except:
-        logger.critical("\"%s\" %s" % (devVar[0], "is NOT a valid dev variable!"))
+        logger.critical("\"%s\" %s", devVar[0], "is NOT a valid dev variable!")
+
+#}}}
+
+# OPERATION: Define a "Streaming Get" function {{{
+# ;---------------------------------------------------------------------------
+# ; The "executeStreamGet" Function:
+# ;     Answers a "get" of plain variable names through the streaming scanner,
+# ;     which stops reading once every name is found and never builds the
+# ;     YamlObj. Returns False (nothing printed) for globs, "--match",
+# ;     unknown variables and documents the scanner can not handle, the
+# ;     caller then loads the configuration and runs "executeGet".
+# ;---------------------------------------------------------------------------
+@profiling.timed('executeStreamGet')
+def executeStreamGet(fileName, devVar, matches=()):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    if not devVar or matches or [variable for variable in devVar if isPattern(variable)]:
+        return False
+
+    stack = layers.layerStack(fileName)
+    try:
+        derivedFree = layers.mergedDerived(fileName, layers.stackSignature(stack)) is False
+        found = scanner.scanLayers(stack, devVar, derivedFree)
+    except (IOError, OSError):
+        return False
+
+    if found is None:
+        logger.debug("%s", "The streaming lookup fell back to the full loader.")
+        return False
+    if len(found) != len(set(devVar)):
+        return False
+
+    if len(devVar) == 1:
+        print ("1" if found[devVar[0]] else "0")
+    else:
+        for variable in devVar:
+            print '{}={}'.format(variable, int(found[variable]))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s: %s", "Streaming lookup answered", ', '.join(devVar))
+    return True
 
 #}}}
 
@@ -171,6 +859,31 @@ def executeGet(yamlObject, devVar):
 # ;     function is to update the flags for the "targetObjects" to TRUE or FALSE.
 # ;---------------------------------------------------------------------------
 def executeSet(yamlObject, devVar, verbosityFlag, state):
+    # Run the update
+    applySet(yamlObject, devVar, verbosityFlag, state)
+
+    # Return the modified YAML object
+    return yamlObject.GetPublicDict()
+
+#}}}
+
+# OPERATION: Define the "Apply Set / Unset" function {{{
+# ;---------------------------------------------------------------------------
+# ; The "applySet" Function:
+# ;     The in-place part of "executeSet", without building the dictionary
+# ;     of the result. Used where several updates end in a single export.
+# ;     "state" is a bool, or {name: value} of validated typed values (see
+# ;     "parseAssignments"). The derived flags downstream of the changed ones
+# ;     are re-evaluated (see modules/derived.py), returns [(name, value)] of
+# ;     those that changed.
+# ;
+# ; The "settableNames" Function:
+# ;     The names without the derived flags of the object, which follow their
+# ;     definition, and without the typed flags unless "typed" is given (a
+# ;     plain set / unset only switches the bool flags). Names left out are
+# ;     reported unless "quiet" is given.
+# ;---------------------------------------------------------------------------
+def applySet(yamlObject, devVar, verbosityFlag, state):
     # This is a hybrid set / unset function, so handle the verbose string
 
     # Link to logger
@@ -179,11 +892,26 @@ def executeSet(yamlObject, devVar, verbosityFlag, state):
     stateSignature = "unset"
     if state: stateSignature = "set"
 
+    # Typed values come as {name: value}
+    values = state if isinstance(state, dict) else None
+
     # Link debugger
-    logger.debug("<%s> %s: %s\n" % (stateSignature, "call for", yamlObject))
+    logger.debug("<%s> %s: %s\n", stateSignature, "call for", yamlObject)
     logger = logging.getLogger('unimog.unimogdev.utilities')
 
     # Cycle over the provided variables
+    flags = yamlObject.flags
+    devVar = settableNames(yamlObject, devVar, typed=values is not None)
+
+    # Quiet runs resolve the indices and update them in bulk
+    if verbosityFlag <= 2:
+        if values is None:
+            flags.assignIndices([flags.index[variable] for variable in devVar if variable in flags.index], state)
+        else:
+            for variable in devVar:
+                if variable in flags.index:
+                    flags.set(variable, values[variable])
+        return yamlObject.propagate(devVar)
 
     # Create a counter
     index = 0
@@ -191,24 +919,115 @@ def executeSet(yamlObject, devVar, verbosityFlag, state):
     # Start iterator
     for variable in devVar:
         # Debug information
-        if verbosityFlag > 2: print "%s%s%s" % ("Variable Cycle [", index, "]")
+        print "%s%s%s" % ("Variable Cycle [", index, "]")
 
         # Check if the provided value is a key in our YAML object
         # If it is, update the flag
-        if variable in yamlObject.GetPublicDict():
-            if verbosityFlag > 2: print "\t%s%s%s{%s}" % ("Current value for [", variable, "] ", getattr(yamlObject, variable))
-            setattr(yamlObject, variable, state)
-            if verbosityFlag > 2: print "\t%s%s%s{%s}" % ("New value for [", variable, "] ", getattr(yamlObject, variable))
+        if variable in flags:
+            print "\t%s%s%s{%s}" % ("Current value for [", variable, "] ", flags.get(variable))
+            flags.set(variable, state if values is None else values[variable])
+            print "\t%s%s%s{%s}" % ("New value for [", variable, "] ", flags.get(variable))
         # If NOT, skip the process
         else:
-            if verbosityFlag > 2: print "\t%s%s%s" % ("Variable [", variable, "] does NOT exist.")
-            if verbosityFlag > 2: print "\t%s" % ("Nothing to process.")
+            print "\t%s%s%s" % ("Variable [", variable, "] does NOT exist.")
+            print "\t%s" % ("Nothing to process.")
 
         # Update the counter
         index = index + 1
 
-    # Return the modified YAML object
-    return yamlObject.GetPublicDict()
+    derivedItems = yamlObject.propagate(devVar)
+    for variable, value in derivedItems:
+        print "\t%s%s%s{%s}" % ("Derived value for [", variable, "] ", value)
+    return derivedItems
+
+def settableNames(yamlObject, devVar, quiet=False, typed=False):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    graph = yamlObject.derivedFlags()
+    if graph is not None:
+        derivedNames = [variable for variable in devVar if variable in graph]
+        if derivedNames and not quiet:
+            logger.warning("%s: %s", "Derived flags follow their definition, not changed", ', '.join(derivedNames))
+        devVar = [variable for variable in devVar if variable not in graph]
+
+    typedNames = () if typed else yamlObject.typedNames()
+    if typedNames:
+        skipped = [variable for variable in devVar if variable in typedNames]
+        if skipped and not quiet:
+            logger.warning("%s: %s", "Typed flags take a value (NAME=VALUE), not changed", ', '.join(skipped))
+        devVar = [variable for variable in devVar if variable not in typedNames]
+    return devVar
+
+#}}}
+
+# OPERATION: Define the "Layered Set / Unset" function {{{
+# ;---------------------------------------------------------------------------
+# ; The "applyLayeredSet" Function:
+# ;     Runs "applySet" on the localsite layer ("localObject") and keeps the
+# ;     merged view ("mergedObject", "origins") in step. Flags defined by
+# ;     another layer only are copied into the localsite layer first, flags
+# ;     overridden by a later (show, user) layer are changed locally but stay
+# ;     as they are in the merged view. The derived flags are only part of
+# ;     the merged view, returns [(name, value)] of those that changed.
+# ;     "state" is the one of "applySet".
+# ;---------------------------------------------------------------------------
+def applyLayeredSet(localObject, mergedObject, origins, devVar, verbosityFlag, state):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    if mergedObject is localObject:
+        return applySet(localObject, devVar, verbosityFlag, state)
+
+    devVar = settableNames(mergedObject, devVar, typed=isinstance(state, dict))
+    flags = localObject.flags
+    for variable in devVar:
+        if variable not in flags and variable in mergedObject.flags:
+            flags.add(variable, mergedObject.flags.get(variable))
+    applySet(localObject, devVar, verbosityFlag, state)
+
+    labels = [label for label, variable in layers.layerVariables]
+    overriding = labels[labels.index('localsite') + 1:]
+    shadowed = [variable for variable in devVar if origins.get(variable) in overriding]
+    if shadowed:
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning("%s: %s", "Overridden by a later layer, the change is not visible", ', '.join(shadowed))
+
+    visible = [variable for variable in devVar if variable in mergedObject.flags and origins.get(variable) not in overriding]
+    derivedItems = applySet(mergedObject, visible, 0, state)
+    origins.update(dict.fromkeys(visible, 'localsite'))
+    return derivedItems
+
+#}}}
+
+# OPERATION: Define the "Assignments" functions {{{
+# ;---------------------------------------------------------------------------
+# ; The "splitAssignments" Function:
+# ;     (targets, [(name, text)]) of the targets of a "set", a "NAME=VALUE"
+# ;     target assigns a typed value.
+# ;
+# ; The "parseAssignments" Function:
+# ;     ({name: value}, [error]) of the assignments. The values are parsed in
+# ;     one pass by the validators of the schema of "yamlObject" (see
+# ;     modules/schema.py), an unknown flag is an error and a broken schema
+# ;     refuses every value.
+# ;---------------------------------------------------------------------------
+def splitAssignments(targets):
+    assignments = [tuple(target.split('=', 1)) for target in targets if '=' in target]
+    if not assignments:
+        return targets, assignments
+    return [target for target in targets if '=' not in target], assignments
+
+def parseAssignments(yamlObject, assignments):
+    try:
+        compiled = yamlObject.schema()
+    except ValueError, error:
+        return {}, ["%s: %s" % ("Invalid schema", error)]
+
+    values, errors = compiled.parseValues(assignments)
+    flags = yamlObject.flags
+    errors.extend("\"%s\" %s" % (name, "is NOT a valid dev variable!") for name in sorted(values) if name not in flags)
+    return values, errors
 
 #}}}
 
@@ -216,28 +1035,672 @@ def executeSet(yamlObject, devVar, verbosityFlag, state):
 # ;---------------------------------------------------------------------------
 # ; The "executeList" Function:
 # ;     This is one of the main operational functions. The role of this
-# ;     function is to list the flags for the "targetObject(s)".
+# ;     function is to list the flags for the "targetObject(s)". The output
+# ;     is written to stdout chunk by chunk as the emitter of the mode
+# ;     produces it (see modules/emitters.py). Returns False for an unknown
+# ;     mode.
 # ;---------------------------------------------------------------------------
-def executeList(yamlObject, mode="default"):
+def executeList(yamlObject, mode="default", positions=None, origins=None):
     # Link debugger
     logger = logging.getLogger('unimog.unimogdev.utilities')
-    logger.debug("%s: %s\n" % ("<list> call for", yamlObject))
+    logger.debug("%s: %s\n", "<list> call for", yamlObject)
+
+    return emitters.writeList(sys.stdout, mode, listNames(yamlObject, positions), yamlObject.flags.get, origins)
 
+#}}}
+
+# OPERATION: Define a "Shard List" function {{{
+# ;---------------------------------------------------------------------------
+# ; The "executeShardList" Function:
+# ;     Lists a sharded config one shard at a time, the config first and
+# ;     then the shards in namespace order, each sorted by name. Only one
+# ;     shard is held at a time. Returns None (nothing written) when the
+# ;     mode or the config needs the whole merged view: the default table,
+# ;     a layer stack, derived flags.
+# ;---------------------------------------------------------------------------
+def executeShardList(fileName, mode="default"):
+    # Link debugger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    manifest = shards.readManifest(fileName)
+    if manifest is None or mode in ("default", "python") or mode not in emitters.modeEmitters or len(layers.layerStack(fileName)) > 1:
+        return None
+
+    # The journal is applied shard by shard, the config without its shards first
+    records = journal.parseRecords(journal.readJournal(fileName))
+    inData = importYamlData(fileName, useJournal=False, names=())
+    if not isinstance(inData, dict) or 'error' in inData or derived.derivedKey in inData:
+        return None
+    for key in layers.reservedKeys:
+        inData.pop(key, None)
+
+    changes = dict((name, new) for timestamp, name, old, new in records)
+    pending = shards.groupNames(fileName, changes, manifest)
+
+    # The emitters read the values of a chunk of names before the next one is
+    # taken, only the last two chunks are kept
+    values = {}
+    recent = deque()
+
+    def shardNames():
+        for path in [fileName] + sorted(set(manifest.itervalues())):
+            data = inData if path == fileName else importYamlData(path, useJournal=False)
+            if not isinstance(data, dict) or 'error' in data:
+                data = {}
+                if path != fileName:
+                    logger.error("%s: %s", "Skipping a broken configuration shard", path)
+            for name in pending.get(path, ()):
+                if changes[name] is None:
+                    data.pop(name, None)
+                else:
+                    data[name] = changes[name]
+
+            logger.debug("%s: %s (%d flags)", "Listing the shard", path, len(data))
+            for name in sorted(data):
+                values[name] = data[name]
+                recent.append(name)
+                if len(recent) > emitters.chunkSize * 2:
+                    values.pop(recent.popleft(), None)
+                yield name
+
+    return emitters.writeList(sys.stdout, mode, shardNames(), values.get)
+
+#}}}
+
+# OPERATION: Define a "List Formatter" function {{{
+# ;---------------------------------------------------------------------------
+# ; The "listNames" Function:
+# ;     The names at "positions" (every name without them).
+# ;
+# ; The "formatList" Function:
+# ;     Returns the "list" output for the given mode as a string (None for an
+# ;     unknown mode), so it can be sent over the daemon socket or collected
+# ;     by a batch. With "origins" (name -> layer) the default, python and
+# ;     jsonl modes report the layer of every value, the shell modes stay
+# ;     sourceable.
+# ;---------------------------------------------------------------------------
+def listNames(yamlObject, positions=None):
+    names = yamlObject.flags.names
+    if positions is None:
+        return names
+    return [names[position] for position in positions]
+
+def formatList(yamlObject, mode="default", positions=None, origins=None):
+    emitted = emitters.emit(mode, listNames(yamlObject, positions), yamlObject.flags.get, origins)
+    if emitted is None:
+        return None
+
+    # The callers print it, the last newline is theirs
+    listString = ''.join(emitted)
+    return listString[:-1] if listString.endswith('\n') else listString
+
+#}}}
+
+# OPERATION: Define a "History" function {{{
+# ;---------------------------------------------------------------------------
+# ; The "parseTimestamp" Function:
+# ;     Seconds since the epoch, or a local "YYYY-MM-DD[ HH:MM[:SS]]" time
+# ;     ("T" between the date and the time works as well). Raises ValueError.
+# ;
+# ; The "executeHistory" Function:
+# ;     Prints the journal history of the selected flags (names, globs,
+# ;     "--match" regular expressions) of every layer, oldest first:
+# ;
+# ;         2026-10-18 11:22:33.418230 UNIMOG_NUKE_DEV 1 -> 0 (localsite)
+# ;---------------------------------------------------------------------------
+def parseTimestamp(text):
+    try:
+        return float(text)
+    except ValueError:
+        pass
+
+    for timeFormat in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return time.mktime(time.strptime(text.replace('T', ' '), timeFormat))
+        except ValueError:
+            pass
+    raise ValueError("Unknown time format: %s" % (text))
+
+def executeHistory(fileName, devVar, matches=()):
+    names = set(target for target in devVar if not isPattern(target))
+    patterns = [globToRegex(target) for target in devVar if isPattern(target)] + list(matches)
+    combined = re.compile('|'.join('(?:%s)' % (pattern) for pattern in patterns)) if patterns else None
+
+    def selected(name):
+        if not names and combined is None:
+            return True
+        return name in names or (combined is not None and combined.search(name) is not None)
+
+    records = []
+    for label, path in layers.layerStack(fileName):
+        records.extend((timestamp, name, old, new, label) for timestamp, name, old, new in journal.readHistory(path) if selected(name))
+
+    for timestamp, name, old, new, label in sorted(records):
+        seconds, micro = int(timestamp), int(round((timestamp - int(timestamp)) * 1e6))
+        if micro == 1000000:
+            seconds, micro = seconds + 1, 0
+        print "%s.%06d %s %s -> %s (%s)" % (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(seconds)), micro, name, journal.encodeValue(old), journal.encodeValue(new), label)
+    return len(records)
+#}}}
+
+# OPERATION: Define a "Commit Set / Unset" function {{{
+# ;---------------------------------------------------------------------------
+# ; The "commitSet" Function:
+# ;     Runs the whole read-modify-write cycle of a "set" / "unset" under the
+# ;     advisory lock of the config file. Mutations queued behind the lock by
+# ;     other writers are coalesced into the same commit (group commit).
+# ;     "mode" is "all" or "default", as on the command line. A "set" of
+# ;     "NAME=VALUE" targets is validated against the schema when it is
+# ;     applied, an invalid value drops the whole command (exit code 4 for
+# ;     its own writer, a warning from the writer that committed it).
+# ;     Returns the number of mutations committed by this call (0 when
+# ;     another writer committed ours).
+# ;---------------------------------------------------------------------------
+@profiling.timed('commitSet')
+def commitSet(fileName, devVar, verbosityFlag, state, mode="default", matches=()):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    # Variable names are plain words, the queue is tab separated and the
+    # regular expressions are queued with a "~" prefix. The value of a
+    # "NAME=VALUE" assignment may hold spaces
+    def isQueueable(variable):
+        name, equals, value = variable.partition('=')
+        return name.split() == [name] and '\t' not in value and '\n' not in value
+
+    mode = "all" if mode == "all" else "default"
+    devVar = [variable for variable in devVar if isQueueable(variable)]
+    devVar = devVar + ['~' + match for match in matches if '\t' not in match and '\n' not in match]
+    payload = '\t'.join(["1" if state else "0", mode] + devVar)
+    rejected = []
+
+    def applyBatch(records):
+        # Plain variable names of a sharded config only need the shards holding them,
+        # derived flags may read any of them
+        names = shardedNames(fileName, records)
+        inData = importYamlData(fileName, names=names)
+        if names is not None and derived.derivedKey in inData:
+            inData = importYamlData(fileName)
+        if not isinstance(inData, dict) or 'error' in inData:
+            logger.critical("%s: %s", "Refusing to modify a broken configuration", fileName)
+            logger.critical("EXIT_CODE: 8")
+            sys.exit(8)
+
+        # Targets are resolved against the merged view of the layers
+        yamlObject = YamlObj(**inData)
+        mergedObject, origins = yamlObject, {}
+        if len(layers.layerStack(fileName)) > 1 or derived.derivedKey in inData:
+            mergedData, origins = importMergedData(fileName)
+            if 'error' in mergedData:
+                logger.critical("%s: %s", "Refusing to modify a broken configuration stack", fileName)
+                logger.critical("EXIT_CODE: 8")
+                sys.exit(8)
+            mergedObject = YamlObj(**mergedData)
+
+        derivedItems = {}
+        refused = []
+        for index, (isOwn, record) in enumerate(records):
+            fields = record.split('\t')
+            patterns, assignments = splitAssignments(fields[2:])
+
+            # The typed values of a command are validated together, one invalid value drops it.
+            # A refused set of another writer stays queued, that writer reports its own error
+            if assignments:
+                values, errors = parseAssignments(mergedObject, assignments)
+                if errors:
+                    for error in errors:
+                        if isOwn:
+                            logger.error("%s: %s", "Invalid value", error)
+                        else:
+                            logger.debug("%s: %s", "Leaving a queued set to its writer, invalid value", error)
+                    if isOwn:
+                        rejected.append(record)
+                    else:
+                        refused.append(index)
+                    continue
+                derivedItems.update(applyLayeredSet(yamlObject, mergedObject, origins, sorted(values), verbosityFlag if isOwn else 0, values))
+                if not patterns:
+                    continue
+
+            targets = [field for field in patterns if not field.startswith('~')]
+            targets = selectNames(mergedObject, targets, [field[1:] for field in patterns if field.startswith('~')])
+            if fields[1] == "all":
+                targets = settableNames(mergedObject, extractKeys(mergedObject.flags), quiet=True)
+            derivedItems.update(applyLayeredSet(yamlObject, mergedObject, origins, targets, verbosityFlag if isOwn else 0, fields[0] == "1"))
+
+        logger.debug("%s: %d", "Mutations in this commit", len(records))
+        commitChanges(fileName, inData, yamlObject.GetPublicDict(), origins, derivedItems.items())
+        return refused
+
+    committed = transaction.commitMutation(fileName, payload, applyBatch)
+    if rejected:
+        # Exit
+        logger.critical("EXIT_CODE: 4")
+        sys.exit(4)
+    return committed
+
+#}}}
+
+# OPERATION: Define a "Sharded Names" function {{{
+# ;---------------------------------------------------------------------------
+# ; The "shardedNames" Function:
+# ;     The variable names of the queued "set" / "unset" records when the
+# ;     config is sharded and they are all plain names, None otherwise (the
+# ;     whole config is needed for "all", globs and "--match" patterns).
+# ;---------------------------------------------------------------------------
+def shardedNames(fileName, records):
+    if shards.readManifest(fileName) is None:
+        return None
+
+    names = []
+    for isOwn, record in records:
+        fields = record.split('\t')
+        targets = [field.split('=', 1)[0] for field in fields[2:]]
+        if fields[1] == "all" or [target for target in targets if target.startswith('~') or isPattern(target)]:
+            return None
+        names.extend(targets)
+    return names
+
+#}}}
+
+# OPERATION: Define a "Batch Operation Parser" function {{{
+# ;---------------------------------------------------------------------------
+# ; The "parseOperation" Function:
+# ;     Splits a batch line ("set UNIMOG_NUKE_DEV", "list --mode=bash") into
+# ;     (function, mode, targets, matches) using shell quoting rules. Returns
+# ;     None for blank and "#" comment lines, raises ValueError otherwise.
+# ;---------------------------------------------------------------------------
+def parseOperation(line):
+    words = shlex.split(line, comments=True)
+    if not words:
+        return None
+
+    function = words[0]
+    mode = "default"
+    targets = []
+    matches = []
+
+    index = 1
+    while index < len(words):
+        if words[index] in ('--mode', '--match') and index + 1 >= len(words):
+            raise ValueError("%s needs a value" % (words[index]))
+        elif words[index] == '--mode':
+            mode = words[index + 1]
+            index = index + 2
+        elif words[index].startswith('--mode='):
+            mode = words[index][len('--mode='):]
+            index = index + 1
+        elif words[index] == '--match':
+            matches.append(words[index + 1])
+            index = index + 2
+        elif words[index].startswith('--match='):
+            matches.append(words[index][len('--match='):])
+            index = index + 1
+        elif words[index].startswith('-'):
+            raise ValueError("Unsupported option: %s" % (words[index]))
+        else:
+            targets.append(words[index])
+            index = index + 1
+
+    if function not in ('get', 'set', 'unset', 'list'):
+        raise ValueError("Unsupported function: %s" % (function))
+
+    for pattern in matches:
+        try:
+            re.compile(pattern)
+        except re.error, error:
+            raise ValueError("Invalid --match pattern: %s (%s)" % (pattern, error))
+
+    return function, mode, targets, matches
+
+#}}}
+
+# OPERATION: Define a "Batch" function {{{
+# ;---------------------------------------------------------------------------
+# ; The "executeBatch" Function:
+# ;     Runs a stream of get/set/unset/list lines against a single in-memory
+# ;     YamlObj. A batch with mutations holds the config lock from the load
+# ;     to its single export. The answers are printed in order once every
+# ;     operation succeeded; a failing operation (an unknown variable, a bad
+# ;     option) discards the whole batch and nothing is committed.
+# ;     Returns True on success.
+# ;---------------------------------------------------------------------------
+@profiling.timed('executeBatch')
+def executeBatch(fileName, lines, verbosityFlag):
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    # Parse the whole stream before touching the config
+    startTime = time.time()
+    operations = []
+    for lineNumber, line in enumerate(lines, 1):
+        try:
+            operation = parseOperation(line)
+        except ValueError, error:
+            logger.error("%s %d: %s", "Batch line", lineNumber, error)
+            return False
+        if operation is not None:
+            operations.append((lineNumber,) + operation)
+
+    mutations = len([operation for operation in operations if operation[1] in ('set', 'unset')])
+    parseTime = time.time()
+
+    lock = transaction.FileLock(fileName)
+    if mutations:
+        lock.acquire()
+    try:
+        # Queries see the merged view of the layers, mutations go to the localsite layer
+        inData = importYamlData(fileName)
+        mergedData, origins = importMergedData(fileName)
+        if not isinstance(inData, dict) or 'error' in inData or 'error' in mergedData:
+            logger.error("%s: %s", "Unable to run a batch on a broken configuration", fileName)
+            return False
+        localObject = YamlObj(**inData)
+        yamlObject = localObject
+        if len(layers.layerStack(fileName)) > 1 or derived.derivedKey in inData:
+            yamlObject = YamlObj(**mergedData)
+        flags = yamlObject.flags
+        loadTime = time.time()
+
+        answers = []
+        derivedItems = {}
+        for lineNumber, function, mode, targets, matches in operations:
+            targets, assignments = splitAssignments(targets) if function == 'set' else (targets, [])
+            names = selectNames(yamlObject, targets, matches)
+            unknown = [name for name in names if name not in flags]
+            failure = None
+
+            if unknown:
+                failure = "\"%s\" is NOT a valid dev variable!" % (unknown[0])
+            elif function == 'get':
+                if not targets and not matches:
+                    failure = "<get> needs a variable, a glob or a --match pattern."
+                elif len(targets) == 1 and not matches and not isPattern(targets[0]):
+                    answers.append(schema.textValue(flags.get(names[0])))
+                elif names:
+                    answers.append('\n'.join('{}={}'.format(name, schema.textValue(flags.get(name))) for name in names))
+            elif function == 'list':
+                listString = formatList(yamlObject, mode, selectPositions(yamlObject, targets, matches))
+                if listString is None:
+                    failure = "Unknown --mode: %s" % (mode)
+                else:
+                    answers.append(listString)
+            elif mode == "all":
+                if targets or matches or assignments:
+                    failure = "No arguments allowed after --all."
+                else:
+                    derivedItems.update(applyLayeredSet(localObject, yamlObject, origins, settableNames(yamlObject, extractKeys(flags), quiet=True), verbosityFlag, function == 'set'))
+            elif mode != "default":
+                failure = "Unknown --mode: %s" % (mode)
+            else:
+                values, errors = parseAssignments(yamlObject, assignments) if assignments else ({}, [])
+                if errors:
+                    failure = "Invalid value: %s" % (errors[0])
+                else:
+                    if values:
+                        derivedItems.update(applyLayeredSet(localObject, yamlObject, origins, sorted(values), verbosityFlag, values))
+                    if targets or matches or not values:
+                        derivedItems.update(applyLayeredSet(localObject, yamlObject, origins, names, verbosityFlag, function == 'set'))
+
+            if failure is not None:
+                logger.error("%s %d: %s", "Batch line", lineNumber, failure)
+                logger.error("%s", "The batch is discarded, nothing was committed.")
+                return False
+        applyTime = time.time()
+
+        # A single commit for the whole batch
+        if mutations:
+            commitChanges(fileName, inData, localObject.GetPublicDict(), origins, derivedItems.items())
+    finally:
+        lock.release()
+    commitTime = time.time()
+
+    for answer in answers:
+        print answer
+
+    logger.info("%s: %d operations (%d mutations) in %.3f ms (parse %.3f, load %.3f, apply %.3f, commit %.3f)",
+        "Batch", len(operations), mutations, (commitTime - startTime) * 1000, (parseTime - startTime) * 1000,
+        (loadTime - parseTime) * 1000, (applyTime - loadTime) * 1000, (commitTime - applyTime) * 1000)
+    return True
+
+#}}}
+
+# OPERATION: Define a "Diff" function {{{
+# ;---------------------------------------------------------------------------
+# ; The "exportValue" Function:
+# ;     The text a value is exported with ("1" / "0" for the flags, the text
+# ;     of a typed value).
+# ;
+# ; The "environmentFlags" Function:
+# ;     {name: text} of the flags in the environment: the names of "flags"
+# ;     and the ones this tool exported before (a flag gone from the config),
+# ;     listed in $UNIMOG_DEV_EXPORTED. Other variables are never touched.
+# ;
+# ; The "diffFlags" Function:
+# ;     [(name, old, new)] of the flags that differ between two {name: value}
+# ;     dictionaries, in name order, None for a missing flag. Every name is
+# ;     looked up once in the other dictionary and only the changes are
+# ;     sorted, the cost stays linear in the size of the configs. With
+# ;     "exported" the old side holds exported texts (the environment), the
+# ;     new values are compared as they would be exported. The reserved keys
+# ;     (the derived definitions) are left out, the derived values are not.
+# ;
+# ; The "executeDiff" Function:
+# ;     Prints the changes from "oldFlags" to "newFlags" for a mode:
+# ;
+# ;         default         : UNIMOG_MAYA_DEV 1 -> 0    ("-" for a missing flag)
+# ;         json            : [{"name": ..., "old": ..., "new": ...}, ...]
+# ;         bash, zsh, tcsh : the exports / unsets turning old into new
+# ;
+# ;     The shell modes of an "exported" diff also export the names of the
+# ;     new flags (see render.exportedLine) when they changed.
+# ;     Returns the number of changes, None for an unknown mode.
+# ;---------------------------------------------------------------------------
+def exportValue(value):
+    if isinstance(value, (bool, int, long)):
+        return '%d' % (value)
+    return schema.textValue(value)
+
+def environmentFlags(flags, environment=None):
+    environment = os.environ if environment is None else environment
+    exported = set(environment.get(render.exportedVariable, '').split(render.exportedSeparator))
+    return dict((name, text) for name, text in environment.iteritems() if name in flags or name in exported)
+
+def diffFlags(oldFlags, newFlags, exported=False):
+    changes = []
+    for name, value in newFlags.iteritems():
+        if name in layers.reservedKeys or exported and not render.variablePattern.match(name):
+            continue
+        if name not in oldFlags:
+            changes.append((name, None, value))
+        elif oldFlags[name] != (exportValue(value) if exported else value):
+            changes.append((name, oldFlags[name], value))
+    changes.extend((name, value, None) for name, value in oldFlags.iteritems() if name not in newFlags and name not in layers.reservedKeys)
+    changes.sort(key=lambda change: change[0])
+    return changes
+
+def executeDiff(oldFlags, newFlags, mode="default", exported=False):
+    if mode not in ("default", "json") and mode not in render.scriptShells:
+        return None
+
+    changes = diffFlags(oldFlags, newFlags, exported)
     if mode == "default":
-        # Print the results
-        print ""
-        yamlObject.listElements()
-        print ""
-    elif mode == "bash":
-        pythonDict = yamlObject.GetPublicDict()
-        bashString = ' '.join('{}={}'.format(key, int(val)) for key, val in pythonDict.items())
-        print bashString
-
-    elif mode == "python":
-        pythonDict = yamlObject.GetPublicDict()
-        print pythonDict
+        for name, old, new in changes:
+            print "%s %s -> %s" % (name, '-' if old is None else exportValue(old), '-' if new is None else exportValue(new))
+    elif mode == "json":
+        import json
+        print json.dumps([{'name' : name, 'old' : old, 'new' : new} for name, old, new in changes], default=str)
     else:
-        pass
+        lines = render.renderPatch(changes, mode)
+        names = sorted(newFlags)
+        if exported and os.environ.get(render.exportedVariable) != render.exportedNames(names):
+            lines.append(render.exportedLine(names, mode))
+        if lines:
+            print '\n'.join(lines)
+    return len(changes)
+
+#}}}
+
+# OPERATION: Define a "Recursive" function {{{
+# ;---------------------------------------------------------------------------
+# ; The "findConfigs" Function:
+# ;     Every "unimogDev.yaml" below the root folder, in sorted order.
+# ;
+# ; The "recursiveSetup" / "recursiveTask" Functions:
+# ;     Run in the pool processes. Every config of a tree is a stack of its
+# ;     own, the layer variables are cleared. A task returns (path, flags,
+# ;     changed, error): the selected flags after the operation and the
+# ;     number of records a "set" / "unset" committed. A "set" / "unset"
+# ;     holds the lock of its file and commits through its journal, it
+# ;     fails without a target, a --match pattern or "--mode=all".
+# ;
+# ; The "executeRecursive" Function:
+# ;     Runs a "list", "set" or "unset" on every config below "root" in a
+# ;     pool of "workers" processes and prints a line per config as it
+# ;     completes, followed by the files each flag is on in:
+# ;
+# ;         shows/abc/unimogDev.yaml: UNIMOG_MAYA_DEV=1 UNIMOG_NUKE_DEV=0
+# ;         shows/abc/unimogDev.yaml: 2 changed
+# ;
+# ;         UNIMOG_MAYA_DEV : [on 2/3] shows/abc, users/jdoe
+# ;
+# ;     "--mode=python" prints {config: {name: value}} instead. Returns the
+# ;     number of configs that failed, None when there is no config at all.
+# ;---------------------------------------------------------------------------
+def findConfigs(root):
+    configs = []
+    for folder, folders, files in os.walk(root):
+        folders.sort()
+        if 'unimogDev.yaml' in files:
+            configs.append(os.path.join(folder, 'unimogDev.yaml'))
+    return configs
+
+def recursiveSetup():
+    for label, variable in layers.layerVariables:
+        os.environ.pop(variable, None)
+    os.environ.pop(replica.replicaVariable, None)
+
+    # The log writer thread is not forked along (it is paused while the pool
+    # forks), only the parent reports
+    logging.disable(logging.CRITICAL)
+
+def recursiveTask(task):
+    fileName, function, devVar, matches, mode = task
+    devVar, assignments = splitAssignments(devVar) if function == 'set' else (devVar, [])
+    lock = transaction.FileLock(fileName)
+    try:
+        if function != 'list':
+            lock.acquire()
+        try:
+            inData = importYamlData(fileName)
+            if not isinstance(inData, dict) or 'error' in inData:
+                return fileName, None, 0, "Broken configuration"
+            yamlObject = YamlObj(**inData)
+
+            # The derived flags are evaluated as in a merged view
+            mergedObject = yamlObject
+            if derived.derivedKey in inData:
+                mergedData = dict(inData)
+                if not evaluateDerived(mergedData):
+                    return fileName, None, 0, "Broken derived flags"
+                mergedObject = YamlObj(**mergedData)
+            # Only a list (or "--mode=all") takes every flag without a target
+            if devVar or matches or assignments:
+                names = selectNames(mergedObject, devVar, matches)
+            elif function == 'list' or mode == "all":
+                names = extractKeys(mergedObject.flags)
+            else:
+                return fileName, None, 0, "<%s> needs a variable, a glob, a --match pattern or --mode=all" % (function)
+
+            changed = 0
+            if function != 'list':
+                if mode != "all":
+                    names = [name for name in names if name in mergedObject.flags]
+                derivedItems = applyLayeredSet(yamlObject, mergedObject, {}, settableNames(mergedObject, names, quiet=True), 0, function == 'set')
+
+                # The typed values are checked against the schema of every config
+                if assignments:
+                    values, errors = parseAssignments(mergedObject, assignments)
+                    if errors:
+                        return fileName, None, 0, "Invalid value: %s" % (errors[0])
+                    derivedItems = derivedItems + applyLayeredSet(yamlObject, mergedObject, {}, sorted(values), 0, values)
+                    names = names + [name for name in sorted(values) if name not in names]
+                changed = commitChanges(fileName, inData, yamlObject.GetPublicDict(), {}, derivedItems)
+        finally:
+            lock.release()
+    except (Exception, SystemExit), error:
+        return fileName, None, 0, str(error) or error.__class__.__name__
+
+    flags = mergedObject.flags
+    return fileName, dict((name, flags.get(name)) for name in names if name in flags), changed, None
+
+def executeRecursive(root, function, devVar=(), matches=(), mode="default", workers=None):
+    import multiprocessing
+
+    # Link to logger
+    logger = logging.getLogger('unimog.unimogdev.utilities')
+
+    startTime = time.time()
+    configs = findConfigs(root)
+    if not configs:
+        logger.error("%s: %s", "No configuration found below", root)
+        return None
+
+    workers = max(1, min(workers or multiprocessing.cpu_count(), len(configs)))
+    tasks = [(fileName, function, list(devVar), list(matches), mode) for fileName in configs]
+    chunkSize = max(1, min(16, len(tasks) // (workers * 8)))
+
+    results = {}
+    totals = {}
+    enabled = {}
+    failed = 0
+    changed = 0
+    logqueue.pauseWriters()
+    try:
+        pool = multiprocessing.Pool(workers, recursiveSetup)
+    finally:
+        logqueue.resumeWriters()
+    try:
+        for fileName, flags, count, error in pool.imap_unordered(recursiveTask, tasks, chunkSize):
+            name = os.path.relpath(fileName, root)
+            if error is not None:
+                failed += 1
+                logger.error("%s: %s", name, error)
+                continue
+
+            results[name] = flags
+            changed += count
+            for key, value in flags.iteritems():
+                totals[key] = totals.get(key, 0) + 1
+                if value:
+                    enabled.setdefault(key, []).append(os.path.dirname(name) or '.')
+
+            if mode == "python":
+                continue
+            if function == 'list':
+                print "%s: %s" % (name, ' '.join('{}={}'.format(key, schema.textValue(flags[key])) for key in sorted(flags)))
+            else:
+                print "%s: %d changed" % (name, count)
+            sys.stdout.flush()
+        pool.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    if mode == "python":
+        print str(results)
+    elif totals:
+        width = max(len(key) for key in totals)
+        print
+        for key in sorted(totals):
+            paths = sorted(enabled.get(key, []))
+            print ("%s : [on %d/%d] %s" % (key.ljust(width), len(paths), totals[key], ', '.join(paths))).rstrip()
+
+    logger.info("%s: %d configs (%d failed, %d changes) with %d workers in %.3f ms",
+        "Recursive " + function, len(configs), failed, changed, workers, (time.time() - startTime) * 1000)
+    return failed
 
 #}}}
 
@@ -266,26 +1729,461 @@ def executeList(yamlObject, mode="default"):
 
 class YamlObj:
     def __init__(self, **entries):
-        self.__dict__.update(entries)
-        self.public_names = entries.keys()
+        # The reserved keys (the derived definitions, the schema) are no flags
+        self.reserved = dict((key, entries.pop(key)) for key in layers.reservedKeys if key in entries)
+        self.flags = FlagSet(entries)
+        self.public_names = self.flags.names
+        self.derivedGraph = None
+        self.compiledSchema = None
+
+    def __getattr__(self, name):
+        # Flags used to be instance attributes, keep "getattr(yamlObject, FLAG)" working
+        flags = self.__dict__.get('flags')
+        if flags is not None and name in flags.index:
+            return flags.get(name)
+        raise AttributeError(name)
 
     def testMe(self):
         self.myVariable = 67
 
     def GetPublicDict(self):
-        return {key:getattr(self, key) for key in self.public_names}
+        dictionary = dict(self.flags.iteritems())
+        dictionary.update(self.reserved)
+        return dictionary
+
+    def derivedFlags(self):
+        # The compiled graph of an object holding the derived values (a merged
+        # view), None for a layer of its own
+        if self.derivedGraph is None:
+            self.derivedGraph = False
+            definitions = self.reserved.get(derived.derivedKey)
+            if isinstance(definitions, dict) and definitions and not [name for name in definitions if name not in self.flags.index]:
+                try:
+                    self.derivedGraph = derived.DerivedGraph(definitions)
+                except ValueError:
+                    pass
+        return self.derivedGraph or None
+
+    def schema(self):
+        # The compiled schema of the typed flags (see modules/schema.py), an
+        # empty one without declarations. Raises ValueError for a broken one
+        if self.compiledSchema is None:
+            self.compiledSchema = schema.compileSchema(self.reserved.get(schema.schemaKey))
+        return self.compiledSchema
+
+    def typedNames(self):
+        # The flags that are no bool, none for a broken schema
+        try:
+            return self.schema().typed
+        except ValueError:
+            return frozenset()
+
+    def propagate(self, changed):
+        # Re-evaluates the derived flags downstream of the changed names,
+        # returns [(name, value)] of the ones that changed
+        graph = self.derivedFlags()
+        if graph is None:
+            return []
+
+        flags = self.flags
+        flagGet = flags.get
+        def get(name):
+            try:
+                return flagGet(name)
+            except KeyError:
+                return False
+        return graph.propagate(changed, get, flags.set)
 
     def GetBashDict(self):
         return 0
 
     def listElements(self):
+        emitters.writeList(sys.stdout, 'default', self.flags.names, self.flags.get)
+
+    def formatElements(self, positions=None, origins=None):
         #return str(self.GetPublicDict())
-        self.maxKeyLength = max(imap(len, self.GetPublicDict()))
-        for key, value in self.GetPublicDict().items():
-            print "{0:{width}} : [{1:5}]".format(key, str(value), width=self.maxKeyLength)
+        items = list(self.flags.iteritems(positions))
+        if not items:
+            return []
+        self.maxKeyLength = max(len(key) for key, value in items)
+        if origins is not None:
+            return ["{0:{width}} : [{1:5}] ({2})".format(key, str(value), origins.get(key), width=self.maxKeyLength) for key, value in items]
+        return ["{0:{width}} : [{1:5}]".format(key, str(value), width=self.maxKeyLength) for key, value in items]
+
+#}}}
+
+# Setup the client object {{{
+# ;---------------------------------------------------------------------------
+# ; Flags:
+# ;     The in-process client API, for pipeline code running inside a DCC:
+# ;
+# ;         flags = utilities.Flags()
+# ;         if flags.get('UNIMOG_MAYA_DEV'):
+# ;             ...
+# ;
+# ;     The merged layers are loaded once. Every access revalidates with a
+# ;     stat of each layer file (at most every "maxAge" seconds when given)
+# ;     and reloads only when one of them changed. Selections of globs and
+# ;     "--match" patterns are memoized until the next reload. The layer
+# ;     stack is resolved once, from the environment at construction time.
+# ;     With $UNIMOG_DEV_REPLICA set ("replicated") the node-local replica is
+# ;     read instead, see modules/replica.py. A broken configuration raises
+# ;     RuntimeError on access.
+# ;---------------------------------------------------------------------------
+class Flags:
+    def __init__(self, fileName=None, maxAge=0.0, replicated=None):
+        if fileName is None:
+            try:
+                fileName = os.path.join(os.environ['UNIMOG_LOCAL_SITE_CONFIG'], 'unimogDev.yaml')
+            except KeyError:
+                raise RuntimeError("Unable to get the \"$UNIMOG_LOCAL_SITE_CONFIG\" environment variable!")
+
+        self.fileName = fileName
+        self.maxAge = maxAge
+        self.replicated = replica.replicaFolder() is not None if replicated is None else replicated
+        self.stack = layers.layerStack(fileName)
+        self.signature = None
+        self.checked = 0.0
+        self.data = {}
+        self.origins = {}
+        self.error = None
+        self._yamlObject = None
+        self._selections = {}
+
+    def revalidate(self):
+        if self.maxAge:
+            now = time.time()
+            if now - self.checked < self.maxAge:
+                return False
+            self.checked = now
+
+        # The node-local replica stands in for the stat of the shared layers
+        replicated = replica.loadMerged(self.fileName, importMergedData) if self.replicated else None
+        if replicated is not None:
+            signature, data, origins = replicated
+        else:
+            signature = layers.stackSignature(self.stack)
+        if signature == self.signature:
+            return False
+
+        if replicated is None:
+            data, origins = importMergedData(self.fileName)
+        for key in layers.reservedKeys:
+            data.pop(key, None)
+        if 'error' in data and not isinstance(data['error'], bool):
+            self.error = data['error']
+        else:
+            self.error = None
+        self.data = data
+        self.origins = origins
+        self.signature = signature
+        self._yamlObject = None
+        self._selections = {}
+        return True
+
+    def current(self):
+        self.revalidate()
+        if self.error is not None:
+            raise RuntimeError("Broken configuration: %s" % (self.fileName))
+        return self.data
+
+    def get(self, name, default=None):
+        return self.current().get(name, default)
+
+    def __getitem__(self, name):
+        return self.current()[name]
+
+    def __contains__(self, name):
+        return name in self.current()
+
+    def __iter__(self):
+        return iter(self.current())
+
+    def __len__(self):
+        return len(self.current())
+
+    def items(self):
+        return self.current().items()
+
+    def origin(self, name):
+        self.current()
+        return self.origins.get(name)
+
+    def select(self, targets=(), matches=()):
+        data = self.current()
+        key = (tuple(targets), tuple(matches))
+        names = self._selections.get(key)
+        if names is None:
+            names = [name for name in selectNames(self.yamlObject(), targets, matches) if name in data]
+            self._selections[key] = names
+        return dict((name, data[name]) for name in names)
+
+    def yamlObject(self):
+        # The YamlObj of the current load, the CLI commands work on it
+        self.revalidate()
+        if self._yamlObject is None:
+            self._yamlObject = YamlObj(**self.data)
+        return self._yamlObject
 
 #}}}
 
+# Setup the flag storage object {{{
+# ;---------------------------------------------------------------------------
+# ; Flag Set:
+# ;     Compact flag storage, a name -> index table plus a bit array holding
+# ;     one bit per flag. Each name string is stored once and shared by the
+# ;     table and the ordered name list (a global intern() costs ~70MB per
+# ;     million flags). Values that are not booleans are kept aside in
+# ;     "extras" (index -> value) and shadow their bit.
+# ;     get / set are O(1), bulk updates go through an index mask and
+# ;     iteration yields straight from the table without building a dict.
+# ;---------------------------------------------------------------------------
+class FlagSet:
+    def __init__(self, entries=None):
+        self.names = []
+        self.index = {}
+        self.bits = bytearray()
+        self.extras = {}
+        self._nameIndex = None
+
+        if entries:
+            self.load(entries)
+
+    def load(self, entries):
+        # Bulk build, the bit array is packed through a long integer
+        # (keys() and values() of an unchanged dict come in the same order, and
+        # unlike items() they do not allocate a tuple per flag)
+        self.names = entries.keys()
+        values = entries.values()
+        self.index = dict(izip(self.names, xrange(len(self.names))))
+        self.extras = dict((position, value) for position, value in enumerate(values) if value is not True and value is not False)
+
+        byteCount = (len(values) + 7) >> 3
+        packed = long(''.join(['1' if value else '0' for value in reversed(values)]) or '0', 2)
+        self.bits = bytearray(binascii.unhexlify('%0*x' % (byteCount * 2, packed)))
+        self.bits.reverse()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def add(self, name, value):
+        if name in self.index:
+            self.set(name, value)
+            return
+
+        position = len(self.names)
+        self._nameIndex = None
+        self.names.append(name)
+        self.index[name] = position
+        if position & 7 == 0:
+            self.bits.append(0)
+        self.assign(position, value)
+
+    def valueAt(self, position):
+        if self.extras and position in self.extras:
+            return self.extras[position]
+        return bool(self.bits[position >> 3] & (1 << (position & 7)))
+
+    def assign(self, position, value):
+        if value is True or value is False:
+            self.extras.pop(position, None)
+        else:
+            self.extras[position] = value
+
+        if value:
+            self.bits[position >> 3] |= (1 << (position & 7))
+        else:
+            self.bits[position >> 3] &= ~(1 << (position & 7)) & 0xFF
+
+    def get(self, name):
+        # valueAt inlined, the emitters call it once per listed flag
+        position = self.index[name]
+        if self.extras and position in self.extras:
+            return self.extras[position]
+        return bool(self.bits[position >> 3] & (1 << (position & 7)))
+
+    def set(self, name, value):
+        self.assign(self.index[name], value)
+
+    def iteritems(self, positions=None):
+        valueAt = self.valueAt
+        if positions is None:
+            for position, name in enumerate(self.names):
+                yield name, valueAt(position)
+        else:
+            names = self.names
+            for position in positions:
+                yield names[position], valueAt(position)
+
+    def nameIndex(self):
+        # Built once per load, rebuilt only when flags are added
+        if self._nameIndex is None:
+            self._nameIndex = NameIndex(self.names)
+        return self._nameIndex
+
+    def select(self, globs=(), regexes=()):
+        # Sorted positions of the names matching any glob or regular expression
+        return self.nameIndex().select(globs, regexes)
+
+    def mask(self, positions):
+        # A bit array with the given positions set
+        mask = bytearray(len(self.bits))
+        for position in positions:
+            mask[position >> 3] |= (1 << (position & 7))
+        return mask
+
+    def assignMask(self, mask, state):
+        # Bulk set (state True) or clear (state False) every position in "mask"
+        if not self.bits:
+            return
+
+        current = long(binascii.hexlify(self.bits), 16)
+        selected = long(binascii.hexlify(mask), 16)
+        if state:
+            current = current | selected
+        else:
+            current = current & ~selected
+        self.bits = bytearray(binascii.unhexlify('%0*x' % (len(self.bits) * 2, current)))
+
+        # Masked positions hold a plain boolean now
+        for position in [position for position in self.extras if mask[position >> 3] & (1 << (position & 7))]:
+            del self.extras[position]
+
+    def assignIndices(self, positions, state):
+        if len(positions) < 64:
+            for position in positions:
+                self.assign(position, bool(state))
+        else:
+            self.assignMask(self.mask(positions), state)
+
+#}}}
+
+# Setup the name index object {{{
+# ;---------------------------------------------------------------------------
+# ; Name Index:
+# ;     A sorted name table (prefix ranges through bisect) and a segment
+# ;     table ("_" separated word -> positions) over the names of a flag set.
+# ;     A pattern is first narrowed to candidate positions through the
+# ;     narrowest of its literal prefix and literal segments, then all
+# ;     patterns are checked together with one combined regular expression.
+# ;---------------------------------------------------------------------------
+class NameIndex:
+    def __init__(self, names):
+        self.names = names
+        order = sorted(xrange(len(names)), key=names.__getitem__)
+        self.sortedNames = [names[position] for position in order]
+        self.sortedPositions = order
+
+        self.segments = {}
+        for position, name in enumerate(names):
+            for segment in set(name.split('_')):
+                self.segments.setdefault(segment, []).append(position)
+        self.sortedSegments = sorted(self.segments)
+
+    def prefixBounds(self, prefix):
+        start = bisect.bisect_left(self.sortedNames, prefix)
+        return start, bisect.bisect_left(self.sortedNames, prefix + '\xff', start)
+
+    def prefixRange(self, prefix):
+        start, end = self.prefixBounds(prefix)
+        return self.sortedPositions[start:end]
+
+    def globCandidates(self, pattern):
+        # The literal part before the first wildcard
+        prefix = re.split(r'[*?\[]', pattern, 1)[0]
+
+        # The "_" separated words: complete literal ones, and ones with a
+        # single trailing "*" (a segment prefix) after the first word
+        words = []
+        stems = []
+        if '[' not in pattern:
+            for position, word in enumerate(pattern.split('_')):
+                if word and not isPattern(word):
+                    words.append(word)
+                elif position and len(word) > 1 and word.endswith('*') and not isPattern(word[:-1]):
+                    stems.append(word[:-1])
+
+        # The narrowest of the prefix range and the word lists is enough, the
+        # combined expression verifies the candidates anyway
+        best = None
+        for word in words:
+            positions = self.segments.get(word, ())
+            if not positions:
+                return []
+            if best is None or len(positions) < len(best):
+                best = positions
+
+        for stem in stems:
+            start = bisect.bisect_left(self.sortedSegments, stem)
+            end = bisect.bisect_left(self.sortedSegments, stem + '\xff', start)
+            keys = self.sortedSegments[start:end]
+            if best is None or sum(len(self.segments[key]) for key in keys) < len(best):
+                best = [position for key in keys for position in self.segments[key]]
+
+        if prefix:
+            start, end = self.prefixBounds(prefix)
+            if best is None or end - start < len(best):
+                best = self.sortedPositions[start:end]
+
+        return best
+
+    def regexCandidates(self, pattern):
+        # Only anchored literal prefixes narrow a regular expression, with one
+        # level of literal alternation expanded: "^UNIMOG_(MAYA|NUKE)_"
+        if not pattern.startswith('^') or hasTopLevelAlternation(pattern):
+            return None
+
+        literal = r'[^.^$*+?{}\[\]\\|()]*'
+        match = re.match(r'\^(%s)(?:\(((?:%s\|)*%s)\)(%s))?' % (literal, literal, literal, literal), pattern)
+        head, group, tail = match.group(1), match.group(2), match.group(3)
+        quantified = pattern[match.end():match.end() + 1] in ('*', '?', '{')
+
+        if group is None:
+            prefixes = [head[:-1] if quantified else head]
+        elif quantified and not tail:
+            prefixes = [head]
+        else:
+            if quantified:
+                tail = tail[:-1]
+            prefixes = [head + alternative + tail for alternative in group.split('|')]
+
+        if not all(prefixes):
+            return None
+        return [position for prefix in prefixes for position in self.prefixRange(prefix)]
+
+    def select(self, globs=(), regexes=()):
+        candidates = set()
+        for pattern in globs:
+            found = self.globCandidates(pattern)
+            if found is None:
+                candidates = None
+                break
+            candidates.update(found)
+
+        if candidates is not None:
+            for pattern in regexes:
+                found = self.regexCandidates(pattern)
+                if found is None:
+                    candidates = None
+                    break
+                candidates.update(found)
+
+        parts = [globToRegex(pattern) for pattern in globs] + ['(?:%s)' % (pattern) for pattern in regexes]
+        if not parts:
+            return []
+        combined = re.compile('|'.join(parts))
+
+        names = self.names
+        positions = xrange(len(names)) if candidates is None else sorted(candidates)
+        return [position for position in positions if combined.search(names[position])]
+#}}}
+
 # Setup a custom StreamHandler object {{{
 # ;---------------------------------------------------------------------------
 # ; Conditional Handler Filter
@@ -293,22 +2191,30 @@ class YamlObj:
 
 class CustomFilter(logging.Filter):
 
+    # The levels let through at every verbosity state, WARNING only shows at 3
+    stateLevels = {
+        0 : (),
+        1 : (logging.INFO, logging.ERROR, logging.CRITICAL),
+        2 : (logging.INFO, logging.DEBUG, logging.ERROR, logging.CRITICAL),
+        3 : (logging.INFO, logging.DEBUG, logging.ERROR, logging.CRITICAL, logging.WARNING),
+    }
+
     def __init__(self, state):
+        logging.Filter.__init__(self)
         self.state = state
 
+        # One bit per level (levelno // 10), built once instead of on every record
+        levels = self.stateLevels[max(min(state, 3), 0)]
+        self.levelMask = 0
+        for level in levels:
+            self.levelMask |= 1 << (level // 10)
+
+        # The logger level is set to the lowest level let through, a call
+        # below it returns before any record is built
+        self.lowestLevel = min(levels) if levels else logging.CRITICAL + 1
+
     def filter(self, record):
-        if self.state == 1:
-            return record.levelno in [logging.INFO, logging.ERROR,
-                                      logging.CRITICAL]
-        elif self.state == 2:
-            return record.levelno in [logging.INFO, logging.DEBUG,
-                                      logging.ERROR, logging.CRITICAL]
-        elif self.state > 2:
-            return record.levelno in [logging.INFO, logging.DEBUG,
-                                      logging.ERROR, logging.CRITICAL,
-                                      logging.WARNING]
-        else:
-            return False
+        return (self.levelMask >> (record.levelno // 10)) & 1
 #}}}
 
 # Any additional class goes here.
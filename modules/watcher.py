@@ -0,0 +1,370 @@
+#!/usr/bin/env python2.7
+# ;-----------------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    : unimogDev.watcher
+# ; Author  : Muhittin Bilginer
+# ; Created : 18/10/2026
+# ;
+# ; Info    : Change subscription for long running sessions (Maya, Houdini, Nuke). The config
+# ;           layers are watched through inotify (stat polling elsewhere) and the subscribers
+# ;           are only told about the flags whose values changed.
+# ;
+# ; This tool is part of Unimog.
+# ;-----------------------------------------------------------------------------------------------
+
+# Watcher outline:
+#
+#   The folders of the layer files are watched, not the files: a commit
+#   renames a new file over the old one (or appends to the journal of the
+#   layer, see modules/journal.py). Events of other files in the folders
+#   (snapshots, export scripts, temp files) are ignored. The first relevant
+#   event opens a debounce window that stays open while events keep coming
+#   (at most "maxDelay"), so a burst of "set" calls gives a single check. A
+#   check compares the stack signature, reloads the merged view (under a
+#   shared config lock, so a commit still writing its caches is waited for
+#   instead of every subscriber parsing the YAML at once) and hands the
+#   changed flags to every subscriber as {name: value}, None for a flag that
+#   is gone.
+#
+#   In a session:
+#
+#       import modules.watcher as watcher
+#       flagWatcher = watcher.FlagWatcher(configFile)
+#       flagWatcher.subscribe(onChange, ['UNIMOG_MAYA_*'])
+#       flagWatcher.start()
+#
+#   Callbacks run on the watcher thread, a DCC has to hand them over to its
+#   main thread (e.g. maya.utils.executeDeferred) before touching the scene.
+
+# Declare external imports
+import os
+import re
+import sys
+import time
+import errno
+import select
+import struct
+import logging
+import threading
+
+# Declare internal imports
+import layers
+import transaction
+import utilities as utils
+
+# Define a version variable:
+moduleName = __name__
+moduleVersion = moduleName + " 0.0.1.[3]"
+
+# Setup the watcher related variables
+debounceDelay = 0.25
+maxDelay = 2.0
+pollInterval = 1.0
+
+# The inotify constants (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+watchMask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+eventHeader = struct.Struct('iIII')
+
+# Setup the Watcher Functions {{{
+
+# WATCHER: Define a "Changed Flags" function {{{
+# ;---------------------------------------------------------------------------
+# ; Changed Flags:
+# ;     {name: value} of the flags that differ between two dictionaries,
+# ;     None for the names missing from the new one.
+# ;---------------------------------------------------------------------------
+def changedFlags(oldFlags, newFlags):
+    changes = dict((name, value) for name, value in newFlags.iteritems() if name not in oldFlags or oldFlags[name] != value)
+    changes.update(dict.fromkeys((name for name in oldFlags if name not in newFlags), None))
+    return changes
+# }}}
+
+# WATCHER: Define a "Selector" function {{{
+# ;---------------------------------------------------------------------------
+# ; Selector:
+# ;     A name predicate for the targets (names, globs) and "--match"
+# ;     regular expressions of a subscription, None selects everything.
+# ;---------------------------------------------------------------------------
+def selector(targets=(), matches=()):
+    if not targets and not matches:
+        return None
+
+    names = frozenset(target for target in targets if not utils.isPattern(target))
+    patterns = [utils.globToRegex(target) for target in targets if utils.isPattern(target)]
+    patterns.extend(matches)
+    if not patterns:
+        return names.__contains__
+
+    combined = re.compile('|'.join('(?:%s)' % (pattern) for pattern in patterns))
+    return lambda name: name in names or combined.search(name) is not None
+# }}}
+
+# WATCHER: Define an "Inotify" function {{{
+# ;---------------------------------------------------------------------------
+# ; Inotify:
+# ;     The (init1, add_watch) functions of the C library, None where inotify
+# ;     is not available.
+# ;---------------------------------------------------------------------------
+def inotify():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        import ctypes
+        library = ctypes.CDLL(None, use_errno=True)
+        initialise = library.inotify_init1
+        addWatch = library.inotify_add_watch
+    except (ImportError, OSError, AttributeError):
+        return None
+
+    initialise.argtypes = [ctypes.c_int]
+    addWatch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return initialise, addWatch
+# }}}
+
+# Any additional function goes here.
+
+#}}}
+
+# Setup Object Classes {{{
+
+# Setup the inotify source {{{
+# ;---------------------------------------------------------------------------
+# ; Inotify Source:
+# ;     Watches the folders of the layer files. "wait" blocks until a layer
+# ;     file is touched (or the timeout runs out) and returns True if it was,
+# ;     "interrupt" wakes a blocked "wait" through a pipe.
+# ;---------------------------------------------------------------------------
+class InotifySource:
+    def __init__(self, paths):
+        functions = inotify()
+        if functions is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        initialise, addWatch = functions
+
+        self.fd = initialise(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(errno.ENOSYS, "inotify_init1 failed")
+
+        self.watched = {}
+        for path in paths:
+            folder = os.path.dirname(os.path.abspath(path))
+            descriptor = addWatch(self.fd, folder, watchMask)
+            if descriptor >= 0:
+                self.watched.setdefault(descriptor, set()).add(os.path.basename(path))
+
+        if not self.watched:
+            os.close(self.fd)
+            raise OSError(errno.ENOENT, "None of the layer folders can be watched")
+
+        self.wakeRead, self.wakeWrite = os.pipe()
+
+    def wait(self, timeout=None):
+        readable = select.select([self.fd, self.wakeRead], [], [], timeout)[0]
+        if not readable or self.wakeRead in readable:
+            return False
+
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except OSError, error:
+            if error.errno == errno.EAGAIN:
+                return False
+            raise
+
+        relevant = False
+        offset = 0
+        while offset + eventHeader.size <= len(data):
+            descriptor, mask, cookie, length = eventHeader.unpack_from(data, offset)
+            name = data[offset + eventHeader.size:offset + eventHeader.size + length].rstrip('\0')
+            offset = offset + eventHeader.size + length
+
+            # A lost event could have been anything
+            if mask & IN_Q_OVERFLOW or name in self.watched.get(descriptor, ()):
+                relevant = True
+        return relevant
+
+    def interrupt(self):
+        os.write(self.wakeWrite, '.')
+
+    def close(self):
+        if self.fd is not None:
+            for fd in (self.fd, self.wakeRead, self.wakeWrite):
+                os.close(fd)
+            self.fd = None
+# }}}
+
+# Setup the polling source {{{
+# ;---------------------------------------------------------------------------
+# ; Polling Source:
+# ;     The fallback, compares the stat signature of the stack every
+# ;     "interval" seconds.
+# ;---------------------------------------------------------------------------
+class PollingSource:
+    def __init__(self, stack, interval=pollInterval):
+        self.stack = stack
+        self.interval = interval
+        self.signature = layers.stackSignature(stack)
+        self.closed = threading.Event()
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            delay = self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.time()))
+            self.closed.wait(delay)
+            if self.closed.is_set():
+                return False
+
+            signature = layers.stackSignature(self.stack)
+            if signature != self.signature:
+                self.signature = signature
+                return True
+            if deadline is not None and time.time() >= deadline:
+                return False
+
+    def interrupt(self):
+        self.closed.set()
+
+    def close(self):
+        self.closed.set()
+# }}}
+
+# Setup the flag watcher {{{
+# ;---------------------------------------------------------------------------
+# ; Flag Watcher:
+# ;     Keeps the merged flags of a config stack and calls the subscribers
+# ;     with the changed ones. "check" can be called by hand (e.g. from an
+# ;     idle callback), "start" runs the watch loop on a daemon thread and
+# ;     "run" in the calling thread.
+# ;---------------------------------------------------------------------------
+class FlagWatcher:
+    def __init__(self, fileName, debounce=debounceDelay, usePolling=False, interval=pollInterval):
+        self.fileName = fileName
+        self.debounce = debounce
+        self.stack = layers.layerStack(fileName)
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopped = False
+
+        self.signature = layers.stackSignature(self.stack)
+        self.flags = self.load() or {}
+
+        self.source = None
+        if not usePolling:
+            try:
+                self.source = InotifySource([layerFile for label, path in self.stack for layerFile in layers.layerFiles(path)])
+            except OSError:
+                self.source = None
+        if self.source is None:
+            self.source = PollingSource(self.stack, interval)
+        self.method = 'inotify' if isinstance(self.source, InotifySource) else 'polling'
+
+    def load(self):
+        with transaction.FileLock(self.fileName, exclusive=False):
+            inData, origins = utils.importMergedData(self.fileName)
+        if 'error' in inData:
+            logger = logging.getLogger('unimog.unimogdev.watcher')
+            logger.error("%s: %s", "Broken configuration, keeping the previous flags", self.fileName)
+            return None
+        for key in layers.reservedKeys:
+            inData.pop(key, None)
+        return inData
+
+    def subscribe(self, callback, targets=(), matches=()):
+        subscription = (callback, selector(targets, matches))
+        self.lock.acquire()
+        try:
+            self.subscribers.append(subscription)
+        finally:
+            self.lock.release()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.lock.acquire()
+        try:
+            if subscription in self.subscribers:
+                self.subscribers.remove(subscription)
+        finally:
+            self.lock.release()
+
+    def check(self):
+        signature = layers.stackSignature(self.stack)
+        if signature == self.signature:
+            return {}
+
+        newFlags = self.load()
+        if newFlags is None:
+            return {}
+
+        changes = changedFlags(self.flags, newFlags)
+        self.flags = newFlags
+        self.signature = signature
+        if not changes:
+            return changes
+
+        self.lock.acquire()
+        try:
+            subscribers = list(self.subscribers)
+        finally:
+            self.lock.release()
+
+        logger = logging.getLogger('unimog.unimogdev.watcher')
+        for callback, accept in subscribers:
+            selected = changes if accept is None else dict((name, value) for name, value in changes.iteritems() if accept(name))
+            if not selected:
+                continue
+            try:
+                callback(selected)
+            except Exception, error:
+                logger.error("%s: %s", "A subscriber failed", error)
+        return changes
+
+    def wait(self, timeout=None):
+        if not self.source.wait(timeout):
+            return False
+
+        # Debounce: wait until the layer files are quiet for "debounce", a
+        # steady stream of events is cut off after "maxDelay"
+        now = time.time()
+        deadline = now + maxDelay
+        quietAt = now + self.debounce
+        while not self.stopped and now < min(quietAt, deadline):
+            if self.source.wait(min(quietAt, deadline) - now):
+                quietAt = time.time() + self.debounce
+            now = time.time()
+        return True
+
+    def run(self):
+        while not self.stopped:
+            if self.wait() and not self.stopped:
+                self.check()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='unimogDev flag watcher')
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped = True
+        self.source.interrupt()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.source.close()
+# }}}
+
+# Any additional class goes here.
+
+#}}}
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,1571 @@
+#!/usr/bin/env python2.7
+# ;---------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    :   benchUnimogDev.py
+# ; Author  :   Muhittin Bilginer
+# ; Created :   18/10/2026
+# ;
+# ; Info    :   Benchmarks for the "unimogDev.py" tool and its utility modules.
+# ;             Synthetic "unimogDev.yaml" files are generated in a temporary folder.
+# ;
+# ; This tool is part of Unimog.
+# ;----------------------------------------------------------------------------------------
+
+# Implementation outline:
+#
+# {Benchmarks}
+#   snapshot    : Cold (YAML parse) vs warm (compiled snapshot) importYamlData.
+#   startup     : Wall-clock and import-time budget of the read-only fast start path.
+#                 Exits with 1 when a budget is exceeded.
+#   daemon      : Queries per second of the resident daemon vs the one-shot CLI.
+#   stress      : Concurrent set/unset writers (group commit) with torn-read checking readers.
+#                 Exits with 1 when a reader saw a torn or broken file.
+#   flagset     : Memory and time of the FlagSet backed YamlObj vs the legacy __dict__ storage.
+#   patterns    : Glob / regex selection through the name index vs a scan per pattern.
+#   batch       : N separate "unimogDev.py" invocations vs one "batch" run of the same operations.
+#   render      : Shell startup, sourcing the rendered export script vs "list --mode=bash" + eval loop.
+#   layers      : Merge cost of deep layer stacks, and cold / per-layer snapshot / cached merged loads.
+#   stream      : "get" latency against key position, streaming scanner vs full load (snapshot / YAML).
+#   logging     : "set --mode=all" at verbosity 0 and 3 (against a "--reference" checkout of an
+#                 earlier revision when given), and the cost of one disabled debug call.
+#   watch       : Write to notification latency and idle CPU of "--subscribers" watcher processes,
+#                 inotify vs stat polling.
+#   client      : Per lookup cost of the in-process Flags client (revalidating, "maxAge" throttled)
+#                 vs launching "unimogDev.py get".
+#   journal     : Latency of a one flag commit, journal append vs full YAML rewrite, and of the
+#                 compaction, with the bytes written per commit.
+#   emitters    : Emit time and peak memory growth of every "list --mode", streamed through the
+#                 emitters vs the earlier whole-string output of the default, bash and python modes.
+#   replica     : Opens, stats and bytes read on a (simulated) shared config mount by "--concurrency"
+#                 readers starting together on "--nodes" nodes, with and without node-local replicas.
+#   recursive   : "list" / "set" / "unset --recursive" over a generated tree of "--files" configs with
+#                 "--cores" worker processes, and the speedup against one worker.
+#   derived     : Derived flags on wide (one base flag per node, plus one read by every node) and
+#                 deep (a chain) graphs: compile, full evaluation, and the incremental propagation
+#                 of a "set" against the number of downstream flags it changes.
+#   table       : Lookup latency (p50 / p99), load time and memory (RSS growth, PSS) of "--table-readers"
+#                 concurrent reader processes, the mapped flag table vs the YAML load and the Flags client.
+#   shards      : Single key get / set / unset (the command line) and the compaction of a sharded
+#                 config of "--namespaces" shards against the monolithic file.
+#   schema      : Load (YAML, snapshot, YamlObj) and "list" cost of a config without a schema, with
+#                 one declaring its flags as bools and with one of "--typed" typed flags, the schema
+#                 compile (first, cached) and the bulk validation of a "set" of every typed flag.
+#   format      : Latency and bytes written of a one flag update of the YAML file, the changed value
+#                 patched in (touched name, snapshot diff) vs the full dump, and the comments kept.
+#   scale       : Latency percentiles and peak RSS of get / set / list / import / export per config
+#                 size (CLoader vs pure-Python Loader), written to "--results" and compared with the
+#                 stored baseline. Exits with 1 on a regression beyond "--tolerance".
+#
+# Examples:
+#
+#   benchUnimogDev.py snapshot
+#   benchUnimogDev.py snapshot --sizes=10,1000,100000 --repeat=5
+#   benchUnimogDev.py startup --budget-ms=20 --import-budget-ms=5
+#   benchUnimogDev.py logging --reference=/tmp/unimogDev.before
+#   benchUnimogDev.py watch --sizes=1000 --subscribers=1,10,50
+#   benchUnimogDev.py scale --sizes=10,1000,100000,1000000 --save-baseline
+#   benchUnimogDev.py replica --sizes=1000,100000 --concurrency=16,128 --nodes=8
+#   benchUnimogDev.py emitters --sizes=1000,1000000 --repeat=3
+#   benchUnimogDev.py recursive --sizes=10,1000 --files=1000 --cores=1,2,4,8
+#   benchUnimogDev.py derived --sizes=1000,100000
+#   benchUnimogDev.py table --sizes=1000,100000 --table-readers=50
+#   benchUnimogDev.py shards --sizes=1000000 --namespaces=100
+#   benchUnimogDev.py schema --sizes=100000 --typed=0.1
+#   benchUnimogDev.py format --sizes=1000,1000000 --repeat=3
+# ;----------------------------------------------------------------------------------------
+
+# Declare external imports
+import sys, os, time, shutil, tempfile
+import subprocess
+import threading
+import random
+import multiprocessing
+import resource
+import re
+import fnmatch
+import argparse
+import json
+import socket
+import platform
+
+# Make the tool modules importable from the test folder
+rootFolder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, rootFolder)
+
+# Declare internal imports
+import modules.utilities as utils
+import modules.snapshot as snapshot
+import modules.transaction as transaction
+import logging
+
+# Setup the Helper Functions {{{
+
+# HELPER: Define a config generator {{{
+# ;---------------------------------------------------------------------------
+# ; Generate Config:
+# ;     Writes a synthetic "unimogDev.yaml" with "flagCount" flags following
+# ;     the UNIMOG_<APP>_..._DEV naming convention, without a journal.
+# ;---------------------------------------------------------------------------
+applications = ['MAYA', 'HOUDINI', 'NUKE', 'PYTHON', 'LD_LIBRARY', 'DYLD_LIBRARY']
+
+def flagName(index):
+    return "UNIMOG_%s_%07d_DEV" % (applications[index % len(applications)], index)
+
+def generateConfig(fileName, flagCount):
+    # The journal of an earlier benchmark would be replayed on top
+    for suffix in ('.journal', '.history'):
+        if os.path.exists(fileName + suffix):
+            os.remove(fileName + suffix)
+
+    outStream = open(fileName, 'w')
+    try:
+        for index in xrange(flagCount):
+            outStream.write("%s: %s\n" % (flagName(index), "true" if index % 3 else "false"))
+    finally:
+        outStream.close()
+    return fileName
+# }}}
+
+# HELPER: Define a timer {{{
+# ;---------------------------------------------------------------------------
+# ; Time It:
+# ;     Runs "function" "repeat" times and returns the durations in seconds.
+# ;---------------------------------------------------------------------------
+def timeIt(function, repeat):
+    durations = []
+    for index in xrange(repeat):
+        start = time.time()
+        function()
+        durations.append(time.time() - start)
+    return durations
+
+def median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+def percentile(values, fraction):
+    # Nearest rank
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))]
+# }}}
+
+# HELPER: Define a child process runner {{{
+# ;---------------------------------------------------------------------------
+# ; Run In Child:
+# ;     Forks, runs "function()" in the child with stdout sent to /dev/null
+# ;     and returns (its JSON encodable result, the peak RSS of the child in
+# ;     KB). A failure in the child is raised as RuntimeError.
+# ;---------------------------------------------------------------------------
+def runInChild(function):
+    readHandle, writeHandle = os.pipe()
+    sys.stdout.flush()
+    processId = os.fork()
+    if processId == 0:
+        os.close(readHandle)
+        try:
+            sys.stdout = open(os.devnull, 'w')
+            payload = json.dumps({'result' : function()})
+        except BaseException, error:
+            payload = json.dumps({'error' : '%s: %s' % (type(error).__name__, error)})
+        while payload:
+            payload = payload[os.write(writeHandle, payload):]
+        os._exit(0)
+
+    os.close(writeHandle)
+    chunks = []
+    while True:
+        chunk = os.read(readHandle, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(readHandle)
+    usage = os.wait4(processId, 0)[2]
+
+    reply = json.loads(''.join(chunks) or '{"error" : "no reply"}')
+    if 'error' in reply:
+        raise RuntimeError(reply['error'])
+
+    # ru_maxrss is in KB on Linux and in bytes on Darwin
+    peakRss = usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+    return reply['result'], peakRss
+# }}}
+
+# HELPER: Define a legacy YamlObj {{{
+# ;---------------------------------------------------------------------------
+# ; The v0.0.1.[5] YamlObj (flags as instance attributes) and its set loop,
+# ; kept as the reference point of the FlagSet benchmark.
+# ;---------------------------------------------------------------------------
+class LegacyYamlObj:
+    def __init__(self, **entries):
+        self.__dict__.update(entries)
+        self.public_names = entries.keys()
+
+    def GetPublicDict(self):
+        return {key:getattr(self, key) for key in self.public_names}
+
+def legacySet(yamlObject, devVar, state):
+    for variable in devVar:
+        if variable in yamlObject.GetPublicDict():
+            setattr(yamlObject, variable, state)
+    return yamlObject.GetPublicDict()
+# }}}
+
+# Any additional helper goes here.
+
+# }}}
+
+# Setup the Benchmarks {{{
+
+# BENCHMARK: Snapshot {{{
+# ;---------------------------------------------------------------------------
+# ; Cold vs warm importYamlData: "cold" parses the YAML (and writes the
+# ; snapshot), "warm" loads the fresh snapshot.
+# ;---------------------------------------------------------------------------
+def benchSnapshot(workFolder, options):
+    print "%10s %12s %12s %10s" % ("flags", "cold (ms)", "warm (ms)", "speedup")
+    for size in options.sizes:
+        fileName = generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), size)
+
+        def cold():
+            if os.path.exists(snapshot.snapshotPath(fileName)):
+                os.remove(snapshot.snapshotPath(fileName))
+            utils.importYamlData(fileName)
+
+        def warm():
+            utils.importYamlData(fileName)
+
+        coldTime = median(timeIt(cold, options.repeat))
+        warmTime = median(timeIt(warm, options.repeat))
+        print "%10d %12.3f %12.3f %9.1fx" % (size, coldTime * 1000, warmTime * 1000, coldTime / max(warmTime, 1e-9))
+# }}}
+
+# BENCHMARK: Startup {{{
+# ;---------------------------------------------------------------------------
+# ; Wall-clock of the read-only commands as "unimogDev.env" runs them, the
+# ; import time of the fast path module, and a check that argparse, logging
+# ; and yaml stay out of the fast path.
+# ;---------------------------------------------------------------------------
+importProbe = '''
+import sys, time
+sys.path.insert(0, %r)
+start = time.time()
+import modules.fastpath as fastpath
+elapsed = time.time() - start
+sys.stdout = open('/dev/null', 'w')
+handled = fastpath.run(%r)
+sys.stdout = sys.__stdout__
+heavy = [name for name in ('yaml', 'argparse', 'logging') if name in sys.modules]
+print elapsed, int(handled), ','.join(heavy)
+'''
+
+def benchStartup(workFolder, options):
+    failures = []
+    environment = dict(os.environ, UNIMOG_LOCAL_SITE_CONFIG=workFolder)
+    toolName = os.path.join(rootFolder, 'unimogDev.py')
+    fileName = generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), options.sizes[0])
+    commands = [['-v=0', 'list', '--mode=bash'], ['-v=0', 'list', '--mode=python'], ['-v=0', 'get', flagName(0)]]
+
+    # Warm up the merged cache through the full path
+    utils.importMergedData(fileName)
+    devNull = open(os.devnull, 'w')
+
+    print "%-36s %12s %12s %10s" % ("command", "wall (ms)", "import (ms)", "budget")
+    for command in commands:
+        def launch():
+            subprocess.check_call([sys.executable, toolName] + command, stdout=devNull, env=environment)
+        wallTime = median(timeIt(launch, options.repeat))
+
+        probe = subprocess.Popen([sys.executable, '-c', importProbe % (rootFolder, command)], stdout=subprocess.PIPE, env=environment)
+        importTime, handled, heavy = (probe.communicate()[0].split(' ') + [''])[:3]
+        importTime = float(importTime)
+        heavy = heavy.strip()
+
+        status = "ok"
+        if wallTime * 1000 > options.budget_ms or importTime * 1000 > options.import_budget_ms:
+            status = "EXCEEDED"
+        if handled != '1' or heavy:
+            status = "SLOW PATH"
+        if status != "ok":
+            failures.append(' '.join(command))
+        print "%-36s %12.3f %12.3f %10s" % (' '.join(command), wallTime * 1000, importTime * 1000, status)
+
+    devNull.close()
+    if failures:
+        print "\nBudget regression: %s" % (', '.join(failures))
+        sys.exit(1)
+# }}}
+
+# BENCHMARK: Daemon {{{
+# ;---------------------------------------------------------------------------
+# ; Queries per second: one-shot "unimogDev.py get" launches vs the resident
+# ; daemon, with one connection per query as the shell scripts use it, from
+# ; a single client and from "--clients" concurrent clients.
+# ;---------------------------------------------------------------------------
+def benchDaemon(workFolder, options):
+    import modules.daemon as daemon
+
+    environment = dict(os.environ, UNIMOG_LOCAL_SITE_CONFIG=workFolder)
+    toolName = os.path.join(rootFolder, 'unimogDev.py')
+    socketName = os.path.join(workFolder, 'unimogDev.sock')
+    devNull = open(os.devnull, 'w')
+
+    print "%10s %16s %16s %16s" % ("flags", "one-shot (q/s)", "daemon (q/s)", "%d clients (q/s)" % (options.clients))
+    for size in options.sizes:
+        generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), size)
+        request = 'get %s' % (flagName(size - 1))
+        utils.importMergedData(os.path.join(workFolder, 'unimogDev.yaml'))
+
+        # One-shot CLI
+        queries = max(options.repeat, 10)
+        start = time.time()
+        for index in xrange(queries):
+            subprocess.check_call([sys.executable, toolName, '-v=0'] + request.split(), stdout=devNull, env=environment)
+        oneShot = queries / (time.time() - start)
+
+        # Resident daemon
+        server = subprocess.Popen([sys.executable, toolName, '-v=0', 'serve', '--socket=%s' % (socketName)], env=environment)
+        try:
+            while True:
+                try:
+                    daemon.query('ping', socketName)
+                    break
+                except Exception:
+                    time.sleep(0.05)
+
+            queries = max(options.repeat, 10) * 200
+            start = time.time()
+            for index in xrange(queries):
+                daemon.query(request, socketName, environment=environment)
+            single = queries / (time.time() - start)
+
+            def client():
+                for index in xrange(queries // options.clients):
+                    daemon.query(request, socketName, environment=environment)
+            threads = [threading.Thread(target=client) for index in xrange(options.clients)]
+            start = time.time()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            concurrent = (queries // options.clients) * options.clients / (time.time() - start)
+        finally:
+            server.terminate()
+            server.wait()
+
+        print "%10d %16.1f %16.1f %16.1f" % (size, oneShot, single, concurrent)
+
+    devNull.close()
+# }}}
+
+# BENCHMARK: Stress {{{
+# ;---------------------------------------------------------------------------
+# ; Multi-process writers hammering commitSet for "--seconds", while reader
+# ; processes parse the raw YAML (no snapshot) and check it is complete.
+# ; Reports mutations/sec, commits/sec and the group commit ratio.
+# ;---------------------------------------------------------------------------
+def stressWriter(fileName, flagCount, seconds, results):
+    random.seed(os.getpid())
+    mutations = commits = 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        target = flagName(random.randrange(flagCount))
+        committed = utils.commitSet(fileName, [target], 0, random.random() < 0.5)
+        mutations = mutations + 1
+        if committed:
+            commits = commits + 1
+    results.put((mutations, commits))
+
+def stressReader(fileName, flagCount, seconds, results):
+    utils.initialiseYaml()
+    reads = torn = 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        inStream = open(fileName, 'r')
+        try:
+            content = inStream.read()
+        finally:
+            inStream.close()
+        try:
+            data = utils.load(content, Loader=utils.Loader)
+        except Exception:
+            data = None
+        if not isinstance(data, dict) or len(data) != flagCount:
+            torn = torn + 1
+        reads = reads + 1
+    results.put((reads, torn))
+
+def benchStress(workFolder, options):
+    failed = False
+    print "%10s %8s %14s %14s %10s %10s %8s" % ("flags", "writers", "mutations/s", "commits/s", "batch", "reads", "torn")
+    for size in options.sizes:
+        fileName = generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), size)
+        for writers in options.writers:
+            writerResults = multiprocessing.Queue()
+            readerResults = multiprocessing.Queue()
+            processes = [multiprocessing.Process(target=stressWriter, args=(fileName, size, options.seconds, writerResults)) for index in xrange(writers)]
+            processes += [multiprocessing.Process(target=stressReader, args=(fileName, size, options.seconds, readerResults)) for index in xrange(options.readers)]
+            for process in processes:
+                process.start()
+            writerTotals = [writerResults.get() for index in xrange(writers)]
+            readerTotals = [readerResults.get() for index in xrange(options.readers)]
+            for process in processes:
+                process.join()
+
+            mutations = sum(total[0] for total in writerTotals)
+            commits = sum(total[1] for total in writerTotals)
+            reads = sum(total[0] for total in readerTotals)
+            torn = sum(total[1] for total in readerTotals)
+            failed = failed or torn > 0
+            print "%10d %8d %14.1f %14.1f %10.2f %10d %8d" % (size, writers, mutations / options.seconds, commits / options.seconds, mutations / float(max(commits, 1)), reads, torn)
+
+    if failed:
+        print "\nA reader saw a torn file!"
+        sys.exit(1)
+# }}}
+
+# BENCHMARK: FlagSet {{{
+# ;---------------------------------------------------------------------------
+# ; Per size and storage: peak RSS growth of holding the flags, build time,
+# ; a single "get", a targeted "set" of 100 flags, "set --mode=all" and a
+# ; bash "list". The legacy "set --mode=all" is O(n^2) and skipped above
+# ; "--legacy-limit" flags.
+# ;---------------------------------------------------------------------------
+def flagSetProbe(storage, size, legacyLimit, results):
+    entries = dict((flagName(index), bool(index % 3)) for index in xrange(size))
+    names = entries.keys()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.time()
+    if storage == 'legacy':
+        yamlObject = LegacyYamlObj(**entries)
+    else:
+        yamlObject = utils.YamlObj(**entries)
+    buildTime = time.time() - start
+    del entries
+    memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+
+    timings = [buildTime]
+    if storage == 'legacy':
+        operations = [lambda: getattr(yamlObject, names[-1]),
+                      lambda: legacySet(yamlObject, names[:100], True),
+                      lambda: legacySet(yamlObject, names, False) if size <= legacyLimit else None,
+                      lambda: ' '.join('{}={}'.format(key, int(val)) for key, val in yamlObject.GetPublicDict().items())]
+    else:
+        operations = [lambda: yamlObject.flags.get(names[-1]),
+                      lambda: utils.executeSet(yamlObject, names[:100], 0, True),
+                      lambda: utils.executeSet(yamlObject, names, 0, False),
+                      lambda: utils.formatList(yamlObject, 'bash')]
+    for operation in operations:
+        start = time.time()
+        skipped = operation() is None and operation is operations[2] and storage == 'legacy'
+        timings.append(None if skipped else time.time() - start)
+
+    results.put((memory, timings))
+
+def benchFlagSet(workFolder, options):
+    def cell(value):
+        return "%10s" % ("skipped") if value is None else "%10.3f" % (value * 1000)
+
+    print "%10s %8s %10s %10s %10s %10s %10s %10s" % ("flags", "storage", "rss (kB)", "build", "get", "set 100", "set all", "list") + "   (ms)"
+    for size in options.sizes:
+        for storage in ('legacy', 'flagset'):
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(target=flagSetProbe, args=(storage, size, options.legacy_limit, results))
+            process.start()
+            memory, timings = results.get()
+            process.join()
+            print "%10d %8s %10d %s" % (size, storage, memory, ' '.join(cell(value) for value in timings))
+# }}}
+
+# BENCHMARK: Patterns {{{
+# ;---------------------------------------------------------------------------
+# ; Name index build time, then a multi-pattern selection through the index
+# ; (one pass) vs fnmatch / re over every key once per pattern. The results
+# ; of both are compared.
+# ;---------------------------------------------------------------------------
+def benchPatterns(workFolder, options):
+    globs = ['UNIMOG_*_LIBRARY_0000*_DEV', 'UNIMOG_NUKE_00001??_DEV']
+    regexes = ['^UNIMOG_(MAYA|HOUDINI)_00000', '^UNIMOG_PYTHON_0000[0-4]']
+
+    print "%10s %12s %12s %12s %10s" % ("flags", "index (ms)", "select (ms)", "scan (ms)", "matches")
+    for size in options.sizes:
+        yamlObject = utils.YamlObj(**dict((flagName(index), True) for index in xrange(size)))
+        names = yamlObject.flags.names
+
+        buildTime = median(timeIt(lambda: utils.NameIndex(names), max(1, options.repeat // 2)))
+        yamlObject.flags.nameIndex()
+        selected = []
+        selectTime = median(timeIt(lambda: selected.append(yamlObject.flags.select(globs, regexes)), options.repeat))
+
+        def scan():
+            found = set()
+            for pattern in globs:
+                found.update(position for position, name in enumerate(names) if fnmatch.fnmatchcase(name, pattern))
+            for pattern in regexes:
+                compiled = re.compile(pattern)
+                found.update(position for position, name in enumerate(names) if compiled.search(name))
+            return sorted(found)
+        scanTime = median(timeIt(scan, options.repeat))
+
+        status = len(selected[-1]) if selected[-1] == scan() else "MISMATCH"
+        print "%10d %12.3f %12.3f %12.3f %10s" % (size, buildTime * 1000, selectTime * 1000, scanTime * 1000, status)
+# }}}
+
+# BENCHMARK: Batch {{{
+# ;---------------------------------------------------------------------------
+# ; "--operations" mixed set / unset / get lines, run as separate CLI calls
+# ; (a load and, for mutations, a commit each) vs a single "batch" call.
+# ;---------------------------------------------------------------------------
+def benchBatch(workFolder, options):
+    environment = dict(os.environ, UNIMOG_LOCAL_SITE_CONFIG=workFolder)
+    toolName = os.path.join(rootFolder, 'unimogDev.py')
+    devNull = open(os.devnull, 'w')
+
+    print "%10s %12s %16s %12s %10s" % ("flags", "operations", "separate (ms)", "batch (ms)", "speedup")
+    for size in options.sizes:
+        fileName = generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), size)
+        utils.importMergedData(fileName)
+
+        functions = ['set', 'unset', 'get']
+        lines = ['%s %s' % (functions[index % 3], flagName(random.randrange(size))) for index in xrange(options.operations)]
+
+        def separate():
+            for line in lines:
+                subprocess.check_call([sys.executable, toolName, '-v=0'] + line.split(), stdout=devNull, env=environment)
+        separateTime = median(timeIt(separate, max(1, options.repeat // 2)))
+
+        def batch():
+            process = subprocess.Popen([sys.executable, toolName, '-v=0', 'batch'], stdin=subprocess.PIPE, stdout=devNull, env=environment)
+            process.communicate('\n'.join(lines) + '\n')
+            if process.returncode != 0:
+                raise RuntimeError("The batch failed with %d" % (process.returncode))
+        batchTime = median(timeIt(batch, options.repeat))
+
+        print "%10d %12d %16.3f %12.3f %9.1fx" % (size, len(lines), separateTime * 1000, batchTime * 1000, separateTime / max(batchTime, 1e-9))
+
+    devNull.close()
+# }}}
+
+# BENCHMARK: Render {{{
+# ;---------------------------------------------------------------------------
+# ; A bash startup as "unimogDev.env" performs it: source the rendered
+# ; script vs launch the tool and "eval export" every element.
+# ;---------------------------------------------------------------------------
+def benchRender(workFolder, options):
+    environment = dict(os.environ, UNIMOG_LOCAL_SITE_CONFIG=workFolder)
+    toolName = os.path.join(rootFolder, 'unimogDev.py')
+    evalLoop = 'for element in $(%s %s -v=0 list --mode=bash); do eval "export $element"; done' % (sys.executable, toolName)
+
+    print "%10s %16s %16s %10s" % ("flags", "python+eval (ms)", "source (ms)", "speedup")
+    for size in options.sizes:
+        fileName = generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), size)
+        utils.exportScripts(utils.importMergedData(fileName)[0], fileName)
+        sourceLine = 'source %s' % (fileName + '.bash')
+
+        evalTime = median(timeIt(lambda: subprocess.check_call(['bash', '-c', evalLoop], env=environment), options.repeat))
+        sourceTime = median(timeIt(lambda: subprocess.check_call(['bash', '-c', sourceLine], env=environment), options.repeat))
+        print "%10d %16.3f %16.3f %9.1fx" % (size, evalTime * 1000, sourceTime * 1000, evalTime / max(sourceTime, 1e-9))
+# }}}
+
+# BENCHMARK: Layers {{{
+# ;---------------------------------------------------------------------------
+# ; The in-memory merge of "--depths" layers (each overriding half of the
+# ; previous one's flags), then the real four layer stack (site, localsite,
+# ; show, user) loaded cold (every layer parsed), through the per-layer
+# ; snapshots (merged cache dropped) and from the merged cache.
+# ;---------------------------------------------------------------------------
+def benchLayers(workFolder, options):
+    import modules.layers as layers
+
+    print "%10s %8s %12s %14s" % ("flags", "depth", "merge (ms)", "merged flags")
+    for size in options.sizes:
+        for depth in options.depths:
+            layerData = [('layer%d' % (layer), dict((flagName(index + layer * size // 2), bool(index & 1)) for index in xrange(size))) for layer in xrange(depth)]
+            merged = []
+            mergeTime = median(timeIt(lambda: merged.append(layers.mergeLayers(layerData)), options.repeat))
+            print "%10d %8d %12.3f %14d" % (size, depth, mergeTime * 1000, len(merged[-1][0]))
+            del layerData[:], merged[:]
+
+    print "\n%10s %12s %14s %12s" % ("flags", "cold (ms)", "snapshots (ms)", "cached (ms)")
+    folders = dict((variable, os.path.join(workFolder, label)) for label, variable in layers.layerVariables)
+    savedEnvironment = dict((variable, os.environ.get(variable)) for variable in folders)
+    os.environ.update(folders)
+    try:
+        for size in options.sizes:
+            for layer, (label, variable) in enumerate(layers.layerVariables):
+                if not os.path.isdir(folders[variable]):
+                    os.makedirs(folders[variable])
+                fileName = os.path.join(folders[variable], 'unimogDev.yaml')
+                with open(fileName, 'w') as outStream:
+                    outStream.write(''.join('%s: %s\n' % (flagName(index + layer * size // 2), 'true' if index & 1 else 'false') for index in xrange(size)))
+            fileName = os.path.join(folders['UNIMOG_LOCAL_SITE_CONFIG'], 'unimogDev.yaml')
+            stack = layers.layerStack(fileName)
+
+            def dropCaches(snapshots):
+                for label, path in stack:
+                    for cacheName in ([snapshot.snapshotPath(path)] if snapshots else []) + [layers.mergedPath(path)]:
+                        if os.path.exists(cacheName):
+                            os.remove(cacheName)
+
+            coldTimes = []
+            for index in xrange(max(1, options.repeat // 2)):
+                dropCaches(True)
+                coldTimes.extend(timeIt(lambda: utils.importMergedData(fileName), 1))
+            snapshotTimes = []
+            for index in xrange(options.repeat):
+                dropCaches(False)
+                snapshotTimes.extend(timeIt(lambda: utils.importMergedData(fileName), 1))
+            cachedTime = median(timeIt(lambda: utils.importMergedData(fileName), options.repeat))
+            print "%10d %12.3f %14.3f %12.3f" % (size, median(coldTimes) * 1000, median(snapshotTimes) * 1000, cachedTime * 1000)
+    finally:
+        for variable, value in savedEnvironment.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+# }}}
+
+# BENCHMARK: Stream {{{
+# ;---------------------------------------------------------------------------
+# ; A "get" of one key at a growing position in the file (and of three keys
+# ; ending there) through the streaming scanner vs importYamlData + YamlObj
+# ; from a warm snapshot and from the YAML (cold). The scanner stops at the
+# ; last key when the merged cache vouches for a stack without derived
+# ; flags, otherwise it reads the file to its end ("read all").
+# ;---------------------------------------------------------------------------
+def benchStream(workFolder, options):
+    import modules.scanner as scanner
+
+    print "%10s %9s %5s %12s %14s %14s %12s" % ("flags", "position", "keys", "scan (ms)", "read all (ms)", "snapshot (ms)", "cold (ms)")
+    for size in options.sizes:
+        fileName = generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), size)
+        utils.importYamlData(fileName)
+
+        def fullGet(names, useSnapshot):
+            yamlObject = utils.YamlObj(**utils.importYamlData(fileName, useSnapshot))
+            return dict((name, yamlObject.flags.get(name)) for name in names)
+
+        coldTime = median(timeIt(lambda: fullGet([flagName(0)], False), max(1, options.repeat // 2)))
+        snapshotTime = median(timeIt(lambda: fullGet([flagName(0)], True), options.repeat))
+
+        for fraction in (0.0, 0.25, 0.5, 0.75, 1.0):
+            last = min(int(fraction * size), size - 1)
+            for names in ([flagName(last)], [flagName(last // 3), flagName(2 * last // 3), flagName(last)]):
+                found = []
+                scanTime = median(timeIt(lambda: found.append(scanner.scanFlags(fileName, names, derivedFree=True)), options.repeat))
+                readTime = median(timeIt(lambda: found.append(scanner.scanFlags(fileName, names)), options.repeat))
+                if found[0] != fullGet(names, True) or found[-1] != found[0]:
+                    print "%10d %8d%% %5d %12s" % (size, fraction * 100, len(names), "MISMATCH")
+                    continue
+                print "%10d %8d%% %5d %12.3f %14.3f %14.3f %12.3f" % (size, fraction * 100, len(names), scanTime * 1000, readTime * 1000, snapshotTime * 1000, coldTime * 1000)
+# }}}
+
+# BENCHMARK: Scale {{{
+# ;---------------------------------------------------------------------------
+# ; Every operation runs "--repeat" times in its own child process on a
+# ; loaded YamlObj (the load itself is not timed, except for the import
+# ; rows), the peak RSS is the one of that child. The pure-Python loader
+# ; and dumper only run up to "--pure-limit" flags.
+# ; The results go to "--results" as JSON, each row is compared with the
+# ; stored baseline ("--baseline") on its median and peak RSS.
+# ;---------------------------------------------------------------------------
+def scaleOperations(fileName, size):
+    targets = [flagName(index * size // 10) for index in xrange(min(size, 10))]
+
+    def loaded():
+        return utils.YamlObj(**utils.importYamlData(fileName))
+
+    def useLoader(loader):
+        utils.initialiseYaml()
+        import yaml
+        if loader == 'python':
+            utils.Loader, utils.Dumper = yaml.Loader, yaml.Dumper
+        else:
+            utils.Loader, utils.Dumper = yaml.CLoader, yaml.CDumper
+
+    def exportTarget():
+        return fileName + '.export'
+
+    operations = []
+    for loader in ('c', 'python'):
+        operations.append(('importYamlData', loader, lambda loader=loader: useLoader(loader), lambda state: utils.importYamlData(fileName, False)))
+        operations.append(('exportYamlData', loader, lambda loader=loader: (useLoader(loader), shutil.copy(fileName, exportTarget()), utils.importYamlData(fileName))[-1],
+            lambda state: utils.exportYamlData(state, exportTarget())))
+
+    operations.extend([
+        ('executeGet', None, loaded, lambda state: utils.executeGet(state, [targets[-1]])),
+        ('executeSet', None, loaded, lambda state: utils.executeSet(state, targets, 0, True)),
+        ('executeSet --mode=all', None, loaded, lambda state: utils.executeSet(state, utils.extractKeys(state.flags), 0, False)),
+        ('executeList', None, loaded, lambda state: utils.executeList(state, "default")),
+        ('executeList --mode=bash', None, loaded, lambda state: utils.executeList(state, "bash")),
+        ('executeList --mode=python', None, loaded, lambda state: utils.executeList(state, "python")),
+    ])
+    return operations
+
+def benchScale(workFolder, options):
+    results = []
+    print "%10s %-26s %7s %12s %12s %12s %12s" % ("flags", "operation", "loader", "p50 (ms)", "p90 (ms)", "p99 (ms)", "peak RSS (MB)")
+    for size in options.sizes:
+        fileName = generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), size)
+        utils.importYamlData(fileName)
+
+        for operation, loader, setup, function in scaleOperations(fileName, size):
+            if loader == 'python' and size > options.pure_limit:
+                continue
+
+            def measure():
+                state = setup()
+                return timeIt(lambda: function(state), options.repeat)
+            samples, peakRss = runInChild(measure)
+
+            row = {'operation' : operation, 'loader' : loader, 'flags' : size, 'samples' : len(samples), 'peak_rss_kb' : peakRss,
+                'min' : min(samples), 'max' : max(samples), 'mean' : sum(samples) / len(samples),
+                'p50' : percentile(samples, 0.5), 'p90' : percentile(samples, 0.9), 'p99' : percentile(samples, 0.99)}
+            results.append(row)
+            print "%10d %-26s %7s %12.3f %12.3f %12.3f %12.1f" % (size, operation, loader or '-', row['p50'] * 1000, row['p90'] * 1000, row['p99'] * 1000, peakRss / 1024.0)
+
+    report = {'host' : socket.gethostname(), 'python' : platform.python_version(), 'platform' : platform.platform(),
+        'timestamp' : time.strftime('%Y-%m-%dT%H:%M:%S'), 'repeat' : options.repeat, 'results' : results}
+    with open(options.results, 'w') as outStream:
+        json.dump(report, outStream, indent=1, sort_keys=True)
+    print "\nResults written to %s" % (options.results)
+
+    if options.save_baseline:
+        shutil.copy(options.results, options.baseline)
+        print "Baseline saved to %s" % (options.baseline)
+        return
+
+    if not os.path.isfile(options.baseline):
+        print "No baseline at %s (use --save-baseline)" % (options.baseline)
+        return
+
+    with open(options.baseline) as inStream:
+        baseline = json.load(inStream)
+    stored = dict(((row['operation'], row['loader'], row['flags']), row) for row in baseline['results'])
+
+    regressions = []
+    print "\nCompared with the baseline of %s (%s):" % (baseline['timestamp'], baseline['host'])
+    print "%10s %-26s %7s %12s %12s %8s" % ("flags", "operation", "loader", "p50 ratio", "RSS ratio", "status")
+    for row in results:
+        key = (row['operation'], row['loader'], row['flags'])
+        if key not in stored:
+            continue
+        timeRatio = row['p50'] / max(stored[key]['p50'], 1e-9)
+        memoryRatio = float(row['peak_rss_kb']) / max(stored[key]['peak_rss_kb'], 1)
+        # Sub-millisecond differences are scheduling noise, not regressions
+        slower = timeRatio > options.tolerance and (row['p50'] - stored[key]['p50']) * 1000 > options.noise_ms
+        larger = memoryRatio > options.tolerance
+        status = "ok"
+        if slower or larger:
+            status = "SLOWER" if slower else "LARGER"
+            regressions.append("%s (%s, %d flags)" % (row['operation'], row['loader'] or '-', row['flags']))
+        print "%10d %-26s %7s %11.2fx %11.2fx %8s" % (row['flags'], row['operation'], row['loader'] or '-', timeRatio, memoryRatio, status)
+
+    if regressions:
+        print "\nRegressions beyond %.2fx: %s" % (options.tolerance, ', '.join(regressions))
+        sys.exit(1)
+# }}}
+
+# Any additional benchmark goes here.
+
+# BENCHMARK: Logging {{{
+# ;---------------------------------------------------------------------------
+# ; "set --mode=all" at verbosity 0 and 3 (stderr to /dev/null) with this
+# ; tree and, given "--reference", with another checkout of the tool. Then
+# ; one disabled debug call: the eager "%" formatting through the per record
+# ; filter of the old logger setup vs the lazy call under the level gate.
+# ;---------------------------------------------------------------------------
+class LegacyFilter(logging.Filter):
+    def __init__(self, state):
+        self.state = state
+
+    def filter(self, record):
+        if self.state == 1:
+            return record.levelno in [logging.INFO, logging.ERROR, logging.CRITICAL]
+        elif self.state == 2:
+            return record.levelno in [logging.INFO, logging.DEBUG, logging.ERROR, logging.CRITICAL]
+        elif self.state > 2:
+            return record.levelno in [logging.INFO, logging.DEBUG, logging.ERROR, logging.CRITICAL, logging.WARNING]
+        else:
+            return False
+
+def benchLogging(workFolder, options):
+    environment = dict(os.environ, UNIMOG_LOCAL_SITE_CONFIG=workFolder)
+    trees = [('current', rootFolder)]
+    if options.reference:
+        trees.append(('reference', options.reference))
+    devNull = open(os.devnull, 'w')
+
+    print "%10s %10s %10s %12s" % ("flags", "tree", "verbosity", "set (ms)")
+    for size in options.sizes:
+        fileName = generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), size)
+        utils.importMergedData(fileName)
+        for verbosity in (0, 3):
+            for label, folder in trees:
+                command = [sys.executable, os.path.join(folder, 'unimogDev.py'), '-v=%d' % (verbosity), 'set', '--mode=all']
+                setTime = median(timeIt(lambda: subprocess.check_call(command, stdout=devNull, stderr=devNull, env=environment), options.repeat))
+                print "%10d %10s %10d %12.3f" % (size, label, verbosity, setTime * 1000)
+
+        # One disabled debug call with the whole config as its argument
+        flags = utils.importMergedData(fileName)[0]
+        calls = 1000 if size <= 10000 else 10
+        for label, level, handlerFilter in (('eager', logging.DEBUG, LegacyFilter(0)), ('lazy', utils.CustomFilter(0).lowestLevel, utils.CustomFilter(0))):
+            logger = logging.getLogger('unimogDevBench.%s.%d' % (label, size))
+            logger.propagate = False
+            logger.setLevel(level)
+            handler = logging.StreamHandler(devNull)
+            handler.addFilter(handlerFilter)
+            logger.addHandler(handler)
+            if label == 'eager':
+                def call():
+                    for index in xrange(calls):
+                        logger.debug("%s \n%s\n" % ("Incoming YAML dictionary is:", flags))
+            else:
+                def call():
+                    for index in xrange(calls):
+                        logger.debug("%s \n%s\n", "Incoming YAML dictionary is:", flags)
+            callTime = median(timeIt(call, options.repeat)) / calls
+            print "%10d %10s %10s %12.6f  (one disabled debug call)" % (size, label, '-', callTime * 1000)
+
+    devNull.close()
+# }}}
+
+# BENCHMARK: Watch {{{
+# ;---------------------------------------------------------------------------
+# ; "--subscribers" processes each run a FlagWatcher ("--debounce-ms") on
+# ; the config. Their CPU time is sampled over an idle second, then
+# ; "--repeat" commits (exportYamlData under the config lock) flip one flag each and the time from
+# ; the start of the commit to the notification is collected from every
+# ; subscriber.
+# ;---------------------------------------------------------------------------
+def watchSubscriber(fileName, debounce, usePolling, connection):
+    import modules.watcher as watcher
+
+    flagWatcher = watcher.FlagWatcher(fileName, debounce, usePolling, 0.1)
+    flagWatcher.subscribe(lambda changes: connection.send(('event', time.time())))
+    flagWatcher.start()
+    connection.send(('ready', flagWatcher.method))
+    while connection.recv() == 'cpu':
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        connection.send(('cpu', usage.ru_utime + usage.ru_stime))
+    flagWatcher.stop()
+
+def benchWatch(workFolder, options):
+    print "%10s %12s %8s %12s %12s %12s %14s" % ("flags", "subscribers", "method", "p50 (ms)", "p95 (ms)", "max (ms)", "idle CPU (%)")
+    for size in options.sizes:
+        fileName = generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), size)
+        flags = utils.importMergedData(fileName)[0]
+
+        for count in options.subscribers:
+            for usePolling in (False, True):
+                processes = []
+                connections = []
+                for index in xrange(count):
+                    parentEnd, childEnd = multiprocessing.Pipe()
+                    process = multiprocessing.Process(target=watchSubscriber, args=(fileName, options.debounce_ms / 1000.0, usePolling, childEnd))
+                    process.start()
+                    processes.append(process)
+                    connections.append(parentEnd)
+                method = [connection.recv()[1] for connection in connections][0]
+
+                # Idle CPU of every subscriber over one second
+                for connection in connections:
+                    connection.send('cpu')
+                before = [connection.recv()[1] for connection in connections]
+                time.sleep(1.0)
+                for connection in connections:
+                    connection.send('cpu')
+                after = [connection.recv()[1] for connection in connections]
+                idleCpu = sum(after) - sum(before)
+
+                latencies = []
+                for repeat in xrange(options.repeat):
+                    flags[flagName(0)] = not flags[flagName(0)]
+                    writeTime = time.time()
+                    with transaction.FileLock(fileName):
+                        utils.exportYamlData(flags, fileName)
+                    for connection in connections:
+                        latencies.append(connection.recv()[1] - writeTime)
+                    time.sleep(0.05)
+
+                for connection in connections:
+                    connection.send('stop')
+                for process in processes:
+                    process.join()
+
+                print "%10d %12d %8s %12.3f %12.3f %12.3f %14.3f" % (size, count, method, percentile(latencies, 0.5) * 1000, percentile(latencies, 0.95) * 1000, max(latencies) * 1000, idleCpu * 100)
+# }}}
+
+# BENCHMARK: Client {{{
+# ;---------------------------------------------------------------------------
+# ; One lookup through "unimogDev.py get" (fast path) vs the Flags client,
+# ; revalidating with a stat on every access and throttled to one check a
+# ; second, and the first access of a new client (the load).
+# ;---------------------------------------------------------------------------
+def benchClient(workFolder, options):
+    toolName = os.path.join(rootFolder, 'unimogDev.py')
+    environment = dict(os.environ, UNIMOG_LOCAL_SITE_CONFIG=workFolder)
+    devNull = open(os.devnull, 'w')
+    lookups = 10000
+
+    print "%10s %14s %14s %14s %14s %10s" % ("flags", "subprocess", "first access", "revalidate", "maxAge=1s", "speedup")
+    for size in options.sizes:
+        fileName = generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), size)
+        utils.importMergedData(fileName)
+        names = [flagName(random.randrange(size)) for index in xrange(lookups)]
+
+        command = [sys.executable, toolName, '-v=0', 'get', names[0]]
+        processTime = median(timeIt(lambda: subprocess.check_call(command, stdout=devNull, env=environment), options.repeat))
+        firstTime = median(timeIt(lambda: utils.Flags(fileName).get(names[0]), options.repeat))
+
+        timings = []
+        for maxAge in (0.0, 1.0):
+            flags = utils.Flags(fileName, maxAge)
+            flags.get(names[0])
+            def lookup():
+                for name in names:
+                    flags.get(name)
+            timings.append(median(timeIt(lookup, options.repeat)) / lookups)
+
+        print "%10d %12.3fms %12.3fms %12.3fus %12.3fus %9.0fx" % (size, processTime * 1000, firstTime * 1000, timings[0] * 1e6, timings[1] * 1e6, processTime / max(timings[0], 1e-12))
+
+    devNull.close()
+# }}}
+
+# BENCHMARK: Emitters {{{
+# ;---------------------------------------------------------------------------
+# ; Emit time and peak memory growth of every "list --mode" to /dev/null,
+# ; streamed through its emitter vs the v0.0.1.[6] string building of the
+# ; default, bash and python modes. The growth is measured against the RSS
+# ; of the forked child once its peak is reset (/proc/self/clear_refs).
+# ;---------------------------------------------------------------------------
+def memoryProbe():
+    # (current RSS, reset done) in KB, the peak follows the current RSS from here on
+    try:
+        with open('/proc/self/clear_refs', 'w') as outStream:
+            outStream.write('5')
+        with open('/proc/self/status') as inStream:
+            return int(re.search(r'VmRSS:\s+(\d+)', inStream.read()).group(1)), True
+    except (IOError, OSError, AttributeError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, False
+
+def peakMemory(reset):
+    if reset:
+        with open('/proc/self/status') as inStream:
+            return int(re.search(r'VmHWM:\s+(\d+)', inStream.read()).group(1))
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def legacyList(yamlObject, mode):
+    if mode == 'default':
+        return '\n'.join([''] + yamlObject.formatElements() + [''])
+    if mode == 'bash':
+        return ' '.join('{}={}'.format(key, int(val)) for key, val in yamlObject.flags.iteritems())
+    return str(dict(yamlObject.flags.iteritems()))
+
+def benchEmitters(workFolder, options):
+    import modules.emitters as emitters
+
+    print "%10s %8s %10s %12s %14s" % ("flags", "mode", "method", "emit (ms)", "peak +rss (kB)")
+    for size in options.sizes:
+        yamlObject = utils.YamlObj(**dict((flagName(index), bool(index % 3)) for index in xrange(size)))
+        for mode in sorted(emitters.modeEmitters):
+            for method in ('legacy', 'stream'):
+                if method == 'legacy' and mode not in ('default', 'bash', 'python'):
+                    continue
+
+                def probe():
+                    baseline, reset = memoryProbe()
+                    start = time.time()
+                    if method == 'legacy':
+                        print legacyList(yamlObject, mode)
+                    else:
+                        utils.executeList(yamlObject, mode)
+                    sys.stdout.flush()
+                    return time.time() - start, peakMemory(reset) - baseline
+
+                durations = []
+                growth = 0
+                for index in xrange(options.repeat):
+                    (duration, memory), peakRss = runInChild(probe)
+                    durations.append(duration)
+                    growth = max(growth, memory)
+                print "%10d %8s %10s %12.3f %14d" % (size, mode, method, median(durations) * 1000, growth)
+# }}}
+
+# BENCHMARK: Journal {{{
+# ;---------------------------------------------------------------------------
+# ; "--repeat" commits of one flipped flag through commitSet (journal append,
+# ; export scripts appended) vs the full rewrite of the YAML it replaced
+# ; (load, flip, exportYamlData), then one compaction of the journal written
+# ; by the commits. The flipped values are worked out before the timing.
+# ;---------------------------------------------------------------------------
+def benchJournal(workFolder, options):
+    import modules.journal as journal
+    stdout = sys.stdout
+
+    print "%10s %10s %12s %12s %14s" % ("flags", "path", "p50 (ms)", "p95 (ms)", "bytes/commit")
+    for size in options.sizes:
+        fileName = generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), size)
+        utils.exportYamlData(utils.importYamlData(fileName), fileName)
+        utils.exportScripts(utils.importMergedData(fileName)[0], fileName)
+
+        state = utils.importYamlData(fileName)
+        changes = []
+        for index in xrange(options.repeat):
+            name = flagName(random.randrange(size))
+            state[name] = not state[name]
+            changes.append((name, state[name]))
+
+        def rewrite(name, value):
+            with transaction.FileLock(fileName):
+                data = utils.importYamlData(fileName)
+                data[name] = value
+                utils.exportYamlData(data, fileName)
+
+        def commit(name, value):
+            utils.commitSet(fileName, [name], 0, value)
+
+        for label, function in (('rewrite', rewrite), ('journal', commit)):
+            durations = []
+            written = 0
+            for name, value in changes:
+                journalSize = os.path.getsize(journal.journalPath(fileName)) if os.path.exists(journal.journalPath(fileName)) else 0
+                sys.stdout = open(os.devnull, 'w')
+                try:
+                    durations.extend(timeIt(lambda: function(name, value), 1))
+                finally:
+                    sys.stdout = stdout
+                if label == 'rewrite':
+                    written = written + os.path.getsize(fileName)
+                elif os.path.exists(journal.journalPath(fileName)):
+                    written = written + os.path.getsize(journal.journalPath(fileName)) - journalSize
+            print "%10d %10s %12.3f %12.3f %14d" % (size, label, percentile(durations, 0.5) * 1000, percentile(durations, 0.95) * 1000, written // len(changes))
+
+            # The journal commits start from the same state as the rewrites
+            for name, value in changes:
+                state[name] = not state[name]
+            utils.exportYamlData(state, fileName)
+            utils.exportScripts(utils.importMergedData(fileName)[0], fileName)
+
+        with transaction.FileLock(fileName):
+            compactTime = median(timeIt(lambda: utils.compactJournal(fileName), 1))
+        print "%10d %10s %12.3f %12s %14d" % (size, 'compact', compactTime * 1000, '-', os.path.getsize(fileName))
+# }}}
+
+# BENCHMARK: Replica {{{
+# ;---------------------------------------------------------------------------
+# ; "--concurrency" readers (a "get" of a job start each, spread over
+# ; "--nodes" simulated farm nodes) start together against a plain folder
+# ; standing in for the shared config mount, without and with a node-local
+# ; replica per node. The opens, stats and bytes of the files opened for
+# ; reading are counted on the shared folder, for the first start (no
+# ; replica yet) and the next one.
+# ;---------------------------------------------------------------------------
+def replicaReader(fileName, name, start, results):
+    import __builtin__
+    import modules.fastpath as fastpath
+
+    shared = os.path.dirname(fileName) + os.sep
+    counts = {'open' : 0, 'stat' : 0, 'bytes' : 0}
+    builtinOpen, osOpen, osStat, osLstat = __builtin__.open, os.open, os.stat, os.lstat
+
+    def countedOpen(path, mode='r', *args):
+        if str(path).startswith(shared):
+            counts['open'] += 1
+            if 'r' in mode:
+                try:
+                    counts['bytes'] += osStat(path).st_size
+                except OSError:
+                    pass
+        return builtinOpen(path, mode, *args)
+
+    def countedOsOpen(path, flags, *args):
+        if str(path).startswith(shared):
+            counts['open'] += 1
+        return osOpen(path, flags, *args)
+
+    def counted(function):
+        def wrapper(path, *args):
+            if str(path).startswith(shared):
+                counts['stat'] += 1
+            return function(path, *args)
+        return wrapper
+
+    __builtin__.open, os.open, os.stat, os.lstat = countedOpen, countedOsOpen, counted(osStat), counted(osLstat)
+    start.wait()
+    began = time.time()
+    sys.stdout = builtinOpen(os.devnull, 'w')
+    try:
+        if not fastpath.run(['get', name]):
+            utils.Flags(fileName).get(name)
+    finally:
+        sys.stdout = sys.__stdout__
+    results.put((counts['open'], counts['stat'], counts['bytes'], time.time() - began))
+
+def benchReplica(workFolder, options):
+    sharedFolder = os.path.join(workFolder, 'shared')
+    os.mkdir(sharedFolder)
+    environment = dict(os.environ)
+
+    print "%10s %8s %8s %8s %10s %10s %14s %10s %10s" % ("flags", "mode", "start", "readers", "opens", "stats", "bytes", "p50 (ms)", "p95 (ms)")
+    for size in options.sizes:
+        fileName = generateConfig(os.path.join(sharedFolder, 'unimogDev.yaml'), size)
+        os.environ['UNIMOG_LOCAL_SITE_CONFIG'] = sharedFolder
+        for variable in ('UNIMOG_SITE_CONFIG', 'UNIMOG_SHOW_CONFIG', 'UNIMOG_USER_CONFIG', 'UNIMOG_DEV_REPLICA'):
+            os.environ.pop(variable, None)
+        utils.exportScripts(utils.importMergedData(fileName)[0], fileName)
+        names = [flagName(random.randrange(size)) for index in xrange(max(options.concurrency))]
+
+        for readers in options.concurrency:
+            for mode in ('shared', 'replica'):
+                nodeFolders = [os.path.join(workFolder, 'node%d' % (node)) for node in xrange(options.nodes)]
+                for folder in nodeFolders:
+                    shutil.rmtree(folder, True)
+
+                for label in ('first', 'next'):
+                    start = multiprocessing.Event()
+                    results = multiprocessing.Queue()
+                    processes = []
+                    for index in xrange(readers):
+                        if mode == 'replica':
+                            os.environ['UNIMOG_DEV_REPLICA'] = nodeFolders[index % options.nodes]
+                        processes.append(multiprocessing.Process(target=replicaReader, args=(fileName, names[index], start, results)))
+                        processes[-1].start()
+                    os.environ.pop('UNIMOG_DEV_REPLICA', None)
+
+                    start.set()
+                    totals = [results.get() for process in processes]
+                    for process in processes:
+                        process.join()
+
+                    durations = [total[3] for total in totals]
+                    print "%10d %8s %8s %8d %10d %10d %14d %10.3f %10.3f" % (size, mode, label, readers, sum(total[0] for total in totals), sum(total[1] for total in totals), sum(total[2] for total in totals), percentile(durations, 0.5) * 1000, percentile(durations, 0.95) * 1000)
+
+    os.environ.clear()
+    os.environ.update(environment)
+# }}}
+
+# BENCHMARK: Recursive {{{
+# ;---------------------------------------------------------------------------
+# ; "list" / "set" / "unset --recursive" over a generated tree of "--files"
+# ; configs (shows/<show>/<shot>/unimogDev.yaml) with "--cores" workers.
+# ; Trees beyond "--tree-limit" flags in total are skipped.
+# ;---------------------------------------------------------------------------
+def benchRecursive(workFolder, options):
+    toolName = os.path.join(rootFolder, 'unimogDev.py')
+    devNull = open(os.devnull, 'w')
+
+    print "%10s %8s %8s %8s %12s %10s" % ("flags", "files", "command", "workers", "time (ms)", "speedup")
+    for size in options.sizes:
+        if size * options.files > options.tree_limit:
+            print "%10d %8d %8s (skipped, beyond --tree-limit)" % (size, options.files, '-')
+            continue
+
+        treeFolder = os.path.join(workFolder, 'tree%d' % (size))
+        for index in xrange(options.files):
+            folder = os.path.join(treeFolder, 'shows', 'show%02d' % (index % 20), 'shot%04d' % (index))
+            os.makedirs(folder)
+            generateConfig(os.path.join(folder, 'unimogDev.yaml'), size)
+
+        for command in (['list'], ['set', '--mode=all'], ['unset', 'UNIMOG_MAYA_*']):
+            serial = None
+            for workers in options.cores:
+                def run():
+                    subprocess.check_call([sys.executable, toolName, '-v=0', command[0], '--recursive', treeFolder, '--workers', str(workers)] + command[1:], stdout=devNull)
+                duration = median(timeIt(run, options.repeat))
+                serial = serial or duration
+                print "%10d %8d %8s %8d %12.3f %9.2fx" % (size, options.files, command[0], workers, duration * 1000, serial / max(duration, 1e-9))
+        shutil.rmtree(treeFolder)
+
+    devNull.close()
+# }}}
+
+# BENCHMARK: Derived {{{
+# ;---------------------------------------------------------------------------
+# ; "size" base flags and "size" derived flags, as two graphs:
+# ;
+# ;     wide : UNIMOG_WIDE_i = UNIMOG_BASE_i and not UNIMOG_COMMON_DEV
+# ;     deep : UNIMOG_DEEP_i = UNIMOG_DEEP_(i-1) and UNIMOG_BASE_i
+# ;
+# ; The compile (parse, single compile, ranking) and the full evaluation are
+# ; timed once per graph, then "applySet" flips a flag "--repeat" times in
+# ; each direction: the propagation only walks the flags downstream of it
+# ; (one, half or all of them).
+# ;---------------------------------------------------------------------------
+def derivedGraphs(size):
+    baseName = lambda index: 'UNIMOG_BASE_%07d_DEV' % (index)
+    wide = dict(('UNIMOG_WIDE_%07d_DEV' % (index), '%s and not UNIMOG_COMMON_DEV' % (baseName(index))) for index in xrange(size))
+    deep = dict(('UNIMOG_DEEP_%07d_DEV' % (index), ('UNIMOG_DEEP_%07d_DEV and ' % (index - 1) if index else '') + baseName(index)) for index in xrange(size))
+    yield 'wide', wide, [baseName(size // 2), 'UNIMOG_COMMON_DEV']
+    yield 'deep', deep, [baseName(size - 1), baseName(size // 2), baseName(0)]
+
+def benchDerived(workFolder, options):
+    import modules.derived as derived
+
+    print "%10s %6s %12s %12s %26s %9s %14s" % ("flags", "graph", "compile (ms)", "full (ms)", "changed flag", "updated", "propagate (ms)")
+    for size in options.sizes:
+        for shape, definitions, changes in derivedGraphs(size):
+            data = dict(('UNIMOG_BASE_%07d_DEV' % (index), True) for index in xrange(size))
+            data['UNIMOG_COMMON_DEV'] = False
+            data[derived.derivedKey] = definitions
+
+            start = time.time()
+            graph = derived.DerivedGraph(definitions)
+            compileTime = time.time() - start
+            start = time.time()
+            graph.evaluate(data.get, data.__setitem__)
+            fullTime = time.time() - start
+
+            yamlObject = utils.YamlObj(**data)
+            yamlObject.derivedGraph = graph
+            for name in changes:
+                durations = []
+                updated = 0
+                state = not yamlObject.flags.get(name)
+                for index in xrange(options.repeat * 2):
+                    start = time.time()
+                    updated = max(updated, len(utils.applySet(yamlObject, [name], 0, state)))
+                    durations.append(time.time() - start)
+                    state = not state
+                print "%10d %6s %12.3f %12.3f %26s %9d %14.3f" % (size, shape, compileTime * 1000, fullTime * 1000, name, updated, median(durations) * 1000)
+# }}}
+
+# BENCHMARK: Table {{{
+# ;---------------------------------------------------------------------------
+# ; "--table-readers" processes start together, load the flags and look up
+# ; "--lookups" random names each, one mode at a time:
+# ;
+# ;     yaml   : importYamlData (snapshot), a private dict per process
+# ;     flags  : the Flags client (merged cache, a stat per lookup)
+# ;     table  : the mapped flag table, every process reads the same pages
+# ;
+# ; Every reader measures its RSS growth and its PSS (the shared pages split
+# ; between the processes mapping them, /proc/self/smaps_rollup) once all of
+# ; them are loaded. The lookup percentiles are over every lookup of every
+# ; reader.
+# ;---------------------------------------------------------------------------
+def memoryStatus():
+    # (RSS, PSS) in KB, PSS is 0 without smaps_rollup
+    try:
+        with open('/proc/self/smaps_rollup') as inStream:
+            content = inStream.read()
+        return int(re.search(r'^Rss:\s+(\d+)', content, re.M).group(1)), int(re.search(r'^Pss:\s+(\d+)', content, re.M).group(1))
+    except (IOError, OSError, AttributeError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 0
+
+def tableReader(fileName, mode, names, start, measure, results):
+    import modules.flagtable as flagtable
+
+    start.wait()
+    before = memoryStatus()[0]
+    began = time.time()
+    if mode == 'yaml':
+        get = utils.importYamlData(fileName).get
+    elif mode == 'flags':
+        get = utils.Flags(fileName).get
+    else:
+        get = flagtable.FlagTable(fileName).get
+    get(names[0])
+    loadTime = time.time() - began
+
+    durations = []
+    for name in names:
+        began = time.time()
+        get(name)
+        durations.append(time.time() - began)
+    results.put(('lookups', loadTime, durations))
+
+    measure.wait()
+    rss, pss = memoryStatus()
+    results.put(('memory', rss - before, pss))
+
+def benchTable(workFolder, options):
+    environment = dict(os.environ)
+    os.environ['UNIMOG_LOCAL_SITE_CONFIG'] = workFolder
+    for variable in ('UNIMOG_SITE_CONFIG', 'UNIMOG_SHOW_CONFIG', 'UNIMOG_USER_CONFIG', 'UNIMOG_DEV_REPLICA'):
+        os.environ.pop(variable, None)
+
+    print "%10s %6s %8s %10s %10s %10s %12s %12s" % ("flags", "mode", "readers", "load (ms)", "p50 (us)", "p99 (us)", "+rss (kB)", "pss (kB)")
+    for size in options.sizes:
+        fileName = generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), size)
+        utils.importYamlData(fileName)
+        utils.publishTable(fileName)
+        names = [flagName(random.randrange(size)) for index in xrange(options.lookups)]
+
+        for mode in ('yaml', 'flags', 'table'):
+            start = multiprocessing.Event()
+            measure = multiprocessing.Event()
+            results = multiprocessing.Queue()
+            processes = [multiprocessing.Process(target=tableReader, args=(fileName, mode, names, start, measure, results)) for index in xrange(options.table_readers)]
+            for process in processes:
+                process.start()
+
+            start.set()
+            lookups = [results.get() for process in processes]
+            measure.set()
+            memory = [results.get() for process in processes]
+            for process in processes:
+                process.join()
+
+            durations = [duration for reply in lookups for duration in reply[2]]
+            print "%10d %6s %8d %10.3f %10.2f %10.2f %12d %12d" % (size, mode, len(processes), median([reply[1] for reply in lookups]) * 1000, percentile(durations, 0.5) * 1e6, percentile(durations, 0.99) * 1e6, median([reply[1] for reply in memory]), median([reply[2] for reply in memory]))
+        utils.flagtable.remove(fileName)
+
+    os.environ.clear()
+    os.environ.update(environment)
+# }}}
+
+# BENCHMARK: Shards {{{
+# ;---------------------------------------------------------------------------
+# ; The same flags, spread over "--namespaces" namespaces (UNIMOG_APPnnn), in
+# ; a monolithic config and in a sharded one. "unimogDev.py get / set /
+# ; unset" of one flag of the last namespace (the end of the monolithic
+# ; file) are timed "--repeat" times each, without a replica or flag table,
+# ; then the compaction of the journal they left.
+# ;---------------------------------------------------------------------------
+def benchShards(workFolder, options):
+    import modules.shards as shards
+    toolName = os.path.join(rootFolder, 'unimogDev.py')
+    devNull = open(os.devnull, 'w')
+    environment = dict(os.environ)
+    for variable in ('UNIMOG_SITE_CONFIG', 'UNIMOG_SHOW_CONFIG', 'UNIMOG_USER_CONFIG', 'UNIMOG_DEV_REPLICA'):
+        os.environ.pop(variable, None)
+
+    print "%10s %6s %10s %8s %12s %12s" % ("flags", "shards", "layout", "command", "p50 (ms)", "p95 (ms)")
+    for size in options.sizes:
+        names = ["UNIMOG_APP%03d_%07d_DEV" % (index * options.namespaces // size, index) for index in xrange(size)]
+        for layout in ('single', 'sharded'):
+            folder = os.path.join(workFolder, layout)
+            os.mkdir(folder)
+            fileName = os.path.join(folder, 'unimogDev.yaml')
+            outStream = open(fileName, 'w')
+            try:
+                for index, name in enumerate(names):
+                    outStream.write("%s: %s\n" % (name, "true" if index % 3 else "false"))
+            finally:
+                outStream.close()
+
+            os.environ['UNIMOG_LOCAL_SITE_CONFIG'] = folder
+            if layout == 'sharded':
+                with transaction.FileLock(fileName):
+                    utils.shardConfig(fileName)
+            utils.exportScripts(utils.importMergedData(fileName)[0], fileName)
+            shardCount = len(shards.readManifest(fileName) or {})
+
+            for command in ('get', 'set', 'unset'):
+                def run():
+                    subprocess.check_call([sys.executable, toolName, '-v=0', command, names[-1]], stdout=devNull)
+                durations = timeIt(run, options.repeat)
+                print "%10d %6d %10s %8s %12.3f %12.3f" % (size, shardCount, layout, command, percentile(durations, 0.5) * 1000, percentile(durations, 0.95) * 1000)
+
+            with transaction.FileLock(fileName):
+                compactTime = median(timeIt(lambda: utils.compactJournal(fileName), 1))
+            print "%10d %6d %10s %8s %12.3f %12s" % (size, shardCount, layout, 'compact', compactTime * 1000, '-')
+            shutil.rmtree(folder)
+
+    devNull.close()
+    os.environ.clear()
+    os.environ.update(environment)
+# }}}
+
+# BENCHMARK: Schema {{{
+# ;---------------------------------------------------------------------------
+# ; The same flag names in three configs:
+# ;
+# ;     plain     : bool flags, no schema
+# ;     declared  : bool flags, every one declared "bool" in the schema
+# ;     typed     : a "--typed" fraction of int / enum / string / path / list
+# ;                 flags (declared and holding a value), the rest plain
+# ;
+# ; The load is timed from the YAML and from the snapshot, with the YamlObj
+# ; build. The list modes go through the emitters (to a null stream). The
+# ; schema is compiled once cold and once from the cache, then a "set" of a
+# ; new value for every typed flag is validated in one pass.
+# ;---------------------------------------------------------------------------
+typedSamples = [('int', {'type' : 'int', 'min' : 0, 'max' : 1000}, lambda index: index % 1000, lambda index: str(index % 997)),
+                ('enum', ['debug', 'release', 'profile'], lambda index: 'debug', lambda index: 'release'),
+                ('string', 'string', lambda index: '19.5.%d' % (index), lambda index: "20.0 build %d" % (index)),
+                ('path', 'path', lambda index: '/opt/app/%d' % (index), lambda index: '/opt/app//next/%d' % (index)),
+                ('list', 'list', lambda index: ['a%d' % (index), 'b'], lambda index: 'x:y:%d' % (index))]
+
+def schemaConfig(fileName, size, layout, typed):
+    import yaml
+
+    data = {}
+    declarations = {}
+    step = int(round(1 / typed)) if typed > 0 else 0
+    for index in xrange(size):
+        name = flagName(index)
+        sample = typedSamples[(index // step) % len(typedSamples)] if layout == 'typed' and step and index % step == 0 else None
+        if sample is None:
+            data[name] = bool(index % 3)
+            if layout == 'declared':
+                declarations[name] = 'bool'
+        else:
+            data[name] = sample[2](index)
+            declarations[name] = sample[1]
+    if declarations:
+        data[utils.layers.schemaKey] = declarations
+
+    for suffix in ('.journal', '.history', '.snapshot'):
+        if os.path.exists(fileName + suffix):
+            os.remove(fileName + suffix)
+    outStream = open(fileName, 'w')
+    try:
+        outStream.write(yaml.dump(data, Dumper=getattr(yaml, 'CDumper', yaml.Dumper), default_flow_style=False))
+    finally:
+        outStream.close()
+
+    # The new value of every typed flag, as a "set" would queue it
+    assignments = []
+    if layout == 'typed' and step:
+        for index in xrange(0, size, step):
+            assignments.append((flagName(index), typedSamples[(index // step) % len(typedSamples)][3](index)))
+    return declarations, assignments
+
+def benchSchema(workFolder, options):
+    import modules.schema as schema
+    import modules.emitters as emitters
+    devNull = open(os.devnull, 'w')
+    fileName = os.path.join(workFolder, 'unimogDev.yaml')
+
+    print "%10s %9s %7s %10s %14s %10s %13s %12s %12s %12s %14s" % ("flags", "config", "typed", "yaml (ms)", "snapshot (ms)", "obj (ms)", "compile (ms)", "cached (ms)", "bash (ms)", "export (ms)", "validate (ms)")
+    for size in options.sizes:
+        for layout in ('plain', 'declared', 'typed'):
+            declarations, assignments = schemaConfig(fileName, size, layout, options.typed)
+            typedCount = len([name for name in declarations if declarations[name] != 'bool'])
+
+            yamlTime = median(timeIt(lambda: utils.importYamlData(fileName, useSnapshot=False), options.repeat))
+            utils.importYamlData(fileName)
+            snapshotTime = median(timeIt(lambda: utils.importYamlData(fileName), options.repeat))
+            inData = utils.importYamlData(fileName)
+            objectTime = median(timeIt(lambda: utils.YamlObj(**dict(inData)), options.repeat))
+            yamlObject = utils.YamlObj(**dict(inData))
+
+            # A cold compile, then the cached schema of the same declarations (a reload)
+            schema.compiledFields.clear()
+            schema.compiledSchemas.clear()
+            start = time.time()
+            compiled = yamlObject.schema()
+            compileTime = time.time() - start
+            cachedTime = median(timeIt(lambda: schema.compileSchema(yamlObject.reserved.get(schema.schemaKey)), options.repeat))
+
+            listTimes = []
+            for mode in ('bash', 'export'):
+                listTimes.append(median(timeIt(lambda: emitters.writeList(devNull, mode, yamlObject.flags.names, yamlObject.flags.get), options.repeat)))
+
+            validateTime = 0.0
+            if assignments:
+                validateTime = median(timeIt(lambda: compiled.parseValues(assignments), options.repeat))
+                values, errors = compiled.parseValues(assignments)
+                if errors:
+                    print "Refused values: %s" % (errors[:3])
+            print "%10d %9s %7d %10.3f %14.3f %10.3f %13.3f %12.3f %12.3f %12.3f %14.3f" % (size, layout, typedCount, yamlTime * 1000, snapshotTime * 1000, objectTime * 1000, compileTime * 1000, cachedTime * 1000, listTimes[0] * 1000, listTimes[1] * 1000, validateTime * 1000)
+    devNull.close()
+# }}}
+
+# BENCHMARK: Format {{{
+# ;---------------------------------------------------------------------------
+# ; A generated config with a comment on top and every 1000th flag, then
+# ; "--repeat" flips of one random flag written with writeYamlFile:
+# ;
+# ;     touched   : the name is given (a journal compaction)
+# ;     diff      : the changed value is found through the snapshot
+# ;     dump      : the full dump (no snapshot to diff, up to "--dump-limit")
+# ;
+# ; The bytes are those of the YAML file and its snapshot, "changed" the
+# ; ones of the patched values.
+# ;---------------------------------------------------------------------------
+def benchFormat(workFolder, options):
+    print "%10s %8s %12s %12s %12s %14s %9s %9s" % ("flags", "path", "p50 (ms)", "p95 (ms)", "file bytes", "snapshot bytes", "changed", "comments")
+    for size in options.sizes:
+        fileName = generateConfig(os.path.join(workFolder, 'unimogDev.yaml'), size)
+        lines = open(fileName).readlines()
+        outStream = open(fileName, 'w')
+        try:
+            outStream.write("# Generated flags\n")
+            for index, line in enumerate(lines):
+                if not index % 1000:
+                    outStream.write("# block %d\n" % (index // 1000))
+                outStream.write(line)
+        finally:
+            outStream.close()
+        comments = (size + 999) // 1000 + 1
+        state = utils.importYamlData(fileName)
+
+        for label in ('touched', 'diff', 'dump'):
+            if label == 'dump' and size > options.dump_limit:
+                continue
+            durations = []
+            changed = 0
+            for index in xrange(options.repeat):
+                name = flagName(random.randrange(size))
+                state[name] = not state[name]
+                changed = changed + len(str(state[name]).lower())
+                if label == 'dump' and os.path.exists(snapshot.snapshotPath(fileName)):
+                    os.remove(snapshot.snapshotPath(fileName))
+                touched = [name] if label == 'touched' else None
+                durations.extend(timeIt(lambda: utils.writeYamlFile(fileName, state, touched), 1))
+            kept = len([line for line in open(fileName) if line.startswith('#')])
+            print "%10d %8s %12.3f %12.3f %12d %14d %9s %9s" % (size, label, percentile(durations, 0.5) * 1000, percentile(durations, 0.95) * 1000, os.path.getsize(fileName), os.path.getsize(snapshot.snapshotPath(fileName)),
+                                                               '-' if label == 'dump' else changed // options.repeat, '%d/%d' % (kept, comments))
+# }}}
+
+# }}}
+
+benchmarks = {'snapshot' : benchSnapshot, 'startup' : benchStartup, 'daemon' : benchDaemon, 'stress' : benchStress, 'flagset' : benchFlagSet, 'patterns' : benchPatterns, 'batch' : benchBatch, 'render' : benchRender, 'layers' : benchLayers, 'stream' : benchStream, 'scale' : benchScale, 'logging' : benchLogging, 'watch' : benchWatch, 'client' : benchClient, 'journal' : benchJournal, 'emitters' : benchEmitters, 'replica' : benchReplica, 'recursive' : benchRecursive, 'derived' : benchDerived, 'table' : benchTable, 'shards' : benchShards, 'schema' : benchSchema, 'format' : benchFormat}
+
+# Argument Parser Setup {{{
+mainProgram = argparse.ArgumentParser(prog='benchUnimogDev.py', description='Benchmarks for the unimogDev.py tool.')
+mainProgram.add_argument('benchmark', nargs='+', choices=sorted(benchmarks.keys()))
+mainProgram.add_argument('--sizes', default='10,100,1000,10000,100000', help='Comma separated flag counts.')
+mainProgram.add_argument('--repeat', type=int, default=5, help='Repetitions per measurement.')
+mainProgram.add_argument('--budget-ms', type=float, default=20.0, help='Startup wall-clock budget per command.')
+mainProgram.add_argument('--clients', type=int, default=8, help='Concurrent clients for the daemon benchmark.')
+mainProgram.add_argument('--writers', default='1,2,4,8', help='Comma separated writer process counts for the stress benchmark.')
+mainProgram.add_argument('--readers', type=int, default=2, help='Reader processes for the stress benchmark.')
+mainProgram.add_argument('--seconds', type=float, default=3.0, help='Duration of each stress run.')
+mainProgram.add_argument('--legacy-limit', type=int, default=20000, help='Largest config the O(n^2) legacy set is timed on.')
+mainProgram.add_argument('--operations', type=int, default=30, help='Operations per run of the batch benchmark.')
+mainProgram.add_argument('--depths', default='1,2,4,8,16', help='Comma separated layer stack depths for the layers benchmark.')
+mainProgram.add_argument('--results', default='benchUnimogDev.results.json', help='Results file of the scale benchmark.')
+mainProgram.add_argument('--baseline', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchUnimogDev.baseline.json'), help='Stored baseline of the scale benchmark.')
+mainProgram.add_argument('--save-baseline', action='store_true', default=False, help='Store the results of the scale benchmark as the new baseline.')
+mainProgram.add_argument('--tolerance', type=float, default=1.25, help='Slowdown / growth ratio against the baseline reported as a regression.')
+mainProgram.add_argument('--noise-ms', type=float, default=1.0, help='Median slowdowns smaller than this are never reported as regressions.')
+mainProgram.add_argument('--pure-limit', type=int, default=100000, help='Largest config the pure-Python loader and dumper are timed on.')
+mainProgram.add_argument('--subscribers', default='1,10,50', help='Comma separated watcher process counts for the watch benchmark.')
+mainProgram.add_argument('--debounce-ms', type=float, default=0.0, help='Debounce of the watch benchmark subscribers.')
+mainProgram.add_argument('--reference', default=None, metavar='FOLDER', help='Another checkout of the tool the logging benchmark runs against as well.')
+mainProgram.add_argument('--concurrency', default='16,128', help='Comma separated reader counts for the replica benchmark.')
+mainProgram.add_argument('--nodes', type=int, default=8, help='Simulated farm nodes of the replica benchmark.')
+mainProgram.add_argument('--files', type=int, default=1000, help='Configs in the generated tree of the recursive benchmark.')
+mainProgram.add_argument('--cores', default='1,2,4,8', help='Comma separated worker counts for the recursive benchmark.')
+mainProgram.add_argument('--tree-limit', type=int, default=10000000, help='Largest total flag count of a recursive benchmark tree.')
+mainProgram.add_argument('--table-readers', type=int, default=50, help='Concurrent reader processes for the table benchmark.')
+mainProgram.add_argument('--lookups', type=int, default=10000, help='Lookups per reader of the table benchmark.')
+mainProgram.add_argument('--namespaces', type=int, default=100, help='Flag namespaces (shards) of the shards benchmark.')
+mainProgram.add_argument('--typed', type=float, default=0.1, help='Fraction of typed flags in the schema benchmark.')
+mainProgram.add_argument('--dump-limit', type=int, default=1000000, help='Largest config the full dump of the format benchmark is timed on.')
+mainProgram.add_argument('--import-budget-ms', type=float, default=5.0, help='Import time budget of the fast path.')
+# }}}
+
+if __name__ == '__main__':
+    options = mainProgram.parse_args()
+    options.sizes = [int(size) for size in options.sizes.split(',')]
+    options.writers = [int(count) for count in options.writers.split(',')]
+    options.depths = [int(depth) for depth in options.depths.split(',')]
+    options.subscribers = [int(count) for count in options.subscribers.split(',')]
+    options.concurrency = [int(count) for count in options.concurrency.split(',')]
+    options.cores = [int(count) for count in options.cores.split(',')]
+
+    workFolder = tempfile.mkdtemp(prefix='unimogDevBench.')
+    try:
+        for name in options.benchmark:
+            print "\n[%s]" % (name)
+            benchmarks[name](workFolder, options)
+    finally:
+        shutil.rmtree(workFolder)
+
+# vim: ts=4 ft=python nowrap fdm=marker
@@ -0,0 +1,493 @@
+#!/bin/bash -f
+# ;---------------------------------------------------------------------------------------
+# ; {UNIMOG} Integrated Pipeline Tools
+# ;
+# ; Name    :   testUnimogFlags.sh
+# ; Author  :   Muhittin Bilginer
+# ; Created :   18/10/2026
+# ;
+# ; Info    :   Behaviour checks of "unimogDev.py" on scratch configs: the values read back
+# ;             after commits and compaction, the YAML text written in place, the derived
+# ;             values against the stored ones and the refusal of invalid values. Prints
+# ;             one line per failed check and exits with the number of failures.
+# ;
+# ; This tool is part of Unimog.
+# ;----------------------------------------------------------------------------------------
+
+# Run with the python of the tool, on configs of its own
+PYTHON=${PYTHON:-python2.7}
+UNIMOGDEV="$(cd "$(dirname "$0")/.." && pwd)/unimogDev.py"
+unset UNIMOG_SITE_CONFIG UNIMOG_SHOW_CONFIG UNIMOG_USER_CONFIG UNIMOG_DEV_SOCKET UNIMOG_DEV_REPLICA
+SCRATCH=`mktemp -d`
+trap 'rm -rf "$SCRATCH"' EXIT
+FAILURES=0
+
+unimogDev() {
+    "$PYTHON" "$UNIMOGDEV" -v=0 "$@"
+}
+
+# Compare an output with the expected one
+check() {
+    if [ "$2" != "$3" ]; then
+        echo "FAIL: $1"
+        echo "  expected: [$3]"
+        echo "  got     : [$2]"
+        FAILURES=$((FAILURES + 1))
+    fi
+}
+
+# The words of a "list --mode=bash" output, one per line in name order
+sortedWords() {
+    tr ' ' '\n' | grep -v '^$' | sort
+}
+
+# The values of the variables after sourcing the bash script of the config
+sourced() {
+    (. $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml.bash; for name in "$@"; do printenv $name; done) | paste -sd ' '
+}
+
+# NAME=value of the variables in a shell that sourced "unimogDev.env"
+envSourced() {
+    (cd "`dirname $UNIMOGDEV`"; getFileName() { basename "$1"; }; . ./unimogDev.env > /dev/null 2>&1; for name in "$@"; do echo "$name=${!name}"; done) | paste -sd ' '
+}
+
+# CHECK: Values round-trip over commits and compaction {{{
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/roundtrip
+mkdir -p $UNIMOG_LOCAL_SITE_CONFIG
+cat > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml <<EOF
+UNIMOG_HOUDINI_DEV: true
+UNIMOG_MAYA_DEV: false
+UNIMOG_NUKE_DEV: false
+EOF
+
+unimogDev set UNIMOG_MAYA_DEV UNIMOG_NUKE_DEV
+unimogDev unset UNIMOG_HOUDINI_DEV
+unimogDev unset UNIMOG_NUKE_DEV
+expected="UNIMOG_HOUDINI_DEV=0
+UNIMOG_MAYA_DEV=1
+UNIMOG_NUKE_DEV=0"
+check "journal values" "`unimogDev list --mode=bash | sortedWords`" "$expected"
+check "journal get" "`unimogDev get UNIMOG_MAYA_DEV`" "1"
+check "journal history" "`unimogDev history UNIMOG_NUKE_DEV | sed 's/^.* UNIMOG/UNIMOG/'`" "UNIMOG_NUKE_DEV 0 -> 1 (localsite)
+UNIMOG_NUKE_DEV 1 -> 0 (localsite)"
+
+unimogDev compact
+check "compact exit code" "$?" "0"
+check "journal folded" "`ls $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml.journal 2>/dev/null`" ""
+check "compacted values" "`unimogDev list --mode=bash | sortedWords`" "$expected"
+check "compacted file" "`cat $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml`" "UNIMOG_HOUDINI_DEV: false
+UNIMOG_MAYA_DEV: true
+UNIMOG_NUKE_DEV: false"
+check "history kept" "`unimogDev history UNIMOG_HOUDINI_DEV | sed 's/^.* UNIMOG/UNIMOG/'`" "UNIMOG_HOUDINI_DEV 1 -> 0 (localsite)"
+
+# A batch commits as one, a failing line leaves every flag as it was
+printf 'set UNIMOG_HOUDINI_DEV\nunset UNIMOG_MAYA_DEV\n' | unimogDev batch > /dev/null
+check "batch values" "`unimogDev list --mode=bash | sortedWords`" "UNIMOG_HOUDINI_DEV=1
+UNIMOG_MAYA_DEV=0
+UNIMOG_NUKE_DEV=0"
+printf 'set UNIMOG_NUKE_DEV\nset UNIMOG_MISSING_DEV=5\n' | unimogDev batch > /dev/null 2>&1
+check "failed batch refused" "$?" "10"
+check "failed batch values" "`unimogDev get UNIMOG_NUKE_DEV`" "0"
+printf 'bogus UNIMOG_NUKE_DEV\n' | unimogDev batch > /dev/null 2>&1
+check "unknown batch operation refused" "$?" "10"
+
+# The reads of a batch see its earlier lines, a flag set and unset again is no change
+cp $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml.journal $SCRATCH/roundtrip.journal
+cat > $SCRATCH/roundtrip.batch <<EOF
+# The comments are skipped
+set UNIMOG_NUKE_DEV
+get UNIMOG_NUKE_DEV
+unset UNIMOG_NUKE_DEV
+get UNIMOG_NUKE_DEV UNIMOG_MAYA_DEV
+EOF
+check "batch file output" "`unimogDev batch $SCRATCH/roundtrip.batch`" "1
+UNIMOG_NUKE_DEV=0
+UNIMOG_MAYA_DEV=0"
+check "batch without a change" "`cmp $SCRATCH/roundtrip.journal $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml.journal`" ""
+printf 'unset UNIMOG_HOUDINI_DEV\nset UNIMOG_MAYA_DEV\n' | unimogDev batch > /dev/null
+check "batch records of one commit" "`unimogDev history | tail -2 | awk '{print $2}' | uniq | wc -l | tr -d ' '`" "1"
+printf 'set UNIMOG_HOUDINI_DEV\nunset UNIMOG_MAYA_DEV\n' | unimogDev batch > /dev/null
+
+# The export scripts and the flag table follow every commit
+unimogDev render
+unimogDev publish
+unimogDev set UNIMOG_NUKE_DEV
+check "sourced script" "`sourced UNIMOG_NUKE_DEV UNIMOG_MAYA_DEV`" "1 0"
+check "flag table get" "`unimogDev get UNIMOG_NUKE_DEV`" "1"
+unimogDev compact
+check "sourced script after compact" "`sourced UNIMOG_NUKE_DEV UNIMOG_MAYA_DEV`" "1 0"
+# }}}
+
+# CHECK: The history answers for any earlier time {{{
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/history
+mkdir -p $UNIMOG_LOCAL_SITE_CONFIG
+printf 'UNIMOG_MAYA_DEV: false\nUNIMOG_NUKE_DEV: false\n' > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml
+
+before=`date +%s`
+sleep 1.1
+unimogDev set UNIMOG_MAYA_DEV
+sleep 1.1
+between=`date +%s`
+sleep 1.1
+unimogDev set UNIMOG_NUKE_DEV
+unimogDev unset UNIMOG_MAYA_DEV
+
+check "list at the start" "`unimogDev list --at=$before --mode=bash | sortedWords`" "UNIMOG_MAYA_DEV=0
+UNIMOG_NUKE_DEV=0"
+check "list in between" "`unimogDev list --at=$between --mode=bash | sortedWords`" "UNIMOG_MAYA_DEV=1
+UNIMOG_NUKE_DEV=0"
+check "list at a date" "`unimogDev list --at=\"\`date -d @$between '+%Y-%m-%d %H:%M:%S'\`\" --mode=bash | sortedWords`" "UNIMOG_MAYA_DEV=1
+UNIMOG_NUKE_DEV=0"
+check "history of a flag" "`unimogDev history UNIMOG_MAYA_DEV | sed 's/^.* UNIMOG/UNIMOG/'`" "UNIMOG_MAYA_DEV 0 -> 1 (localsite)
+UNIMOG_MAYA_DEV 1 -> 0 (localsite)"
+
+unimogDev compact
+check "list in between after compact" "`unimogDev list --at=$between --mode=bash | sortedWords`" "UNIMOG_MAYA_DEV=1
+UNIMOG_NUKE_DEV=0"
+check "history after compact" "`unimogDev history | wc -l | tr -d ' '`" "3"
+unimogDev list --at=yesterday > /dev/null 2>&1
+check "invalid time refused" "$?" "4"
+# }}}
+
+# CHECK: Changed values are patched into the YAML text {{{
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/patch
+mkdir -p $UNIMOG_LOCAL_SITE_CONFIG
+cat > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml <<EOF
+# Site DEV flags
+UNIMOG_NUKE_DEV: True
+UNIMOG_HOUDINI_DEV: yes   # houdini builds
+UNIMOG_MAYA_DEV: no
+
+# Left as they are
+UNIMOG_PYTHON_DEV: off
+EOF
+
+unimogDev unset UNIMOG_HOUDINI_DEV UNIMOG_NUKE_DEV
+unimogDev set UNIMOG_MAYA_DEV
+unimogDev compact
+check "patched file" "`cat $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml`" "# Site DEV flags
+UNIMOG_NUKE_DEV: False
+UNIMOG_HOUDINI_DEV: no   # houdini builds
+UNIMOG_MAYA_DEV: yes
+
+# Left as they are
+UNIMOG_PYTHON_DEV: off"
+check "patched values" "`unimogDev list --mode=bash | sortedWords`" "UNIMOG_HOUDINI_DEV=0
+UNIMOG_MAYA_DEV=1
+UNIMOG_NUKE_DEV=0
+UNIMOG_PYTHON_DEV=0"
+# }}}
+
+# CHECK: Every list mode writes the same flags {{{
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/emitters
+mkdir -p $UNIMOG_LOCAL_SITE_CONFIG
+cat > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml <<EOF
+UNIMOG_MAYA_DEV: true
+UNIMOG_NUKE_DEV: false
+UNIMOG_NUKE_DEV_MODE: fast path
+__schema__:
+  UNIMOG_NUKE_DEV_MODE: [debug, fast path]
+EOF
+
+check "bash mode" "`eval \"\`unimogDev list --mode=bash\`\"; echo $UNIMOG_MAYA_DEV $UNIMOG_NUKE_DEV $UNIMOG_NUKE_DEV_MODE`" "1 0 fast path"
+check "export mode" "`unimogDev list --mode=export | sort`" "export UNIMOG_MAYA_DEV=1
+export UNIMOG_NUKE_DEV=0
+export UNIMOG_NUKE_DEV_MODE='fast path'"
+check "zsh mode" "`unimogDev list --mode=zsh | sort`" "`unimogDev list --mode=export | sort`"
+check "tcsh mode" "`unimogDev list --mode=tcsh | sort`" "setenv UNIMOG_MAYA_DEV 1
+setenv UNIMOG_NUKE_DEV 0
+setenv UNIMOG_NUKE_DEV_MODE 'fast path'"
+check "fish mode" "`unimogDev list --mode=fish | sort`" "set -gx UNIMOG_MAYA_DEV 1
+set -gx UNIMOG_NUKE_DEV 0
+set -gx UNIMOG_NUKE_DEV_MODE 'fast path'"
+check "env0 mode" "`unimogDev list --mode=env0 | tr '\\0' '\\n' | sort`" "UNIMOG_MAYA_DEV=1
+UNIMOG_NUKE_DEV=0
+UNIMOG_NUKE_DEV_MODE=fast path"
+check "dotenv mode" "`unimogDev list --mode=dotenv | sort`" "UNIMOG_MAYA_DEV=1
+UNIMOG_NUKE_DEV=0
+UNIMOG_NUKE_DEV_MODE='fast path'"
+check "jsonl mode" "`unimogDev list --mode=jsonl | sort`" '{"name": "UNIMOG_MAYA_DEV", "value": true}
+{"name": "UNIMOG_NUKE_DEV", "value": false}
+{"name": "UNIMOG_NUKE_DEV_MODE", "value": "fast path"}'
+check "python mode" "`unimogDev list --mode=python | \"$PYTHON\" -c 'import sys, ast; print sorted(ast.literal_eval(sys.stdin.read()).items())'`" "[('UNIMOG_MAYA_DEV', True), ('UNIMOG_NUKE_DEV', False), ('UNIMOG_NUKE_DEV_MODE', 'fast path')]"
+check "export mode sourced" "`eval \"\`unimogDev list --mode=export\`\"; echo $UNIMOG_MAYA_DEV $UNIMOG_NUKE_DEV $UNIMOG_NUKE_DEV_MODE`" "1 0 fast path"
+unimogDev list --mode=yaml > /dev/null 2>&1
+check "unknown mode refused" "$?" "5"
+# }}}
+
+# CHECK: Derived values win over stored ones {{{
+export UNIMOG_SITE_CONFIG=$SCRATCH/derived/site
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/derived/local
+mkdir -p $UNIMOG_SITE_CONFIG $UNIMOG_LOCAL_SITE_CONFIG
+cat > $UNIMOG_SITE_CONFIG/unimogDev.yaml <<EOF
+UNIMOG_HOUDINI_DEV: true
+UNIMOG_MAYA_DEV: false
+__derived__:
+  UNIMOG_LD_LIBRARY_DEV: UNIMOG_HOUDINI_DEV and UNIMOG_MAYA_DEV
+EOF
+cat > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml <<EOF
+UNIMOG_LD_LIBRARY_DEV: true
+UNIMOG_NUKE_DEV: false
+EOF
+
+check "derived get" "`unimogDev get UNIMOG_LD_LIBRARY_DEV`" "0"
+check "derived list" "`unimogDev list --mode=bash | sortedWords`" "UNIMOG_HOUDINI_DEV=1
+UNIMOG_LD_LIBRARY_DEV=0
+UNIMOG_MAYA_DEV=0
+UNIMOG_NUKE_DEV=0"
+unimogDev render
+unimogDev publish
+check "derived script" "`grep "UNIMOG_LD_LIBRARY_DEV=" $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml.bash`" "export UNIMOG_LD_LIBRARY_DEV=0"
+check "derived flag table" "`unimogDev get UNIMOG_LD_LIBRARY_DEV`" "0"
+
+unimogDev set UNIMOG_MAYA_DEV
+check "derived get after set" "`unimogDev get UNIMOG_LD_LIBRARY_DEV`" "1"
+check "derived script after set" "`sourced UNIMOG_LD_LIBRARY_DEV`" "1"
+check "stored value kept" "`grep UNIMOG_LD_LIBRARY_DEV $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml`" "UNIMOG_LD_LIBRARY_DEV: true"
+unset UNIMOG_SITE_CONFIG
+
+# A get of a stack without derived flags stops at the flag, a definition added after it still counts
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/derived/plain
+mkdir -p $UNIMOG_LOCAL_SITE_CONFIG
+printf 'UNIMOG_HOUDINI_DEV: true\nUNIMOG_LD_LIBRARY_DEV: true\n' > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml
+unimogDev list > /dev/null
+check "plain get" "`unimogDev get UNIMOG_LD_LIBRARY_DEV`" "1"
+printf '__derived__:\n  UNIMOG_LD_LIBRARY_DEV: not UNIMOG_HOUDINI_DEV\n' >> $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml
+check "derived get after the flag" "`unimogDev get UNIMOG_LD_LIBRARY_DEV`" "0"
+# }}}
+
+# CHECK: Invalid values are refused {{{
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/schema
+mkdir -p $UNIMOG_LOCAL_SITE_CONFIG
+cat > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml <<EOF
+UNIMOG_HOUDINI_DEV: false
+UNIMOG_HOUDINI_DEV_LEVEL: 0
+UNIMOG_NUKE_DEV_MODE: debug
+__schema__:
+  UNIMOG_HOUDINI_DEV_LEVEL:
+    type: int
+    min: 0
+    max: 3
+  UNIMOG_NUKE_DEV_MODE: [debug, release]
+EOF
+cp $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml $SCRATCH/schema.yaml
+
+unimogDev set UNIMOG_HOUDINI_DEV_LEVEL=7 2> /dev/null
+check "out of range refused" "$?" "4"
+unimogDev set UNIMOG_HOUDINI_DEV_LEVEL=abc 2> /dev/null
+check "not an int refused" "$?" "4"
+unimogDev set UNIMOG_HOUDINI_DEV UNIMOG_NUKE_DEV_MODE=fast 2> /dev/null
+check "not an enum value refused" "$?" "4"
+check "refused values unchanged" "`unimogDev list --mode=bash | sortedWords`" "UNIMOG_HOUDINI_DEV=0
+UNIMOG_HOUDINI_DEV_LEVEL=0
+UNIMOG_NUKE_DEV_MODE=debug"
+check "refused file unchanged" "`cmp $SCRATCH/schema.yaml $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml && ls $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml.journal 2>/dev/null`" ""
+
+unimogDev set UNIMOG_HOUDINI_DEV_LEVEL=2 UNIMOG_NUKE_DEV_MODE=release
+check "typed value set" "$?" "0"
+check "typed get" "`unimogDev get UNIMOG_HOUDINI_DEV_LEVEL` `unimogDev get UNIMOG_NUKE_DEV_MODE`" "2 release"
+
+# An invalid set queued by another writer stays queued for it, the valid one commits
+printf 'other.1.0\t1\tdefault\tUNIMOG_HOUDINI_DEV_LEVEL=9\n' > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml.pending
+unimogDev set UNIMOG_HOUDINI_DEV_LEVEL=1
+check "valid set beside a queued invalid one" "$? `unimogDev get UNIMOG_HOUDINI_DEV_LEVEL`" "0 1"
+check "queued invalid set kept for its writer" "`cat $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml.pending`" "`printf 'other.1.0\t1\tdefault\tUNIMOG_HOUDINI_DEV_LEVEL=9'`"
+rm -f $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml.pending
+
+unimogDev unset --recursive $SCRATCH 2> /dev/null
+check "recursive without a selection refused" "$?" "4"
+# }}}
+
+# CHECK: Recursive runs go over every config below a root {{{
+for show in alpha beta gamma; do
+    mkdir -p $SCRATCH/shows/$show
+    printf 'UNIMOG_MAYA_DEV: false\nUNIMOG_NUKE_DEV: true\n' > $SCRATCH/shows/$show/unimogDev.yaml
+done
+mkdir -p $SCRATCH/shows/broken
+printf 'UNIMOG_MAYA_DEV: [false\n' > $SCRATCH/shows/broken/unimogDev.yaml
+
+# A verbose parent keeps its log writer busy while the workers are forked
+timeout 60 "$PYTHON" "$UNIMOGDEV" -v=3 set --recursive=$SCRATCH/shows --workers=3 UNIMOG_MAYA_DEV > $SCRATCH/recursive.out 2> /dev/null
+check "recursive set with a broken config" "$?" "1"
+check "recursive set output" "`grep changed $SCRATCH/recursive.out | sort`" "alpha/unimogDev.yaml: 1 changed
+beta/unimogDev.yaml: 1 changed
+gamma/unimogDev.yaml: 1 changed"
+rm -rf $SCRATCH/shows/broken
+check "recursive list" "`unimogDev list --recursive=$SCRATCH/shows --workers=2 | grep unimogDev.yaml | sort`" "alpha/unimogDev.yaml: UNIMOG_MAYA_DEV=1 UNIMOG_NUKE_DEV=1
+beta/unimogDev.yaml: UNIMOG_MAYA_DEV=1 UNIMOG_NUKE_DEV=1
+gamma/unimogDev.yaml: UNIMOG_MAYA_DEV=1 UNIMOG_NUKE_DEV=1"
+timeout 60 "$PYTHON" "$UNIMOGDEV" -v=3 unset --recursive=$SCRATCH/shows --mode=all > /dev/null 2>&1
+check "recursive unset all" "$? `UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/shows/beta unimogDev list --mode=bash | sortedWords | paste -sd ' '`" "0 UNIMOG_MAYA_DEV=0 UNIMOG_NUKE_DEV=0"
+# }}}
+
+# CHECK: A sharded config reads and writes like a single file {{{
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/shards
+mkdir -p $UNIMOG_LOCAL_SITE_CONFIG
+cat > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml <<EOF
+UNIMOG_HOUDINI_DEV: true
+UNIMOG_HOUDINI_DEV_LEVEL: false
+UNIMOG_MAYA_DEV: false
+UNIMOG_NUKE_DEV: true
+EOF
+expected="`unimogDev list --mode=bash | sortedWords`"
+
+unimogDev shard
+check "shard exit code" "$?" "0"
+check "shard manifest" "`cat $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml.shards`" "UNIMOG_HOUDINI unimogDev.UNIMOG_HOUDINI.yaml
+UNIMOG_MAYA unimogDev.UNIMOG_MAYA.yaml
+UNIMOG_NUKE unimogDev.UNIMOG_NUKE.yaml"
+check "shard file" "`cat $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.UNIMOG_HOUDINI.yaml`" "UNIMOG_HOUDINI_DEV: true
+UNIMOG_HOUDINI_DEV_LEVEL: false"
+check "sharded values" "`unimogDev list --mode=bash | sortedWords`" "$expected"
+check "sharded get" "`unimogDev get UNIMOG_NUKE_DEV UNIMOG_HOUDINI_DEV_LEVEL`" "UNIMOG_NUKE_DEV=1
+UNIMOG_HOUDINI_DEV_LEVEL=0"
+
+# A commit only rewrites the shards of the flags it changed
+cp $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.UNIMOG_NUKE.yaml $SCRATCH/shards.nuke
+unimogDev set UNIMOG_MAYA_DEV
+unimogDev compact
+check "sharded set" "`unimogDev get UNIMOG_MAYA_DEV`" "1"
+check "changed shard" "`cat $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.UNIMOG_MAYA.yaml`" "UNIMOG_MAYA_DEV: true"
+check "other shard untouched" "`cmp $SCRATCH/shards.nuke $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.UNIMOG_NUKE.yaml`" ""
+
+unimogDev shard --merge
+check "merged shards" "`ls $UNIMOG_LOCAL_SITE_CONFIG | grep -c 'UNIMOG_\\|shards'` `cat $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml`" "0 UNIMOG_HOUDINI_DEV: true
+UNIMOG_HOUDINI_DEV_LEVEL: false
+UNIMOG_MAYA_DEV: true
+UNIMOG_NUKE_DEV: true"
+# }}}
+
+# CHECK: Watch reports the changed flags {{{
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/watch
+mkdir -p $UNIMOG_LOCAL_SITE_CONFIG
+printf 'UNIMOG_MAYA_DEV: false\nUNIMOG_NUKE_DEV: false\n' > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml
+
+# Polled, only the watched flags, a removed flag is reported once
+timeout 5 "$PYTHON" "$UNIMOGDEV" -v=0 watch --poll=0.1 --debounce=50 'UNIMOG_MAYA_*' > $SCRATCH/watch.out 2> /dev/null &
+sleep 1.5
+unimogDev set UNIMOG_MAYA_DEV UNIMOG_NUKE_DEV
+sleep 1
+unimogDev unset UNIMOG_MAYA_DEV
+sleep 1
+rm -f $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml.journal
+printf 'UNIMOG_NUKE_DEV: true\n' > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml
+wait
+check "polled watch" "`cat $SCRATCH/watch.out`" "UNIMOG_MAYA_DEV=1
+UNIMOG_MAYA_DEV=0
+UNIMOG_MAYA_DEV="
+
+# Through inotify, the flags of a burst of commits
+printf 'UNIMOG_MAYA_DEV: false\nUNIMOG_NUKE_DEV: true\n' > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml
+timeout 4 "$PYTHON" "$UNIMOGDEV" -v=0 watch --debounce=300 > $SCRATCH/watch.out 2> /dev/null &
+sleep 1.5
+unimogDev set UNIMOG_MAYA_DEV
+unimogDev unset UNIMOG_NUKE_DEV
+wait
+check "inotify watch" "`sort $SCRATCH/watch.out`" "UNIMOG_MAYA_DEV=1
+UNIMOG_NUKE_DEV=0"
+# }}}
+
+# CHECK: The node replica serves its own layer stack {{{
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/replica/local
+export UNIMOG_DEV_REPLICA=$SCRATCH/replica/node
+export UNIMOG_DEV_REPLICA_INTERVAL=600
+mkdir -p $UNIMOG_LOCAL_SITE_CONFIG $SCRATCH/replica/showA $SCRATCH/replica/showB
+echo "UNIMOG_HOUDINI_DEV: false" > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml
+echo "UNIMOG_HOUDINI_DEV: true" > $SCRATCH/replica/showA/unimogDev.yaml
+echo "UNIMOG_MAYA_DEV: true" > $SCRATCH/replica/showB/unimogDev.yaml
+
+UNIMOG_SHOW_CONFIG=$SCRATCH/replica/showA unimogDev replicate
+check "replica get" "`UNIMOG_SHOW_CONFIG=$SCRATCH/replica/showA unimogDev get UNIMOG_HOUDINI_DEV`" "1"
+check "replica of another show" "`UNIMOG_SHOW_CONFIG=$SCRATCH/replica/showB unimogDev get UNIMOG_HOUDINI_DEV`" "0"
+check "replica list of another show" "`UNIMOG_SHOW_CONFIG=$SCRATCH/replica/showB unimogDev list --mode=bash | sortedWords`" "UNIMOG_HOUDINI_DEV=0
+UNIMOG_MAYA_DEV=1"
+UNIMOG_SHOW_CONFIG=$SCRATCH/replica/showB unimogDev set UNIMOG_HOUDINI_DEV
+check "replica after a commit" "`UNIMOG_SHOW_CONFIG=$SCRATCH/replica/showB unimogDev get UNIMOG_HOUDINI_DEV`" "1"
+unset UNIMOG_DEV_REPLICA UNIMOG_DEV_REPLICA_INTERVAL
+# }}}
+
+# CHECK: The rendered script serves its own layer stack {{{
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/rendered/local
+mkdir -p $UNIMOG_LOCAL_SITE_CONFIG $SCRATCH/rendered/showA $SCRATCH/rendered/showB
+printf 'UNIMOG_HOUDINI_DEV: false\nUNIMOG_MAYA_DEV: false\n' > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml
+echo "UNIMOG_HOUDINI_DEV: true" > $SCRATCH/rendered/showA/unimogDev.yaml
+echo "UNIMOG_NUKE_DEV: true" > $SCRATCH/rendered/showB/unimogDev.yaml
+
+UNIMOG_SHOW_CONFIG=$SCRATCH/rendered/showA unimogDev render
+UNIMOG_SHOW_CONFIG=$SCRATCH/rendered/showA unimogDev set UNIMOG_MAYA_DEV
+check "rendered stack" "`sed -n 2p $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml.bash`" "# Stack: |$UNIMOG_LOCAL_SITE_CONFIG|$SCRATCH/rendered/showA|"
+check "env of the rendered show" "`UNIMOG_SHOW_CONFIG=$SCRATCH/rendered/showA envSourced UNIMOG_HOUDINI_DEV UNIMOG_MAYA_DEV UNIMOG_NUKE_DEV`" "UNIMOG_HOUDINI_DEV=1 UNIMOG_MAYA_DEV=1 UNIMOG_NUKE_DEV="
+check "env of another show" "`UNIMOG_SHOW_CONFIG=$SCRATCH/rendered/showB envSourced UNIMOG_HOUDINI_DEV UNIMOG_MAYA_DEV UNIMOG_NUKE_DEV`" "UNIMOG_HOUDINI_DEV=0 UNIMOG_MAYA_DEV=1 UNIMOG_NUKE_DEV=1"
+# }}}
+
+# CHECK: Diff between configs and the environment {{{
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/diff/local
+mkdir -p $UNIMOG_LOCAL_SITE_CONFIG $SCRATCH/diff/other
+printf 'UNIMOG_HOUDINI_DEV: true\nUNIMOG_MAYA_DEV: false\n' > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml
+printf 'UNIMOG_HOUDINI_DEV: false\nUNIMOG_NUKE_DEV: true\n' > $SCRATCH/diff/other/unimogDev.yaml
+
+check "diff of two configs" "`unimogDev diff $SCRATCH/diff/other $UNIMOG_LOCAL_SITE_CONFIG`" "UNIMOG_HOUDINI_DEV 0 -> 1
+UNIMOG_MAYA_DEV - -> 0
+UNIMOG_NUKE_DEV 1 -> -"
+check "diff of the environment" "`UNIMOG_HOUDINI_DEV=0 UNIMOG_MAYA_DEV=0 UNIMOG_PIPELINE_DEV=1 unimogDev diff --env --mode=bash`" "export UNIMOG_HOUDINI_DEV=1
+export UNIMOG_DEV_EXPORTED=UNIMOG_HOUDINI_DEV:UNIMOG_MAYA_DEV"
+check "diff unsets what it exported" "`UNIMOG_DEV_EXPORTED=UNIMOG_HOUDINI_DEV:UNIMOG_MAYA_DEV:UNIMOG_NUKE_DEV UNIMOG_HOUDINI_DEV=1 UNIMOG_MAYA_DEV=0 UNIMOG_NUKE_DEV=1 unimogDev diff --env --mode=bash`" "unset UNIMOG_NUKE_DEV
+export UNIMOG_DEV_EXPORTED=UNIMOG_HOUDINI_DEV:UNIMOG_MAYA_DEV"
+check "env leaves other variables" "`UNIMOG_PIPELINE_DEV=1 UNIMOG_NUKE_DEV=1 envSourced UNIMOG_HOUDINI_DEV UNIMOG_PIPELINE_DEV UNIMOG_NUKE_DEV`" "UNIMOG_HOUDINI_DEV=1 UNIMOG_PIPELINE_DEV=1 UNIMOG_NUKE_DEV=1"
+check "env unsets a removed flag" "`UNIMOG_DEV_EXPORTED=UNIMOG_NUKE_DEV UNIMOG_NUKE_DEV=1 envSourced UNIMOG_HOUDINI_DEV UNIMOG_NUKE_DEV`" "UNIMOG_HOUDINI_DEV=1 UNIMOG_NUKE_DEV="
+# }}}
+
+# CHECK: The daemon answers its own user and layer stack {{{
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/daemon
+mkdir -p $UNIMOG_LOCAL_SITE_CONFIG
+cat > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml <<EOF
+UNIMOG_HOUDINI_DEV: true
+UNIMOG_NUKE_DEV_BUILD: 'a b'
+__schema__:
+  UNIMOG_NUKE_DEV_BUILD: string
+EOF
+
+# The payload of a daemon reply, "refused" for an error or no daemon at all
+daemonQuery() {
+    (cd "`dirname $UNIMOGDEV`"; "$PYTHON" -c "
+import sys
+import modules.daemon as daemon
+try:
+    sys.stdout.write(daemon.query(sys.argv[1], sys.argv[2]))
+except Exception:
+    sys.stdout.write('refused')" "$1" $SCRATCH/daemon.sock)
+}
+
+"$PYTHON" "$UNIMOGDEV" -v=0 serve --socket=$SCRATCH/daemon.sock &
+daemonProcess=$!
+for attempt in 1 2 3 4 5 6 7 8 9 10; do
+    [ "`daemonQuery ping`" == "refused" ] || break
+    sleep 0.2
+done
+check "daemon get" "`daemonQuery 'get UNIMOG_HOUDINI_DEV'`" "1"
+check "daemon export" "`eval "$(daemonQuery 'list --mode=export')"; echo "$UNIMOG_HOUDINI_DEV $UNIMOG_NUKE_DEV_BUILD"`" "1 a b"
+unimogDev set UNIMOG_NUKE_DEV_BUILD=c
+check "daemon after a commit" "`daemonQuery 'get UNIMOG_NUKE_DEV_BUILD'`" "c"
+check "daemon of another stack" "`UNIMOG_SHOW_CONFIG=$SCRATCH daemonQuery 'get UNIMOG_HOUDINI_DEV'`" "refused"
+if [ "`id -u`" -eq 0 ]; then
+    chown nobody $SCRATCH/daemon.sock
+    check "daemon socket of another user" "`daemonQuery 'get UNIMOG_HOUDINI_DEV'`" "refused"
+    chown root $SCRATCH/daemon.sock
+fi
+kill $daemonProcess
+wait $daemonProcess 2> /dev/null
+# }}}
+
+# CHECK: A broken config is never read as flags {{{
+export UNIMOG_LOCAL_SITE_CONFIG=$SCRATCH/broken
+mkdir -p $UNIMOG_LOCAL_SITE_CONFIG
+printf 'UNIMOG_HOUDINI_DEV: true\n  broken: [\n' > $UNIMOG_LOCAL_SITE_CONFIG/unimogDev.yaml
+
+check "broken list" "`unimogDev list --mode=bash 2> /dev/null; echo exit $?`" "exit 1"
+check "broken get" "`unimogDev get UNIMOG_HOUDINI_DEV 2> /dev/null; echo exit $?`" "exit 1"
+check "broken list at a time" "`unimogDev list --at=2026-01-01 2> /dev/null; echo exit $?`" "exit 1"
+check "broken diff" "`UNIMOG_MAYA_DEV=1 unimogDev diff --env --mode=bash 2> /dev/null; echo exit $?`" "exit 1"
+check "broken env keeps the flags" "`UNIMOG_MAYA_DEV=1 envSourced UNIMOG_MAYA_DEV`" "UNIMOG_MAYA_DEV=1"
+# }}}
+
+exit $FAILURES
@@ -3,7 +3,7 @@
 # ; {UNIMOG} Integrated Pipeline Tools
 # ;
 # ; Name    :   unimogDev.py
-# ; Version :   0.0.1.[5]
+# ; Version :   0.0.1.[6]
 # ; Author  :   Muhittin Bilginer
 # ; Created :   07/09/2014
 # ; Edited  :   08/10/2014
@@ -18,28 +18,75 @@
 # {Functions / Sub-programs}
 #   Get     (get)   : Gets a flag status (single)
 #   List    (list)  : Lists all of the current flags. (multiple)
-#   Set     (set)   : Set the flag for a specific item (multiple).
+#   Set     (set)   : Set the flag for a specific item (multiple), "NAME=VALUE" writes a typed value.
 #   Unset   (unset) : Unset the flag for a specific item. (multiple)
+#   Serve   (serve) : Runs the resident flag daemon on a Unix domain socket.
+#   Batch   (batch) : Runs get/set/unset/list lines from a file (or stdin) as one transaction.
+#   Render  (render): Writes the export scripts (bash, zsh, tcsh) beside the YAML file.
+#   Watch   (watch) : Prints "NAME=0/1" for every flag whose value changes ("NAME=" once it is gone).
+#   History (history): Prints the journal history (time, old -> new value, layer) of flags.
+#   Compact (compact): Folds the mutation journal into the YAML file (run it periodically).
+#   Replicate (replicate): Refreshes the node-local replica ($UNIMOG_DEV_REPLICA) from the shared config.
+#   Diff    (diff)  : Prints the flags that differ between two configs, or the environment and a config.
+#   Publish (publish): Publishes the memory-mapped flag table beside the YAML file ("--remove" drops it).
+#   Shard   (shard) : Splits the YAML file into one shard per flag namespace ("--merge" folds them back).
 #
 # {Options}
 #   Verbosity   (-v, --verbosity)   : Verbosity scale from 0 (silent) to 3 (a detailed message).
+#   Log File    (--log-file=FILE)   : Also writes the log records (same verbosity) to a rotating file.
+#   Profile     (--profile[=json])  : Emits the timing spans of every phase to stderr (text or json),
+#                                     "--profile-output" appends them to a file instead and
+#                                     "--profile-cprofile" dumps cProfile stats of the dispatch.
 #   Help        (-h)                : Displays a help message, possible to use just after the function flag.
 #   Version     (--version)         : Display the version of the utility.
 #
 # {Special Options}
+#   Match   (--match="regex")       : Selects the variables matching a regular expression (get, set,
+#                                     unset, list). Glob targets ("UNIMOG_*_DEV") work as well.
+#   Origin  (--origin)              : Reports the configuration layer of every value (list).
+#   Recursive (--recursive=ROOT)    : Runs on every unimogDev.yaml below ROOT, each one on its own, in
+#                                     "--workers=N" processes (list, set, unset). A line is printed per
+#                                     config as it completes, then the configs every flag is on in.
+#   Env     (--env)                 : Compares the environment with the config (diff).
+#   At      (--at="time")           : Lists the flags as they were at a time (epoch seconds or
+#                                     "YYYY-MM-DD[ HH:MM[:SS]]"), from the journal history (list).
 #   Mode    (--mode="modifier")     : Will run a special mode for the parrent function.
 #                                     Current modes are:
 #
 #                                     --mode=all                : For the "Set" and "Unset" functions.
-#                                     --mode=bash, --mode=python: For the "List" function.
+#                                     --mode=bash, --mode=python: For the "List" function,
+#                                     as well as export (zsh), tcsh, fish, env0, dotenv
+#                                     and jsonl.
+#                                     --mode=json, --mode=bash|zsh|tcsh: For the "Diff" function.
 # Examples:
 #
 #   unimogDev.py get UNIMOG_NUKE_DEV
 #   unimogDev.py set UNIMOG_HOUDINI_DEV UNIMOG_MAYA_DEV UNIMOG_NUKE_DEV
 #   unimogDev.py set --mode=all
+#   unimogDev.py set UNIMOG_HOUDINI_DEV_BUILD=19.5.605 UNIMOG_NUKE_DEV_MODE=release
 #   unimogDev.py unset UNIMOG_HOUDINI_DEV
 #   unimogDev.py list
 #   unimogDev.py list --mode=bash
+#   unimogDev.py set 'UNIMOG_*_LIBRARY_DEV'
+#   unimogDev.py unset --match '^UNIMOG_(MAYA|NUKE)_'
+#   unimogDev.py list --mode=bash 'UNIMOG_MAYA_*'
+#   unimogDev.py list --mode=jsonl --origin
+#   unimogDev.py list --mode=env0 | xargs -0 -n1 echo
+#   unimogDev.py list --origin
+#   unimogDev.py list --at='2026-10-18 09:30'
+#   unimogDev.py history UNIMOG_NUKE_DEV
+#   unimogDev.py --profile=json --profile-output=/tmp/unimogDev.profile set UNIMOG_NUKE_DEV
+#   unimogDev.py --verbosity=3 --log-file=/tmp/unimogDev.log set --mode=all
+#   unimogDev.py serve --socket=/tmp/unimogDev.sock
+#   unimogDev.py batch deploy.batch
+#   unimogDev.py render
+#   unimogDev.py watch 'UNIMOG_MAYA_*'
+#   printf 'set UNIMOG_NUKE_DEV\nget UNIMOG_NUKE_DEV\n' | unimogDev.py batch
+#   UNIMOG_DEV_REPLICA=/dev/shm/unimogDev.$USER unimogDev.py replicate
+#   unimogDev.py diff /shows/abc /shows/xyz
+#   eval "$(unimogDev.py -v=0 diff --env --mode=bash)"
+#   unimogDev.py list --recursive=/shows 'UNIMOG_MAYA_*'
+#   unimogDev.py unset --recursive=/shows --workers=8 UNIMOG_NUKE_DEV
 #
 # Updates:
 #   v0.0.1.[3]:
@@ -50,23 +97,123 @@
 #       No change, just a sync with the other components
 #   v0.0.1.[5]:
 #       Code restructured so that all of the functions are in the module
+#   v0.0.1.[6]:
+#       The parsed YAML is cached in a compiled snapshot beside the config file
+#       ("unimogDev.yaml.snapshot"), the YAML is only parsed again when it changes.
+#       Read-only commands ("get", "list --mode=bash|python") take a fast start path
+#       at verbosity 0 and 1 that skips argparse, logging and yaml entirely.
+#       A resident daemon ("serve") keeps the flags in memory and answers over a Unix
+#       domain socket, "unimogDev.sh" and "unimogDev.env" use it when it is reachable.
+#       "set" / "unset" run their read-modify-write cycle under an advisory lock and
+#       commit through write-temp-fsync-rename, concurrent writers share one commit.
+#       "get", "set", "unset" and "list" accept glob targets and "--match" regular
+#       expressions, resolved through a name index built once per load.
+#       "batch" runs a stream of operations against one in-memory config and commits
+#       them with a single write, or not at all when any of them fails.
+#       Every commit (and "render") writes sourceable export scripts beside the YAML
+#       ("unimogDev.yaml.bash", ".zsh", ".tcsh"), "unimogDev.env" sources the bash one
+#       while it is newer than the YAML instead of launching Python.
+#       The flags are read from a stack of layers, $UNIMOG_SITE_CONFIG, $UNIMOG_LOCAL_SITE_CONFIG,
+#       $UNIMOG_SHOW_CONFIG and $UNIMOG_USER_CONFIG (later ones override earlier ones). The
+#       merged view is cached until a layer changes, writes only go to the local site layer.
+#       "get" (one or several plain names) scans the YAML files as a line stream and stops
+#       at the last requested flag, documents using anchors or multi-line constructs fall
+#       back to the full loader.
+#       "--profile[=json]" reports the time spent per phase (interpreter start, imports,
+#       argument parsing, YAML import, load, dispatch, export) with the host and PID.
+#       Log calls are formatted lazily and disabled levels return before a record is
+#       built, the records are written by a background thread ("--log-file" adds a
+#       rotating log file).
+#       "watch" (and the "modules.watcher" subscriber API for long running sessions)
+#       reports the flags whose values changed, through inotify or stat polling, with a
+#       burst of commits debounced into one notification.
+#       The tool can be imported, the command line runs through "main(argv)". Pipeline
+#       code uses the "modules.utilities.Flags" client (loaded once, revalidated by a stat
+#       per access) instead of launching "unimogDev.py get" per lookup.
+#       "set" / "unset" / "batch" append one journal record per changed flag beside the YAML
+#       ("unimogDev.yaml.journal") instead of rewriting it. A journal beyond 64 KB (or the
+#       "compact" command) is folded back into the YAML and kept in "unimogDev.yaml.history",
+#       which "history" and "list --at" read.
+#       With $UNIMOG_DEV_REPLICA set (a tmpfs folder on the farm nodes) the readers ("get",
+#       "list", "unimogDev.env", the "Flags" client) use a checksum verified node-local copy
+#       of the merged flags and export scripts, checked against the shared config every
+#       30 s (+/-50% jitter, $UNIMOG_DEV_REPLICA_INTERVAL) by one process per node.
+#       "list", "set" and "unset" take "--recursive=ROOT": every config below ROOT is
+#       processed in a pool of "--workers" processes (one per CPU by default), results are
+#       streamed as they complete and followed by the configs every flag is on in. Each
+#       config is changed under its own lock through its journal.
+#       "diff" prints the flags that differ between two configs (or one and the merged local
+#       site stack), "diff --env" between the environment and the config. "--mode=json" and
+#       "--mode=bash|zsh|tcsh" (only the exports that changed) are available, "unimogDev.env"
+#       applies that delta when it has to launch the tool. Only the flags the tool exported
+#       before (listed in $UNIMOG_DEV_EXPORTED) are ever unset.
+#       "list" writes its output as it is produced (modules/emitters.py), the default table
+#       is sorted by name. New modes: "export" ("zsh"), "tcsh", "fish", "env0" (NUL
+#       terminated), "dotenv" and "jsonl" (JSON Lines).
+#       Derived flags: a "__derived__" mapping in a layer defines flags as boolean
+#       expressions over other flags ("UNIMOG_HOUDINI_DEV or UNIMOG_MAYA_DEV", see
+#       modules/derived.py). They are part of the merged view (origin "derived"), follow
+#       every "set" / "unset" of the flags they read and can not be set themselves.
+#       "publish" writes a fixed layout binary flag table ("unimogDev.yaml.table", see
+#       modules/flagtable.py) that processes map and read in place, sharing its pages.
+#       Commits write their changes into it under a generation counter, readers notice
+#       them through "FlagTable.refresh()". "get" answers from it while its signature
+#       matches the layers.
+#       "shard" splits the YAML file into one file per flag namespace ("UNIMOG_MAYA" ->
+#       "unimogDev.UNIMOG_MAYA.yaml") listed in "unimogDev.yaml.shards" (see
+#       modules/shards.py), "shard --merge" folds them back. "get" reads, and "set" /
+#       "unset" of plain names load, only the shards of the names, a compaction only
+#       rewrites the shards with journal records. "list" streams the shards in order.
+#       Typed values: a "__schema__" mapping in a layer declares flags as int, enum, string,
+#       path or list (see modules/schema.py), "set NAME=VALUE" writes them. The schema is
+#       compiled once and the values of a "set" are validated together before the commit,
+#       an invalid one refuses the command (exit code 4). The readers never validate, the
+#       shell outputs and the export scripts quote the text of a typed value.
+#       Format preserving writes: a journal compaction (or any rewrite of the YAML keeping its
+#       keys) patches the changed values into the file as it is (see modules/spans.py), the
+#       comments, the key order and the spelling of the other values stay. A new or removed
+#       key, or a value without a one line span, still gets a full dump.
 #
 # TODO:
 #   Nothing to implement.
 # ;----------------------------------------------------------------------------------------
 
 # Declare external imports
-import sys, os, re, time, string
+import sys, os, time
+
+# The start up checkpoints of "--profile", one time.time() call each
+scriptStart = time.time()
+
+# Fast Start Path {{{
+# ;---------------------------------------------------------------------------
+# ; Read-only commands ("get", "list --mode=<any but default>") at verbosity 0 or 1 are
+# ; answered straight from the fresh merged cache, before argparse, logging and
+# ; yaml are imported. Anything else falls through to the full path below.
+# ; Imported as a module, nothing runs (see "main").
+# ;---------------------------------------------------------------------------
+import modules.fastpath as fastpath
+
+if __name__ == '__main__' and fastpath.run(sys.argv[1:]):
+    sys.exit(0)
+
+fastPathDone = time.time()
+# }}}
+
+# Declare the full path imports
+import re
 import argparse
 import logging
 from argparse import RawTextHelpFormatter
-from datetime import datetime
 
 # Declare internal imports
 import modules.utilities as utils
+import modules.profiling as profiling
+import modules.logqueue as logqueue
+
+importsDone = time.time()
 
 # Setup prog related variables
-program = {'name' : 'unimogDev.py', 'majorVersion' : '0', 'minorVersion' : '0', 'buildVersion' : '1', 'devCounter' : '5'}
+program = {'name' : 'unimogDev.py', 'majorVersion' : '0', 'minorVersion' : '0', 'buildVersion' : '1', 'devCounter' : '6'}
 
 # Argument Parser Setup {{{
 # ;---------------------------------------------------------------------------
@@ -98,6 +245,10 @@ mainProgram = argparse.ArgumentParser(
 
 # Add a global verbosity argument to the main parser. {{{
 mainProgram.add_argument('-v', '--verbosity', nargs=1, type=int, default=0, help='The verbosity level required for the debug functions', metavar="0, 1, 2")
+mainProgram.add_argument('--log-file', default=None, metavar='FILE', help='Also write the log records to FILE (rotated at 1 MB, 3 backups)')
+mainProgram.add_argument('--profile', nargs='?', const='text', default=None, choices=['text', 'json'], help='Report the timing of every phase on stderr (text by default)')
+mainProgram.add_argument('--profile-output', default=None, metavar='FILE', help='Append the --profile record to FILE instead of stderr')
+mainProgram.add_argument('--profile-cprofile', default=None, metavar='FILE', help='Dump cProfile stats of the dispatch to FILE (implies --profile)')
 mainProgram.add_argument('--version', action='version', version=' \n' + '%(prog)s' + ' v' + program['majorVersion'] + '.' + program['minorVersion'] + '.' + program['buildVersion'] + '.[' + program['devCounter'] + ']' + ' (BETA) (Darwin64) | Environment Dev Flags Manager | {UNIMOG} Integrated Pipeline Tools\n ', help="Show program's version number and exit")
 # }}}
 
@@ -107,15 +258,19 @@ subProgram = mainProgram.add_subparsers(help='Please choose one of the main func
 #}}}
 
 # Create the parser for the "get" sub-command {{{
-get = subProgram.add_parser('get', help='Get the dev flag for a single item.')
-get.add_argument('targetObject', nargs=1, type=str, metavar='VARIABLE, a target dev environment variable to work on.')
+get = subProgram.add_parser('get', help='Get the dev flag for a single item. (several items, globs or "--match" print NAME=0/1 lines)')
+get.add_argument('targetObject', nargs='*', type=str, metavar='VARIABLE, a target dev environment variable to work on.')
+get.add_argument('--match', action='append', default=[], metavar='REGEX', help='Select the variables matching a regular expression (repeatable)')
 get.set_defaults(func='get')
 # }}}
 
 # Create the parser for the "set" sub-command {{{
 set = subProgram.add_parser('set', help='Set the dev flag to TRUE for a single or multiple items. (use "--mode=all" for all items)')
-set.add_argument('targetObject', nargs='*', type=str, metavar='VARIABLE, a target dev environment variable to work on.')
+set.add_argument('targetObject', nargs='*', type=str, metavar='VARIABLE[=VALUE], a target dev environment variable to work on (a typed one takes a value).')
 set.add_argument('--mode', nargs='?')
+set.add_argument('--match', action='append', default=[], metavar='REGEX', help='Select the variables matching a regular expression (repeatable)')
+set.add_argument('--recursive', default=None, metavar='ROOT', help='Set the selected flags of every unimogDev.yaml below ROOT, in parallel')
+set.add_argument('--workers', type=int, default=None, metavar='N', help='The worker processes of --recursive (default: one per CPU)')
 set.set_defaults(func='set', mode='default')
 # }}}
 
@@ -123,229 +278,666 @@ set.set_defaults(func='set', mode='default')
 unset = subProgram.add_parser('unset', help='Unset the dev flag for a single or multiple items, the resulting state is FALSE. (use "--mode=all" for all items)')
 unset.add_argument('targetObject', nargs='*', type=str, metavar='variable, a target dev environment variable to work on.')
 unset.add_argument('--mode', nargs='?')
+unset.add_argument('--match', action='append', default=[], metavar='REGEX', help='Select the variables matching a regular expression (repeatable)')
+unset.add_argument('--recursive', default=None, metavar='ROOT', help='Unset the selected flags of every unimogDev.yaml below ROOT, in parallel')
+unset.add_argument('--workers', type=int, default=None, metavar='N', help='The worker processes of --recursive (default: one per CPU)')
 unset.set_defaults(func='unset', mode='default')
 # }}}
 
 # Create the parser for the "list" command {{{
-list = subProgram.add_parser('list', help='Lists the status of all flags. (use "--mode=bash" for bash style list)')
+list = subProgram.add_parser('list', help='Lists the status of all flags. (use "--mode=bash" for bash style list, or export, zsh, tcsh, fish, env0, dotenv, jsonl, python)')
+list.add_argument('targetObject', nargs='*', type=str, metavar='VARIABLE, an optional variable or glob to filter the list.')
 list.add_argument('--mode', nargs='?')
+list.add_argument('--match', action='append', default=[], metavar='REGEX', help='List the variables matching a regular expression (repeatable)')
+list.add_argument('--origin', action='store_true', default=False, help='Report the configuration layer (site, localsite, show, user) of every value')
+list.add_argument('--at', default=None, metavar='TIME', help='List the flags as they were at TIME (epoch seconds or "YYYY-MM-DD[ HH:MM[:SS]]")')
+list.add_argument('--recursive', default=None, metavar='ROOT', help='List the flags of every unimogDev.yaml below ROOT, in parallel')
+list.add_argument('--workers', type=int, default=None, metavar='N', help='The worker processes of --recursive (default: one per CPU)')
 list.set_defaults(func='list', mode='default')
 # }}}
 
-# Any additional function goes here.
+# Create the parser for the "serve" command {{{
+serve = subProgram.add_parser('serve', help='Run the resident flag daemon, answering get/list/set/unset over a Unix domain socket.')
+serve.add_argument('--socket', nargs='?', default=None, help='The socket path (default: $UNIMOG_DEV_SOCKET or /tmp/unimogDev.<uid>.sock)')
+serve.set_defaults(func='serve', mode='default')
+# }}}
 
+# Create the parser for the "batch" command {{{
+batch = subProgram.add_parser('batch', help='Run get/set/unset/list lines (command line syntax, one per line) as one transaction.')
+batch.add_argument('batchFile', nargs='?', default='-', metavar='FILE, the operations to run ("-" or none for stdin).')
+batch.set_defaults(func='batch', mode='default')
 # }}}
 
-args = mainProgram.parse_args()
+# Create the parser for the "render" command {{{
+render = subProgram.add_parser('render', help='Write the export scripts (bash, zsh, tcsh) beside the YAML file.')
+render.set_defaults(func='render', mode='default')
+# }}}
 
-# Debug Logger Setup {{{
-# ;---------------------------------------------------------------------------
-# ; Setup the logger
-# ;---------------------------------------------------------------------------
+# Create the parser for the "watch" command {{{
+watch = subProgram.add_parser('watch', help='Print NAME=0/1 for every flag whose value changes, until interrupted.')
+watch.add_argument('targetObject', nargs='*', type=str, metavar='VARIABLE, an optional variable or glob to watch.')
+watch.add_argument('--match', action='append', default=[], metavar='REGEX', help='Watch the variables matching a regular expression (repeatable)')
+watch.add_argument('--debounce', type=float, default=250.0, metavar='MS', help='Quiet period closing a burst of changes (default: 250 ms)')
+watch.add_argument('--poll', nargs='?', const=1.0, type=float, default=None, metavar='SECONDS', help='Poll the layer files instead of using inotify (every SECONDS, default: 1)')
+watch.set_defaults(func='watch', mode='default')
+# }}}
 
-# Get the verbosity flag
-try:
-    verbosityFlag = args.verbosity[0]
-except:
-    # Verbose INFO, ERROR, CRITICAL by default
-    verbosityFlag = 1
+# Create the parser for the "history" command {{{
+history = subProgram.add_parser('history', help='Print the journal history of the flags (all flags without arguments).')
+history.add_argument('targetObject', nargs='*', type=str, metavar='VARIABLE, an optional variable or glob.')
+history.add_argument('--match', action='append', default=[], metavar='REGEX', help='Select the variables matching a regular expression (repeatable)')
+history.set_defaults(func='history', mode='default')
+# }}}
 
-# Process the verbosityFlag to assign a verbosityState
-verbosityState = max(min(verbosityFlag, 3), 0)
+# Create the parser for the "compact" command {{{
+compact = subProgram.add_parser('compact', help='Fold the mutation journal into the YAML file.')
+compact.set_defaults(func='compact', mode='default')
+# }}}
 
-# Initiate the logger.
-logger = logging.getLogger('unimog')
+# Create the parser for the "replicate" command {{{
+replicate = subProgram.add_parser('replicate', help='Refresh the node-local replica ($UNIMOG_DEV_REPLICA) from the shared config now.')
+replicate.set_defaults(func='replicate', mode='default')
+# }}}
 
-# Create a console handler.
-console = logging.StreamHandler()
+# Create the parser for the "publish" command {{{
+publish = subProgram.add_parser('publish', help='Publish the memory-mapped flag table beside the YAML file, every commit keeps it current.')
+publish.add_argument('--remove', action='store_true', default=False, help='Remove the flag table')
+publish.set_defaults(func='publish', mode='default')
+# }}}
 
-# Set the default level to INFO
+# Create the parser for the "shard" command {{{
+shard = subProgram.add_parser('shard', help='Split the YAML file into one shard per flag namespace (UNIMOG_<APP>), or merge the shards back.')
+shard.add_argument('--merge', action='store_true', default=False, help='Merge the shards back into the YAML file')
+shard.set_defaults(func='shard', mode='default')
+# }}}
 
-# Put the logger into DEBUG mode
-logger.setLevel(logging.DEBUG)
+# Create the parser for the "diff" command {{{
+diff = subProgram.add_parser('diff', help='Print the flags that differ between two configs, or between the environment and a config.')
+diff.add_argument('configs', nargs='*', metavar='CONFIG, a unimogDev.yaml (or its folder), the merged local site stack without one.')
+diff.add_argument('--env', action='store_true', default=False, help='Compare the environment with the config, what exporting the config would change')
+diff.add_argument('--mode', nargs='?')
+diff.set_defaults(func='diff', mode='default')
+# }}}
 
-# Put the handler into DEBUG mode
-console.setLevel(logging.DEBUG)
+# Any additional function goes here.
 
-# Define a default CustomFilter
-consoleFilter = utils.CustomFilter(0)
+# }}}
 
-# Create the conditional filters
-consoleFilter = utils.CustomFilter(verbosityState)
+# Main Function {{{
+# ;---------------------------------------------------------------------------
+# ; Main:
+# ;     The command line tool, "argv" defaults to the process arguments.
+# ;     Pipeline code imports "modules.utilities" and uses its "Flags" client
+# ;     instead of launching the tool.
+# ;---------------------------------------------------------------------------
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # A bare "--profile" would take the function name as its value
+    args = mainProgram.parse_args([('--profile=text' if argument == '--profile' else argument) for argument in argv])
+
+    # Profiler Setup {{{
+    # ;---------------------------------------------------------------------------
+    # ; Without "--profile" the null profiler stays active and records nothing
+    # ;---------------------------------------------------------------------------
+    if args.profile or args.profile_output or args.profile_cprofile:
+        profiler = profiling.enable(args.profile or 'text', args.profile_output, args.profile_cprofile, args.func)
+        profiler.checkpoint('interpreter', profiling.processStart(), scriptStart)
+        profiler.checkpoint('fast path', scriptStart, fastPathDone)
+        profiler.checkpoint('imports', fastPathDone, importsDone)
+        profiler.checkpoint('arguments', importsDone, time.time())
+    # }}}
+
+    profiling.start('logging')
+
+    # Debug Logger Setup {{{
+    # ;---------------------------------------------------------------------------
+    # ; Setup the logger
+    # ;---------------------------------------------------------------------------
+
+    # Get the verbosity flag
+    try:
+        verbosityFlag = args.verbosity[0]
+    except:
+        # Verbose INFO, ERROR, CRITICAL by default
+        verbosityFlag = 1
+
+    # Process the verbosityFlag to assign a verbosityState
+    verbosityState = max(min(verbosityFlag, 3), 0)
+
+    # Initiate the logger.
+    logger = logging.getLogger('unimog')
+
+    # Create a console handler.
+    console = logging.StreamHandler()
+
+    # Put the handler into DEBUG mode, the filter decides
+    console.setLevel(logging.DEBUG)
+
+    # Create the conditional filter
+    consoleFilter = utils.CustomFilter(verbosityState)
+
+    # Put the logger at the lowest level the filter lets through, the disabled
+    # levels return before a record is built
+    logger.setLevel(consoleFilter.lowestLevel)
+
+    # Create a formatter dictionary.
+    consoleFormatter = logging.Formatter('[%(asctime)s] {%(funcName)s, %(name)s} {%(filename)s, line: %(lineno)d} | (%(levelname)s) %(message)s')
+
+    # Set the formatter of the console logger
+    console.setFormatter(consoleFormatter)
+    logHandlers = [console]
+
+    # The optional rotating log file, same records and format as the console
+    if args.log_file:
+        try:
+            logFile = logqueue.logFileHandler(args.log_file)
+        except (IOError, OSError), error:
+            sys.stderr.write("Unable to open the log file %s: %s\n" % (args.log_file, error))
+            sys.exit(4)
+        logFile.setFormatter(consoleFormatter)
+        logHandlers.append(logFile)
 
-# Attach the filters
-console.addFilter(consoleFilter)
+    # Link the handlers to the logger through the background writer, the filter
+    # runs before a record is queued
+    logqueue.startWriter(logger, logHandlers, [consoleFilter])
 
-# Create a formatter dictionary.
-consoleFormatter = logging.Formatter('[%(asctime)s] {%(funcName)s, %(name)s} {%(filename)s, line: %(lineno)d} | (%(levelname)s) %(message)s')
+    # }}}
 
-# Set the formatter of the console logger
-console.setFormatter(consoleFormatter)
+    profiling.stop()
 
-# Link the console handler to the logger.
-logger.addHandler(console)
+    # ;---------------------------------------------------------------------------
+    # ; Main Execution Block
+    # ;---------------------------------------------------------------------------
 
-# }}}
+    # <START>
 
-# ;---------------------------------------------------------------------------
-# ; Main Execution Block
-# ;---------------------------------------------------------------------------
+    # Check the internal module
+    utils.printMessage()
+    logger.debug("%s: %s\n", "Utility module version", utils.moduleVersion)
 
-# <START>
+    # Initial debugging information
+    logger.debug("%s:\n%s\n", "Incoming arguments", argv)
+    logger.debug("%s:\n%s\n", "Argparse results", args)
 
-# Check the internal module
-utils.printMessage()
-logger.debug("%s: %s\n" % ("Utility module version", utils.moduleVersion))
+    # Check the "--match" patterns before any work is done
+    for pattern in getattr(args, 'match', []):
+        try:
+            re.compile(pattern)
+        except re.error, error:
+            logger.error("%s: %s (%s)", "Invalid --match pattern", pattern, error)
 
-# Initial debugging information
-logger.debug("%s:\n%s\n" % ("Incoming arguments", sys.argv))
-logger.debug("%s:\n%s\n" % ("Argparse results", args))
+            # Exit
+            logger.critical("EXIT_CODE: 9")
+            sys.exit(9)
 
-# Build YAML data dictionary
-try:
-    unimogLocalSiteConfig = os.environ['UNIMOG_LOCAL_SITE_CONFIG']
-except:
-    logger.critical("Unable to get the \"$UNIMOG_LOCAL_SITE_CONFIG\" environment variable!")
-    logger.critical("EXIT_CODE: 6")
-    sys.exit(6)
+    # A value is only ever set, "unset" switches a flag off
+    if args.func == "unset" and [target for target in args.targetObject if '=' in target]:
+        logger.error("%s", "<unset> takes no values (NAME=VALUE).")
 
-fileString = unimogLocalSiteConfig + '/unimogDev.yaml'
-inData = utils.importYamlData(fileString)
+        # Exit
+        logger.critical("EXIT_CODE: 4")
+        sys.exit(4)
 
-# Debug
-logger.debug("%s \n%s\n" % ("Incoming YAML dictionary is:", inData))
+    # MAIN: This is the RECURSIVE block {{{
+    # A "--recursive" run works on every config below a root folder, each one
+    # on its own, the local site config is not needed
+    if getattr(args, 'recursive', None) is not None:
+        logger.debug("Mode: <%s --recursive>", args.func)
 
-# Create a YAML class object using the incoming dictionary
-s = utils.YamlObj(**inData)
+        if not os.path.isdir(args.recursive):
+            logger.error("%s: %s", "Not a folder", args.recursive)
 
-# Function Block {{{
-# ;---------------------------------------------------------------------------
-# ; The actual function distribution block
-# ;---------------------------------------------------------------------------
+            # Exit
+            logger.critical("EXIT_CODE: 2")
+            sys.exit(2)
 
-# MAIN: This is the GET block {{{
-if args.func=="get":
-    logger.debug("Mode: <get>")
-    utils.executeGet(s, args.targetObject)
-#}}}
+        if args.workers is not None and args.workers < 1:
+            logger.error("%s", "--workers needs at least one worker.")
 
-# MAIN: This is the SET block {{{
+            # Exit
+            logger.critical("EXIT_CODE: 4")
+            sys.exit(4)
 
-elif args.func=="set":
-    logger.debug("Mode: <set>")
+        if args.func == "list" and args.mode not in ("default", "python"):
+            logger.error("%s: %s", "Unknown --mode for a recursive list (default, python)", args.mode)
 
-    # A secondary check for the "ALL" sub mode.
-    # In case the "ALL" sub mode is active, we need to gather all the keys
-    # from the YAML object and build our own targetObject.
+            # Exit
+            logger.critical("EXIT_CODE: 5")
+            sys.exit(5)
 
-    # --all was used
-    if args.mode == "all":
-        # --all was used but and additional arguments were provided
-        if len(args.targetObject) != 0:
+        if args.func != "list" and args.mode == "all" and (args.targetObject or args.match):
             logger.error("No arguments allowed after --all.")
 
             # Exit
             logger.critical("EXIT_CODE: 4")
             sys.exit(4)
 
-        # Throw a debug warning about the "--all" mode being active
-        logger.warning("%s" % ("Sub-mode: <all> is active, any operation will affect all target objects."))
+        # Only a list goes over every flag without being asked to
+        if args.func != "list" and args.mode != "all" and not args.targetObject and not args.match:
+            logger.error("<%s --recursive> needs a variable, a glob, a --match pattern or --mode=all.", args.func)
 
-        # Extract the keys of the YAML object
-        keyList = utils.extractKeys(s.GetPublicDict())
+            # Exit
+            logger.critical("EXIT_CODE: 4")
+            sys.exit(4)
+
+        profiling.start('dispatch', hot=True)
+        failed = utils.executeRecursive(args.recursive, args.func, args.targetObject, args.match, args.mode, args.workers)
+        profiling.stop()
+        if failed is None:
+            logger.critical("EXIT_CODE: 2")
+            sys.exit(2)
+        if failed:
+            logger.critical("EXIT_CODE: 1")
+            sys.exit(1)
+        return 0
+    #}}}
+
+    # Build YAML data dictionary
+    try:
+        unimogLocalSiteConfig = os.environ['UNIMOG_LOCAL_SITE_CONFIG']
+    except:
+        logger.critical("Unable to get the \"$UNIMOG_LOCAL_SITE_CONFIG\" environment variable!")
+        logger.critical("EXIT_CODE: 6")
+        sys.exit(6)
+
+    fileString = unimogLocalSiteConfig + '/unimogDev.yaml'
+
+    # A "get" of plain variable names is answered by the streaming scanner, the
+    # configuration is only loaded when the scanner falls back (or comes from the
+    # node-local replica)
+    if args.func == "get" and not utils.replica.replicaFolder() and utils.executeStreamGet(fileString, args.targetObject, args.match):
+        sys.exit(0)
+
+    # A point in time list needs the layers rewound through their history
+    atTime = None
+    if args.func == "list" and args.at is not None:
+        try:
+            atTime = utils.parseTimestamp(args.at)
+        except ValueError, error:
+            logger.error("%s: %s", "Invalid --at time", error)
+
+            # Exit
+            logger.critical("EXIT_CODE: 4")
+            sys.exit(4)
 
-        # Override the argument list
-        args.targetObject = keyList
+    # A plain list of a sharded config is written one shard at a time
+    if args.func == "list" and atTime is None and not args.origin and not args.targetObject and not args.match and not utils.replica.replicaFolder() and utils.executeShardList(fileString, args.mode):
+        sys.exit(0)
 
-    # --all was not used
+    # The commands run on the same client object the library users get, "set" and
+    # "unset" load what they need under the config lock
+    if args.func in ("set", "unset"):
+        s = None
     else:
-        pass
+        if atTime is None:
+            flags = utils.Flags(fileString)
+            try:
+                inData, origins = flags.current(), flags.origins
+                broken = False
+            except RuntimeError:
+                inData, origins = flags.data, flags.origins
+                broken = True
+        else:
+            inData, origins = utils.importMergedDataAt(fileString, atTime)
+            broken = 'error' in inData and not isinstance(inData['error'], bool)
+
+        # The flags of a broken config are never listed, the other commands check it themselves
+        if broken and args.func in ("get", "list"):
+            logger.error("%s: %s", "Unable to read a broken configuration", fileString)
+
+            # Exit
+            logger.critical("EXIT_CODE: 1")
+            sys.exit(1)
 
-    # Run the function
-    newData = utils.executeSet(s, args.targetObject, verbosityFlag, True)
+        # Debug
+        logger.debug("%s \n%s\n", "Incoming YAML dictionary is:", inData)
 
-    # Attempt to write the YAML object back to the file
-    utils.exportYamlData(newData, fileString)
-#}}}
+        # Create a YAML class object using the incoming dictionary
+        with profiling.span('YamlObj'):
+            s = flags.yamlObject() if atTime is None else utils.YamlObj(**inData)
 
-# MAIN: This is the UNSET block {{{
-elif args.func=="unset":
-    logger.debug("Mode: <unset>")
+    # The dispatch is the hot section of "--profile-cprofile"
+    profiling.start('dispatch', hot=True)
 
-    # A secondary check for the "ALL" sub mode.
-    # In case the "ALL" sub mode is active, we need to gather all the keys
-    # from the YAML object and build our own targetObject.
+    # Function Block {{{
+    # ;---------------------------------------------------------------------------
+    # ; The actual function distribution block
+    # ;---------------------------------------------------------------------------
 
-    # --all was used
-    if args.mode == "all":
-        # --all was used but and additional arguments were provided
-        if len(args.targetObject) != 0:
-            logger.error("No arguments allowed after --all.")
+    # MAIN: This is the GET block {{{
+    if args.func=="get":
+        logger.debug("Mode: <get>")
+
+        if len(args.targetObject) == 0 and len(args.match) == 0:
+            logger.error("<get> needs a variable, a glob or a --match pattern.")
 
             # Exit
             logger.critical("EXIT_CODE: 4")
             sys.exit(4)
 
-        # Throw a debug warning about the "--all" mode being active
-        logger.warning("%s" % ("Sub-mode: <all> is active, any operation will affect all target objects."))
+        utils.executeGet(s, args.targetObject, args.match)
+    #}}}
 
-        # Extract the keys of the YAML object
-        keyList = utils.extractKeys(s.GetPublicDict())
+    # MAIN: This is the SET block {{{
 
-        # Override the argument list
-        args.targetObject = keyList
+    elif args.func=="set":
+        logger.debug("Mode: <set>")
 
-    # --all was not used
-    else:
-        pass
+        # A secondary check for the "ALL" sub mode.
+        # In case the "ALL" sub mode is active, we need to gather all the keys
+        # from the YAML object and build our own targetObject.
 
-    # Run the function
-    newData = utils.executeSet(s, args.targetObject, verbosityFlag, False)
+        # --all was used
+        if args.mode == "all":
+            # --all was used but and additional arguments were provided
+            if len(args.targetObject) != 0:
+                logger.error("No arguments allowed after --all.")
 
-    # Attempt to write the YAML object back to the file
-    utils.exportYamlData(newData, fileString)
-#}}}
+                # Exit
+                logger.critical("EXIT_CODE: 4")
+                sys.exit(4)
 
-# MAIN: This is the LIST block {{{
-elif args.func=="list":
-    logger.debug("Mode: <list>")
+            # Throw a debug warning about the "--all" mode being active
+            logger.warning("%s", "Sub-mode: <all> is active, any operation will affect all target objects.")
 
-    # A secondary check for the sub mode argument.
-    # In case the "ALL" sub mode is active, we need to gather all the keys
-    # from the YAML object and build our own targetObject.
+            # The keys of the YAML object are extracted under the config lock
 
-    # --mode used: bash
-    if args.mode == "bash":
-        # Run the function
-        utils.executeList(s, args.mode)
+        # --all was not used
+        else:
+            pass
 
-    # --mode used: python
-    elif args.mode == "python":
-        # Run the function
-        utils.executeList(s, args.mode)
+        # Run the function, the read-modify-write cycle runs under the config lock
+        utils.commitSet(fileString, args.targetObject, verbosityFlag, True, args.mode, args.match)
+    #}}}
 
-    # handle non supported --mode usage
-    elif args.mode != "default":
-        logger.error("%s: %s" % ("Unknown --mode", args.mode))
+    # MAIN: This is the UNSET block {{{
+    elif args.func=="unset":
+        logger.debug("Mode: <unset>")
 
-        # Exit
-        logger.critical("EXIT_CODE: 5")
-        sys.exit(5)
+        # A secondary check for the "ALL" sub mode.
+        # In case the "ALL" sub mode is active, we need to gather all the keys
+        # from the YAML object and build our own targetObject.
+
+        # --all was used
+        if args.mode == "all":
+            # --all was used but and additional arguments were provided
+            if len(args.targetObject) != 0:
+                logger.error("No arguments allowed after --all.")
+
+                # Exit
+                logger.critical("EXIT_CODE: 4")
+                sys.exit(4)
+
+            # Throw a debug warning about the "--all" mode being active
+            logger.warning("%s", "Sub-mode: <all> is active, any operation will affect all target objects.")
+
+            # The keys of the YAML object are extracted under the config lock
+
+        # --all was not used
+        else:
+            pass
+
+        # Run the function, the read-modify-write cycle runs under the config lock
+        utils.commitSet(fileString, args.targetObject, verbosityFlag, False, args.mode, args.match)
+    #}}}
+
+    # MAIN: This is the LIST block {{{
+    elif args.func=="list":
+        logger.debug("Mode: <list>")
+
+        # A secondary check for the sub mode argument.
+        # In case the "ALL" sub mode is active, we need to gather all the keys
+        # from the YAML object and build our own targetObject.
+
+        # Variables, globs and --match patterns narrow the list
+        positions = utils.selectPositions(s, args.targetObject, args.match)
+
+        # Only report the layers when asked for
+        if not args.origin:
+            origins = None
+
+        # Run the function, every --mode is an emitter (see modules/emitters.py)
+        if not utils.executeList(s, args.mode, positions, origins):
+            # handle non supported --mode usage
+            logger.error("%s: %s", "Unknown --mode", args.mode)
+
+            # Exit
+            logger.critical("EXIT_CODE: 5")
+            sys.exit(5)
+    #}}}
+
+    # MAIN: This is the SERVE block {{{
+    elif args.func=="serve":
+        logger.debug("Mode: <serve>")
+        import signal
+        import modules.daemon as daemon
+
+        # Turn a SIGTERM into a clean shutdown
+        def terminate(signalNumber, frame):
+            raise KeyboardInterrupt
+        signal.signal(signal.SIGTERM, terminate)
+
+        try:
+            server = daemon.FlagServer(fileString, args.socket or daemon.socketPath())
+        except Exception, error:
+            logger.error("%s: %s", "Unable to start the daemon", error)
 
+            # Exit
+            logger.critical("EXIT_CODE: 7")
+            sys.exit(7)
+
+        logger.info("%s: %s", "Serving the dev flags on", server.path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    #}}}
+
+    # MAIN: This is the BATCH block {{{
+    elif args.func=="batch":
+        logger.debug("Mode: <batch>")
+
+        if args.batchFile == '-':
+            batchStream = sys.stdin
+        else:
+            try:
+                batchStream = open(args.batchFile, 'r')
+            except IOError:
+                logger.critical("%s: %s", "Unable to access the batch file", args.batchFile)
+                logger.critical("EXIT_CODE: 2")
+                sys.exit(2)
+
+        # Run the function, nothing is committed unless every operation succeeds
+        if not utils.executeBatch(fileString, batchStream, verbosityFlag):
+            # Exit
+            logger.critical("EXIT_CODE: 10")
+            sys.exit(10)
+    #}}}
+
+    # MAIN: This is the RENDER block {{{
+    elif args.func=="render":
+        logger.debug("Mode: <render>")
+        import modules.transaction as transaction
+
+        # Render under the config lock, a concurrent commit must not be overwritten
+        # by the scripts of an older state
+        with transaction.FileLock(fileString):
+            inData, origins = utils.importMergedData(fileString)
+            if 'error' in inData or not utils.exportScripts(inData, fileString):
+                # Exit
+                logger.critical("EXIT_CODE: 3")
+                sys.exit(3)
+    #}}}
+
+    # MAIN: This is the WATCH block {{{
+    elif args.func=="watch":
+        logger.debug("Mode: <watch>")
+        import signal
+        import modules.watcher as watcher
+
+        # Turn a SIGTERM into a clean shutdown
+        def terminate(signalNumber, frame):
+            raise KeyboardInterrupt
+        signal.signal(signal.SIGTERM, terminate)
+
+        def report(changes):
+            for name in sorted(changes):
+                print '{}={}'.format(name, utils.schema.textValue(changes[name]))
+            sys.stdout.flush()
+
+        flagWatcher = watcher.FlagWatcher(fileString, args.debounce / 1000.0, args.poll is not None, args.poll or watcher.pollInterval)
+        flagWatcher.subscribe(report, args.targetObject, args.match)
+        logger.info("%s: %s (%s)", "Watching the dev flags of", fileString, flagWatcher.method)
+        try:
+            flagWatcher.run()
+        except KeyboardInterrupt:
+            pass
+    #}}}
+
+    # MAIN: This is the HISTORY block {{{
+    elif args.func=="history":
+        logger.debug("Mode: <history>")
+        utils.executeHistory(fileString, args.targetObject, args.match)
+    #}}}
+
+    # MAIN: This is the COMPACT block {{{
+    elif args.func=="compact":
+        logger.debug("Mode: <compact>")
+        import modules.transaction as transaction
+
+        with transaction.FileLock(fileString):
+            compacted = utils.compactJournal(fileString)
+        if compacted is None:
+            # Exit
+            logger.critical("EXIT_CODE: 3")
+            sys.exit(3)
+        elif not compacted:
+            logger.info("%s: %s", "No journal to compact for", fileString)
+    #}}}
+
+    # MAIN: This is the PUBLISH block {{{
+    elif args.func=="publish":
+        logger.debug("Mode: <publish>")
+        import modules.flagtable as flagtable
+        import modules.transaction as transaction
+
+        with transaction.FileLock(fileString):
+            if args.remove:
+                if not flagtable.remove(fileString):
+                    logger.info("%s: %s", "No flag table to remove for", fileString)
+            elif not utils.publishTable(fileString):
+                # Exit
+                logger.critical("EXIT_CODE: 3")
+                sys.exit(3)
+    #}}}
+
+    # MAIN: This is the SHARD block {{{
+    elif args.func=="shard":
+        logger.debug("Mode: <shard>")
+        import modules.transaction as transaction
+
+        with transaction.FileLock(fileString):
+            if args.merge:
+                if not utils.mergeShards(fileString):
+                    logger.info("%s: %s", "No shards to merge for", fileString)
+            elif not utils.shardConfig(fileString):
+                logger.error("%s: %s", "Unable to shard", fileString)
+
+                # Exit
+                logger.critical("EXIT_CODE: 3")
+                sys.exit(3)
+    #}}}
+
+    # MAIN: This is the REPLICATE block {{{
+    elif args.func=="replicate":
+        logger.debug("Mode: <replicate>")
+        import modules.replica as replica
+
+        if replica.replicaFolder() is None:
+            logger.error("%s", "Unable to get the \"$UNIMOG_DEV_REPLICA\" environment variable!")
+
+            # Exit
+            logger.critical("EXIT_CODE: 6")
+            sys.exit(6)
+
+        if replica.refresh(fileString, utils.importMergedData, force=True) is None:
+            logger.error("%s: %s", "Unable to write the replica", replica.replicaFolder())
+
+            # Exit
+            logger.critical("EXIT_CODE: 3")
+            sys.exit(3)
+    #}}}
+
+    # MAIN: This is the DIFF block {{{
+    elif args.func=="diff":
+        logger.debug("Mode: <diff>")
+
+        # The environment is only compared with a single config
+        if len(args.configs) > (1 if args.env else 2) or (not args.env and not args.configs):
+            logger.error("%s", "<diff> needs one or two configs, or --env and at most one config.")
+
+            # Exit
+            logger.critical("EXIT_CODE: 4")
+            sys.exit(4)
+
+        # A config given by name is read on its own, the local site stack is the merged view
+        sides = []
+        for path in args.configs:
+            configFile = os.path.join(path, 'unimogDev.yaml') if os.path.isdir(path) else path
+            configData = utils.importYamlData(configFile)
+            if not isinstance(configData, dict) or 'error' in configData or not utils.evaluateDerived(configData):
+                logger.error("%s: %s", "Unable to diff a broken configuration", configFile)
+
+                # Exit
+                logger.critical("EXIT_CODE: 1")
+                sys.exit(1)
+            sides.append(configData)
+
+        # The local site stack stands in for a missing config, the environment is never
+        # patched (or cleared) from a broken one
+        if len(sides) < (1 if args.env else 2):
+            if broken:
+                logger.error("%s: %s", "Unable to diff a broken configuration", fileString)
+
+                # Exit
+                logger.critical("EXIT_CODE: 1")
+                sys.exit(1)
+            sides.append(inData)
+
+        if args.env:
+            newFlags = sides[0]
+            oldFlags = utils.environmentFlags(newFlags)
+        else:
+            oldFlags, newFlags = sides
+
+        if utils.executeDiff(oldFlags, newFlags, args.mode, args.env) is None:
+            logger.error("%s: %s", "Unknown --mode for <diff> (default, json, bash, zsh, tcsh)", args.mode)
+
+            # Exit
+            logger.critical("EXIT_CODE: 5")
+            sys.exit(5)
+    #}}}
+
+    # MAIN: This is an EMPTY block {{{
     else:
-        utils.executeList(s, args.mode)
-#}}}
+        logger.critical("Function list out of range.")
+    #}}}
 
-# MAIN: This is an EMPTY block {{{
-else:
-    logger.critical("Function list out of range.")
-#}}}
+    # Any additional function goes here.
 
-# Any additional function goes here.
+    # }}}
+
+    profiling.stop()
 
+    # <END__>
+    return 0
 # }}}
 
-# <END__>
-pass
+if __name__ == '__main__':
+    sys.exit(main())
 
 # vim: ts=4 ft=python nowrap fdm=marker
@@ -52,6 +52,39 @@ function buildCommandString() {
 }
 # }}}
 
+# Utility: Query Daemon {{{
+# Sends a single request to the resident "unimogDev.py serve" daemon and prints the
+# payload of the reply. Returns 1 when the daemon is not reachable (no socket, no
+# socat / "nc -U" client) or answers with an error, so the caller can fall back.
+# The request names the layers of this shell, a daemon of other layers refuses it. Only
+# a socket owned by this user is used, anybody could have made one in /tmp.
+function queryDaemon() {
+    local socketPath=${UNIMOG_DEV_SOCKET:-${XDG_RUNTIME_DIR:-/tmp}/unimogDev.$(id -u).sock}
+    local stack="--stack=${UNIMOG_SITE_CONFIG}|${UNIMOG_LOCAL_SITE_CONFIG}|${UNIMOG_SHOW_CONFIG}|${UNIMOG_USER_CONFIG}"
+    local reply status
+
+    [ -S "$socketPath" ] && [ -O "$socketPath" ] || return 1
+
+    if command -v socat >/dev/null 2>&1; then
+        reply=$(printf '%s %s\n' "$stack" "$1" | socat -t 2 - UNIX-CONNECT:"$socketPath" 2>/dev/null) || return 1
+    elif nc -h 2>&1 | grep -q -- ' -U'; then
+        reply=$(printf '%s %s\n' "$stack" "$1" | nc -U "$socketPath" 2>/dev/null) || return 1
+    else
+        return 1
+    fi
+
+    # The reply is "OK <length>" followed by the payload, or "ERR <message>"
+    status=${reply%%$'\n'*}
+    case "$status" in
+        OK*)
+            [ "$status" != "$reply" ] && printf '%s\n' "${reply#*$'\n'}"
+            return 0
+            ;;
+    esac
+    return 1
+}
+# }}}
+
 # Any other utility function goes here
 
 # }}}
@@ -73,8 +106,10 @@ else
     # Build the command string
     buildCommandString
 
-    # Execute the command
-    if [ ! -f ${primaryCommandString} ]; then
+    # Execute the command, through the resident daemon when it is reachable
+    if queryDaemon "$*"; then
+        :
+    elif [ ! -f ${primaryCommandString} ]; then
         if [ ! -f ${secondaryCommandString} ]; then
             echo -e "\n<"$currentFileName"> (ERROR): Core pipeline tool: \"${command}\" is not accessible!\n"
         else